@@ -16,6 +16,7 @@ from audio_manager import VoiceEngineManager, AudioPlayer
 from google import genai
 from google.genai import types as genai_types
 from communication_logger import CommunicationLogger # 追加
+from warmup import Warmup, get_gemini_client
 from mcp_client import MCPClientManager # MCPクライアントマネージャーをインポート
 import i18n_setup # 追加
 
@@ -45,10 +46,11 @@ class AIChatWindow:
 
         self.config = ConfigManager()
         self.character_manager = CharacterManager(self.config)
-        self.voice_manager = VoiceEngineManager()
+        self.voice_manager = VoiceEngineManager(config_manager=self.config)
         self.audio_player = AudioPlayer(config_manager=self.config)
         self.communication_logger = CommunicationLogger() # 追加
         self.mcp_client_manager = MCPClientManager(config_manager=self.config) # MCPクライアントマネージャー初期化
+        self.warmup = Warmup(self.config, self.voice_manager, on_state_change=lambda state, report: self.root.after(0, self._update_warmup_indicator, state, report))
 
         self.ai_chat_history_folder = Path(self.config.config_file).parent / "ai_chat_history"
         try:
@@ -74,6 +76,9 @@ class AIChatWindow:
 
         # MCPサーバーの初期化を別スレッドで実行
         threading.Thread(target=self._initialize_mcp_servers_async, daemon=True).start()
+        # 最初のメッセージまでに AI キャラの音声エンジン・LLM を温めておく（設定で有効な場合のみ）
+        ai_char_id = self.character_manager.get_character_id_by_name(self.ai_char_var.get())
+        if ai_char_id: self.warmup.start(self.character_manager.get_character(ai_char_id))
 
         self.log(self._("ai_chat.log.init_completed"))
         # エラー発生時のメッセージボックス表示 (もしあれば)
@@ -107,6 +112,7 @@ class AIChatWindow:
             self._add_message_to_chat_display_tree("🔧 System", message)
 
     def on_closing(self):
+        self.warmup.cancel()
         self.log(self._("ai_chat.log.shutting_down_mcp"))
         
         # 終了処理中を示すダイアログを表示
@@ -254,6 +260,8 @@ class AIChatWindow:
 
         self.play_user_speech_var = tk.BooleanVar(value=True)
         customtkinter.CTkCheckBox(chat_config_frame, text=self._("ai_chat.checkbox.play_user_speech"), variable=self.play_user_speech_var, font=self.default_font).grid(row=0, column=4, padx=10, pady=2, sticky="w")
+        self.warmup_label = customtkinter.CTkLabel(chat_config_frame, text=self._("warmup.status.cold"), font=self.default_font)
+        self.warmup_label.grid(row=0, column=5, padx=5, pady=2, sticky="w")
 
         # 会話内容表示 (LabelFrame -> CTkFrame + CTkLabel)
         chat_display_outer_frame = customtkinter.CTkFrame(chat_panel)
@@ -295,6 +303,13 @@ class AIChatWindow:
         self.chat_message_entry.pack(side="left", fill="x", expand=True, padx=(0, 5))
         customtkinter.CTkButton(chat_input_frame, text=self._("ai_chat.button.send"), command=self.send_ai_chat_message_action, font=self.default_font, width=80).pack(side="left")
 
+    def _update_warmup_indicator(self, state, report):
+        if hasattr(self, 'warmup_label') and self.warmup_label.winfo_exists():
+            self.warmup_label.configure(text=self._(f"warmup.status.{state}"))
+        if report:
+            details = ", ".join(f"{step}: {'OK' if r['ok'] else 'NG'} {r['seconds']:.1f}s" for step, r in report.items())
+            self.log(self._("warmup.log.finished", state=state, details=details))
+
     def _adjust_chat_words_column_width(self, event, treeview_widget):
         other_cols_width = treeview_widget.column('line')['width'] + treeview_widget.column('talker')['width']
         # スクロールバーの幅を考慮 (おおよそ)
@@ -460,6 +475,7 @@ class AIChatWindow:
     def send_ai_chat_message_action(self, event=None):
         user_input = self.chat_message_entry.get().strip()
         if not user_input: return
+        self.warmup.cancel() # ウォームアップの完了を待たずに送信する
 
         # MCPコマンドの処理
         if user_input.startswith("/mcp "):
@@ -677,7 +693,7 @@ class AIChatWindow:
                     finally:
                         loop.close()
             else:
-                client = genai.Client(api_key=api_key)
+                client = get_gemini_client(api_key)
                 gemini_response = client.models.generate_content(model=text_gen_model, contents=full_prompt,
                                                                generation_config=genai_types.GenerateContentConfig(temperature=0.8, max_output_tokens=400))
                 ai_response_text = gemini_response.text.strip() if gemini_response.text else self._("ai_chat.message.ai_generic_error_response")
@@ -772,7 +788,7 @@ class AIChatWindow:
                 api_key = self.config.get_system_setting("google_ai_api_key")
                 if not api_key:
                     return analysis_result
-                client = genai.Client(api_key=api_key)
+                client = get_gemini_client(api_key)
                 local_llm_url = None
             
             # ツール説明を生成
@@ -1011,13 +1027,15 @@ class AIChatWindow:
             loop = asyncio.new_event_loop(); asyncio.set_event_loop(loop)
             try:
                 audio_files = loop.run_until_complete(
-                    self.voice_manager.synthesize_with_fallback(text, model, speed, preferred_engine=engine, api_key=api_key)
+                    self.voice_manager.synthesize_with_fallback(text, model, speed, preferred_engine=engine, api_key=api_key, character_id=char_id)
                 )
                 if audio_files:
                     loop.run_until_complete(self.audio_player.play_audio_files(audio_files))
                 else: self.log(self._("ai_chat.log.audio_synthesis_failed", char_name=char_name, text_preview=text[:20]))
             except Exception as e_play: self.log(self._("ai_chat.log.audio_playback_error", char_name=char_name, e_play=e_play))
-            finally: loop.close()
+            finally:
+                loop.run_until_complete(self.voice_manager.close())
+                loop.close()
 
         if block:
             run_synthesis_and_play()
@@ -10,7 +10,6 @@ import asyncio
 import threading
 import time
 import wave
-import shutil
 import chardet # 文字コード判別ライブラリ
 from pykakasi import kakasi
 
@@ -48,7 +47,7 @@ class AITheaterWindow:
 
         self.config_manager = ConfigManager()
         self.character_manager = CharacterManager(self.config_manager)
-        self.voice_manager = VoiceEngineManager()
+        self.voice_manager = VoiceEngineManager(config_manager=self.config_manager)
         self.audio_player = AudioPlayer(config_manager=self.config_manager)
 
         # --- カナ変換の準備 ---
@@ -603,26 +602,10 @@ class AITheaterWindow:
         output_wav_path = self.audio_output_folder / f"{line_num:06d}.wav"
         self.log(self._("ai_theater.log.audio_generation_started").format(line_num=line_num, action=action, talker=talker, words_preview=words[:20]))
         if action == "talk" or action == "narration":
-            char_id_to_use = self._get_char_id_for_talker(talker)
-            if not char_id_to_use:
-                self.log(self._("ai_theater.log.talker_char_settings_not_found_skip").format(talker=talker, line_num=line_num)); return False
-            char_settings = self.config_manager.get_character(char_id_to_use)
-            if not char_settings: return False # Should not happen if char_id_to_use is valid
-            voice_settings = char_settings.get('voice_settings', {})
-            engine = voice_settings.get('engine', self.config_manager.get_system_setting("voice_engine"))
-            model = voice_settings.get('model'); speed = voice_settings.get('speed', 1.0)
-            api_key = self.config_manager.get_system_setting("google_ai_api_key") if "google_ai_studio" in engine else None
-            audio_files = await self.voice_manager.synthesize_with_fallback(words, model, speed, preferred_engine=engine, api_key=api_key)
-            if audio_files and Path(audio_files[0]).exists():
-                try:
-                    if output_wav_path.exists(): output_wav_path.unlink()
-                    shutil.move(audio_files[0], output_wav_path)
-                    self.log(self._("ai_theater.log.audio_file_generated_success").format(output_path=output_wav_path)); return True
-                except Exception as e_move:
-                    self.log(self._("ai_theater.log.audio_file_move_error").format(line_num=line_num, error_move=e_move))
-                    if Path(audio_files[0]).exists(): Path(audio_files[0]).unlink(missing_ok=True) # Clean up temp file
-                    return False
-            return False # Synthesis failed or no audio file produced
+            request = self._line_synthesis_request(line_data)
+            if not request: return False
+            audio_files = await self.voice_manager.synthesize_with_fallback(**request)
+            return self._save_line_audio(line_num, audio_files)
         elif action == "wait":
             try:
                 duration = float(words); framerate=24000; channels=1; sampwidth=2
@@ -633,6 +616,51 @@ class AITheaterWindow:
             except Exception as e_wave: self.log(self._("ai_theater.log.silent_file_creation_error").format(line_num=line_num, error_wave=e_wave)); return False
         return False # Should not be reached if action is valid
 
+    def _line_synthesis_request(self, line_data: dict):
+        """talk / narration 行を synthesize_with_fallback・synthesize_many の引数 dict にする。キャラクターが見つからなければ None。"""
+        line_num, talker, words = line_data['line'], line_data['talker'], line_data['words']
+        char_id_to_use = self._get_char_id_for_talker(talker)
+        if not char_id_to_use:
+            self.log(self._("ai_theater.log.talker_char_settings_not_found_skip").format(talker=talker, line_num=line_num)); return None
+        char_settings = self.config_manager.get_character(char_id_to_use)
+        if not char_settings: return None # Should not happen if char_id_to_use is valid
+        voice_settings = char_settings.get('voice_settings', {})
+        engine = voice_settings.get('engine', self.config_manager.get_system_setting("voice_engine"))
+        api_key = self.config_manager.get_system_setting("google_ai_api_key") if "google_ai_studio" in engine else None
+        return {"text": words, "voice_model": voice_settings.get('model'), "speed": voice_settings.get('speed', 1.0),
+                "preferred_engine": engine, "api_key": api_key, "character_id": char_id_to_use}
+
+    def _save_line_audio(self, line_num, audio_files) -> bool:
+        if not audio_files: return False # Synthesis failed or no audio file produced
+        output_wav_path = self.audio_output_folder / f"{line_num:06d}.wav"
+        try:
+            if output_wav_path.exists(): output_wav_path.unlink()
+            audio_files[0].write_wav(output_wav_path) # 合成結果はメモリ上の AudioClip。一時ファイルを経由せず直接書き出す
+            self.log(self._("ai_theater.log.audio_file_generated_success").format(output_path=output_wav_path)); return True
+        except Exception as e_move:
+            self.log(self._("ai_theater.log.audio_file_move_error").format(line_num=line_num, error_move=e_move))
+            return False
+
+    async def _synthesize_lines_batch(self, lines, on_line_done):
+        """
+        複数行をまとめて合成する。talk / narration 行は synthesize_many でエンジンごとの同時実行数の範囲内で並行合成し、
+        完了した順に保存して on_line_done(line_num, success) を呼ぶ。stop_requested で残りを打ち切る。
+        """
+        requests, request_lines = [], []
+        for line_data in lines:
+            if self.stop_requested: return
+            if line_data['action'] in ("talk", "narration"):
+                self.log(self._("ai_theater.log.audio_generation_started").format(line_num=line_data['line'], action=line_data['action'], talker=line_data['talker'], words_preview=line_data['words'][:20]))
+                request = self._line_synthesis_request(line_data)
+                if request: requests.append(request); request_lines.append(line_data['line']); continue
+                on_line_done(line_data['line'], False)
+            else: on_line_done(line_data['line'], await self._synthesize_script_line_logic(line_data)) # wait 行は無音ファイルを書くだけ
+        async for result in self.voice_manager.synthesize_many(requests):
+            if self.stop_requested: break
+            line_num = request_lines[result["index"]]
+            if result["error"]: self.log(self._("ai_theater.log.audio_synth_thread_error").format(line_num=line_num, error=result["error"]))
+            on_line_done(line_num, self._save_line_audio(line_num, result["files"]))
+
     def _get_char_id_for_talker(self, talker_name):
         all_chars = self.character_manager.get_all_characters()
         for char_id, data in all_chars.items():
@@ -692,26 +720,33 @@ class AITheaterWindow:
         status_failed = self._("ai_theater.status.failed")
         status_skipped = self._("ai_theater.status.success") # 既存の成功ステータスを流用
         try:
-            for i, line_data in enumerate(self.script_data):
-                if self.stop_requested: break
-
+            lines_to_generate = []
+            for line_data in self.script_data:
                 line_num = line_data['line']
                 audio_file_path = self.audio_output_folder / f"{line_num:06d}.wav"
-
                 if audio_file_path.exists():
                     self.log(f"Line {line_num}: Audio file already exists, skipping generation.")
                     self.root.after(0, self._update_line_status_in_tree, line_num, status_skipped)
                     success_count += 1
-                    progress_var.set(i + 1); progress_root.update_idletasks()
                     continue
-
-                self.root.after(0, self._update_line_status_in_tree, line_data['line'], status_generating)
-                success = loop.run_until_complete(self._synthesize_script_line_logic(line_data))
-                final_status = status_success if success else status_failed
-                self.root.after(0, self._update_line_status_in_tree, line_data['line'], final_status)
+                self.root.after(0, self._update_line_status_in_tree, line_num, status_generating)
+                lines_to_generate.append(line_data)
+            progress_var.set(success_count); progress_root.update_idletasks()
+
+            finished_lines = set()
+            def on_line_done(line_num, success):
+                nonlocal success_count, fail_count
+                finished_lines.add(line_num)
+                self.root.after(0, self._update_line_status_in_tree, line_num, status_success if success else status_failed)
                 if success: success_count +=1
                 else: fail_count +=1
-                progress_var.set(i + 1); progress_root.update_idletasks()
+                progress_var.set(success_count + fail_count); progress_root.update_idletasks()
+
+            # 行ごとに1件ずつ待たず、エンジンごとの同時実行数の範囲でまとめて合成する
+            loop.run_until_complete(self._synthesize_lines_batch(lines_to_generate, on_line_done))
+            for line_data in lines_to_generate: # 中止で合成されなかった行は未生成に戻す
+                if line_data['line'] not in finished_lines:
+                    self.root.after(0, self._update_line_status_in_tree, line_data['line'], self._("ai_theater.status.not_generated"))
 
             self.log(self._("ai_theater.log.all_lines_audio_generation_complete").format(success_count=success_count, fail_count=fail_count))
             if fail_count > 0:
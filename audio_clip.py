@@ -0,0 +1,92 @@
+"""
+メモリ上の音声データ
+
+音声エンジン・合成キャッシュ・プレイヤー・シアターの書き出しの間で、一時ファイルを経由せずに音声を受け渡すための型。
+PCM（リトルエンディアン・符号付き整数）をそのまま保持し、ファイルパスが必要になった時点で初めてディスクに書き出す。
+"""
+
+import io
+import os
+import tempfile
+import wave
+
+
+class AudioClip:
+    """PCM データとフォーマット情報（サンプリングレート・チャンネル数・サンプル幅）"""
+
+    __slots__ = ("pcm", "sample_rate", "channels", "sample_width", "source")
+
+    def __init__(self, pcm, sample_rate=24000, channels=1, sample_width=2, source=""):
+        self.pcm = pcm if isinstance(pcm, memoryview) else memoryview(pcm) # コピーせずに切り出せるように memoryview で持つ
+        self.sample_rate = int(sample_rate)
+        self.channels = int(channels)
+        self.sample_width = int(sample_width)
+        self.source = source  # どのエンジン・キャッシュから来たか（ログ用）
+
+    # --- 生成 ---
+    @classmethod
+    def from_wav_bytes(cls, data, source=""):
+        with wave.open(io.BytesIO(data), "rb") as wf:
+            return cls(wf.readframes(wf.getnframes()), wf.getframerate(), wf.getnchannels(), wf.getsampwidth(), source)
+
+    @classmethod
+    def from_wav_file(cls, path, source=""):
+        with wave.open(str(path), "rb") as wf:
+            return cls(wf.readframes(wf.getnframes()), wf.getframerate(), wf.getnchannels(), wf.getsampwidth(), source or os.path.basename(str(path)))
+
+    @classmethod
+    def silence(cls, seconds, sample_rate=24000, channels=1, sample_width=2):
+        return cls(bytes(int(sample_rate * seconds) * channels * sample_width), sample_rate, channels, sample_width, "silence")
+
+    @classmethod
+    def concat(cls, clips):
+        """同じフォーマットのクリップをサンプル単位でつなぐ（継ぎ目に無音を足したり削ったりしない）"""
+        clips = [c for c in clips if c]
+        if not clips: raise ValueError("No audio to concatenate")
+        fmt = clips[0].format()
+        if any(c.format() != fmt for c in clips): raise ValueError(f"Cannot concatenate clips with different formats: {[c.format() for c in clips]}")
+        frame_size = clips[0].frame_size
+        pcm = b"".join(c.pcm[:c.nbytes - c.nbytes % frame_size] for c in clips) # 端数バイトがあるとそれ以降のサンプルがずれる
+        return cls(pcm, *fmt, source=clips[0].source)
+
+    def copy(self):
+        """PCM を複製した別のクリップ（元のバッファを共有しない）"""
+        return AudioClip(bytes(self.pcm), self.sample_rate, self.channels, self.sample_width, self.source)
+
+    # --- 情報 ---
+    @property
+    def frame_size(self): return self.channels * self.sample_width
+    @property
+    def frames(self): return len(self.pcm) // self.frame_size if self.frame_size else 0
+    @property
+    def duration(self): return self.frames / self.sample_rate if self.sample_rate else 0.0
+    @property
+    def nbytes(self): return len(self.pcm)
+    def format(self): return (self.sample_rate, self.channels, self.sample_width)
+
+    def __len__(self): return self.nbytes
+    def __bool__(self): return self.nbytes > 0
+    def __repr__(self):
+        return f"AudioClip({self.duration:.2f}s, {self.sample_rate}Hz, {self.channels}ch, {self.sample_width * 8}bit{', ' + self.source if self.source else ''})"
+
+    # --- 書き出し（パスやWAVバイト列を必要とする利用者向け）---
+    def to_wav_bytes(self):
+        buf = io.BytesIO()
+        self._write_wave(buf)
+        return buf.getvalue()
+
+    def write_wav(self, path):
+        """指定パスに WAV として保存する（シアターの書き出し・キャッシュ保存用）"""
+        with open(path, "wb") as f: self._write_wave(f)
+        return path
+
+    def to_temp_file(self, suffix=".wav"):
+        """外部コマンドなどファイルパスが必須の利用者向け。削除は呼び出し側の責任。"""
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tf: self._write_wave(tf)
+        return tf.name
+
+    def _write_wave(self, fileobj):
+        with wave.open(fileobj, "wb") as wf:
+            wf.setnchannels(self.channels); wf.setsampwidth(self.sample_width); wf.setframerate(self.sample_rate)
+            wf.writeframes(self.pcm)
+
@@ -9,6 +9,7 @@ from google import genai
 from google.genai import types as genai_types
 import requests
 import asyncio
+import concurrent.futures
 import json
 import time
 import os
@@ -26,13 +27,34 @@ import re
 import csv
 import traceback
 
+from http_session_pool import HTTPSessionPool
+from voice_cache import SynthesisCache, get_synthesis_cache
+from speech_text import split_sentences, split_for_length
+from engine_health import EngineHealthMonitor
+from engine_ranking import get_engine_scoreboard
+from speaker_catalog import get_speaker_catalog
+from audio_query_cache import get_audio_query_cache
+from voice_metrics import VoiceMetrics, get_voice_telemetry
+from audio_clip import AudioClip
+from audio_sink import get_pcm_sink
+from audio_postprocess import AudioPostProcessor
+
 logger = logging.getLogger(__name__)
 
+# エンジンごとの同時合成数の既定値（system_settings の voice_engine_concurrency で上書き）
+DEFAULT_ENGINE_CONCURRENCY = {"google_ai_studio_new": 4, "avis_speech": 2, "voicevox": 2, "system_tts": 1}
+
+# 実行中の合成（同じ条件の同時リクエストを1回の合成に合流させる）。ウィンドウごとに VoiceEngineManager が作られ、
+# スレッドごとにイベントループが違うので、プロセス内で共有し concurrent.futures.Future で結果を受け渡す。
+_inflight_syntheses = {} # {(engine order, text, voice_model, speed): concurrent.futures.Future}
+_inflight_lock = threading.Lock()
+
 class VoiceEngineBase:
     def get_available_voices(self): raise NotImplementedError
     async def synthesize_speech(self, text, voice_model, speed=1.0, **kwargs): raise NotImplementedError
     def get_max_text_length(self): raise NotImplementedError
     def get_engine_info(self): return {"name": "Base Engine", "cost": "Unknown", "quality": "Unknown", "description": "Base voice engine"}
+    def resolve_voice_id(self, voice_model): return voice_model # キャッシュキー用の話者識別子。解決できない場合は None
 
 class GoogleAIStudioNewVoiceAPI(VoiceEngineBase):
     def __init__(self):
@@ -43,6 +65,7 @@ class GoogleAIStudioNewVoiceAPI(VoiceEngineBase):
         if self.client is None or api_key: self.client = genai.Client(api_key=api_key if api_key else os.getenv("GOOGLE_API_KEY"))
     def get_available_voices(self): return self.voice_models
     def get_max_text_length(self): return self.max_length
+    def resolve_voice_id(self, voice_model): return voice_model or "puck"
     def get_engine_info(self): return {"name": "Google AI Studio 新音声", "cost": "無料枠あり", "quality": "★★★★★", "description": "最新技術・リアルタイム・多言語"}
     async def synthesize_speech(self, text, voice_model="puck", speed=1.0, api_key=None, **kwargs):
         try:
@@ -57,104 +80,143 @@ class GoogleAIStudioNewVoiceAPI(VoiceEngineBase):
             response = await asyncio.to_thread(self.client.models.generate_content, model="gemini-2.5-flash-preview-tts", contents=text, config=config)
             audio_part = next((p for p in response.candidates[0].content.parts if p.inline_data and p.inline_data.mime_type.startswith("audio/")), None)
             if audio_part and audio_part.inline_data.data:
-                temp_filename = ""
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tf: temp_filename = tf.name
-                with wave.open(temp_filename, "wb") as wf:
-                    wf.setnchannels(1); wf.setsampwidth(2); wf.setframerate(24000)
-                    wf.writeframes(audio_part.inline_data.data)
-                logger.info(f"GoogleAIStudioNew: Success, file: {temp_filename}")
-                return [temp_filename]
+                clip = AudioClip(audio_part.inline_data.data, sample_rate=24000, channels=1, sample_width=2, source="google_ai_studio_new")
+                logger.info(f"GoogleAIStudioNew: Success, {clip}")
+                return [clip]
             logger.error(f"GoogleAIStudioNew: No audio data in response. Parts: {response.candidates[0].content.parts if response.candidates else 'No candidates'}")
             return []
         except Exception as e: logger.error(f"GoogleAIStudioNew: Error - {e}\n{traceback.format_exc()}"); return []
 
-class AvisSpeechEngineAPI(VoiceEngineBase):
-    def __init__(self): self.base_url = "http://127.0.0.1:10101"; self.max_length = 1000; self.speakers = []; self.is_available = False
+class LocalSpeakerEngineBase(VoiceEngineBase):
+    """/speakers を持つローカルエンジン (Avis Speech / VOICEVOX) の共通処理。話者一覧は共有カタログで管理する。"""
+    engine_name = ""
+    log_name = ""
+    default_voice = ""
+    default_style = None      # スタイル省略時 ("名前" だけ) のスタイル名。None ならその話者の最初のスタイル
+    fallback_speaker_id = 0   # 話者一覧が空のときの話者ID
+    # synthesize_speech の kwargs と audio_query のパラメーター名の対応
+    QUERY_OVERRIDES = {"pitch": "pitchScale", "intonation": "intonationScale", "volume": "volumeScale"}
+
+    def __init__(self, base_url, max_length, pool_limit=8, keepalive_timeout=30.0):
+        self.base_url = base_url; self.max_length = max_length; self.is_available = False
+        self.catalog = get_speaker_catalog(self.engine_name)
+        self.query_cache = get_audio_query_cache(self.engine_name)
+        self.http_pool = HTTPSessionPool(self.engine_name, limit=pool_limit, limit_per_host=pool_limit, keepalive_timeout=keepalive_timeout)
+        self._missing_voices = set() # 警告済みの見つからない声（合成のたびにログが出ないように）
+
+    @property
+    def speakers(self): return self.catalog.speakers # 話者一覧は同じエンジン種別のインスタンス間で共有
+
+    def resolve_voice_id(self, voice_model): return self._parse_voice_name(voice_model or self.default_voice) if self.speakers else None
+
+    def _parse_voice_name(self, name):
+        """"名前(スタイル)" を話者IDに変換する（カタログ更新時に作った索引を引くだけ）。見つからなければ既定の声で代用する。"""
+        index = self.catalog.index
+        sid = index.lookup(name, self.default_style)
+        if sid is not None: return sid
+        if name not in self._missing_voices and len(index):
+            self._missing_voices.add(name)
+            logger.warning(f"{self.log_name}: Voice '{name}' not found. Did you mean: {index.suggest(name) or '-'}")
+        sid = index.lookup(self.default_voice, self.default_style)
+        if sid is not None: return sid
+        for speaker_sid in index.first_style.values(): return speaker_sid
+        return self.fallback_speaker_id
+
+    def suggest_voices(self, voice_name, n=3):
+        """設定された声がエンジンに見つからないときの候補。見つかる場合や話者一覧がない場合は []。"""
+        index = self.catalog.index
+        if not voice_name or index.lookup(voice_name, self.default_style) is not None: return []
+        return index.suggest(voice_name, n=n)
+
+    async def _fetch_speakers(self):
+        async with self.http_pool.get_session().get(f"{self.base_url}/speakers", timeout=aiohttp.ClientTimeout(total=2)) as resp:
+            return await resp.json() if resp.status == 200 else None
+
+    async def refresh_speakers(self, force=False):
+        """話者カタログを更新する（TTL 内なら何もしない）。同時に呼ばれても取得は1回にまとめられる。"""
+        return await self.catalog.refresh(self._fetch_speakers, force=force)
+
     async def check_availability(self):
+        # 疎通確認を兼ねてカタログを強制更新する（同時の確認要求は1回の取得に合流）
+        self.is_available = await self.refresh_speakers(force=True)
+        if self.is_available: logger.info(f"{self.engine_name} OK, Speakers: {len(self.speakers)}")
+        return self.is_available
+
+    async def _refresh_and_close(self):
+        try: return await self.refresh_speakers()
+        finally: await self.http_pool.close()
+
+    async def _get_audio_query(self, session, text, sid):
+        """audio_query をキャッシュから取得し、なければエンジンに問い合わせてキャッシュする"""
+        aq = self.query_cache.get(sid, text)
+        if aq is not None: return aq
+        async with session.post(f"{self.base_url}/audio_query", params={'text':text,'speaker':sid}, timeout=aiohttp.ClientTimeout(total=5)) as r_aq:
+            if r_aq.status!=200: logger.error(f"{self.log_name} AQ Err: {r_aq.status}"); return None
+            aq = await r_aq.json()
+        self.query_cache.put(sid, text, aq)
+        return aq
+
+    async def synthesize_speech(self, text, voice_model=None, speed=1.0, **kwargs):
+        """audio_query → synthesis の2段階で合成する。話速・ピッチ・抑揚はキャッシュしたクエリに上書きする。"""
+        # 疎通確認はしない（呼べるかどうかは EngineHealthMonitor のブレーカーが決める）。
+        # 話者が1人も分からないときだけ、TTL と失敗後の間隔を守って一覧を取得する
+        if not self.speakers and not await self.refresh_speakers(): return []
+        sid = self._parse_voice_name(voice_model or self.default_voice)
         try:
-            async with aiohttp.ClientSession() as s, s.get(f"{self.base_url}/speakers", timeout=2) as resp:
-                if resp.status == 200: self.speakers = await resp.json(); self.is_available = True; return True
-        except Exception: pass
-        self.is_available = False; return False
+            s = self.http_pool.get_session()
+            aq = await self._get_audio_query(s, text, sid)
+            if aq is None: return []
+            if 'speedScale' in aq: aq['speedScale'] = speed
+            for arg_name, query_key in self.QUERY_OVERRIDES.items():
+                if kwargs.get(arg_name) is not None and query_key in aq: aq[query_key] = kwargs[arg_name]
+            async with s.post(f"{self.base_url}/synthesis", params={'speaker':sid}, json=aq, timeout=aiohttp.ClientTimeout(total=20)) as r_sy:
+                if r_sy.status!=200: logger.error(f"{self.log_name} Synth Err: {r_sy.status}"); return []
+                data = await r_sy.read()
+            return [AudioClip.from_wav_bytes(data, source=self.engine_name)]
+        except Exception as e: logger.error(f"{self.log_name} Error: {e}"); return []
+
+    def ensure_speakers_sync(self):
+        """
+        同期コード（UI）向け。カタログが古ければ更新する。
+        話者が1人も分かっていない場合だけその場で取得を待ち、古い一覧がある場合は別スレッドで更新してすぐ戻る。
+        実行中のイベントループ内から呼ばれても asyncio.run で衝突しない。
+        """
+        if self.catalog.is_fresh(): return
+        try: asyncio.get_running_loop(); in_loop = True
+        except RuntimeError: in_loop = False
+        if self.speakers or in_loop:
+            threading.Thread(target=lambda: asyncio.run(self._refresh_and_close()), daemon=True).start()
+        else:
+            asyncio.run(self._refresh_and_close())
+
+class AvisSpeechEngineAPI(LocalSpeakerEngineBase):
+    engine_name = "avis_speech"
+    log_name = "AvisSpeech"
+    default_voice = "Anneli(ノーマル)"
+    fallback_speaker_id = 888753760
+    def __init__(self, pool_limit=8, keepalive_timeout=30.0):
+        super().__init__("http://127.0.0.1:10101", 1000, pool_limit, keepalive_timeout)
     def get_available_voices(self):
-        if not self.is_available and not self.speakers: # speakersが空でもcheck_availabilityを試みる
-             try: asyncio.run(self.check_availability())
-             except RuntimeError: # Already in a running loop
-                 pass # Let it proceed, might be called from async context later
-        return [f"{s['name']}({style['name']})" for s in self.speakers for style in s.get('styles', [])] or ["Anneli(ノーマル)"] # Fallback
+        self.ensure_speakers_sync()
+        return list(self.catalog.index.by_name) or ["Anneli(ノーマル)"] # Fallback
     def get_max_text_length(self): return self.max_length
     def get_engine_info(self): return {"name": "Avis Speech", "cost": "無料", "quality": "★★★★☆", "description": "ローカル・高品質"}
-    def _parse_voice_name(self, name):
-        try:
-            s_name, st_name = (name.split('(')[0], name.split('(')[1][:-1]) if '(' in name else (name, None)
-            for s in self.speakers:
-                if s['name'] == s_name:
-                    for st in s.get('styles', []):
-                        if st_name is None or st['name'] == st_name: return st['id']
-            return self.speakers[0]['styles'][0]['id'] if self.speakers and self.speakers[0].get('styles') else 888753760
-        except: return 888753760
-    async def synthesize_speech(self, text, voice_model="Anneli(ノーマル)", speed=1.0, **kwargs):
-        if not self.is_available and not await self.check_availability(): return []
-        sid = self._parse_voice_name(voice_model)
-        try:
-            async with aiohttp.ClientSession() as s:
-                async with s.post(f"{self.base_url}/audio_query", params={'text':text,'speaker':sid}, timeout=5) as r_aq:
-                    if r_aq.status!=200: logger.error(f"Avis AQ Err: {r_aq.status}"); return []
-                    aq = await r_aq.json()
-                if 'speedScale' in aq: aq['speedScale'] = speed
-                async with s.post(f"{self.base_url}/synthesis", params={'speaker':sid}, json=aq, timeout=20) as r_sy:
-                    if r_sy.status!=200: logger.error(f"Avis Synth Err: {r_sy.status}"); return []
-                    data = await r_sy.read()
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tf: tf.write(data); fname=tf.name
-                    return [fname]
-        except Exception as e: logger.error(f"AvisSpeech Error: {e}"); return []
-
-class VOICEVOXEngineAPI(VoiceEngineBase):
-    def __init__(self): self.base_url = "http://127.0.0.1:50021"; self.max_length = 500; self.speakers = []; self.is_available = False
-    async def check_availability(self):
-        try:
-            self.speakers = [] # Reset before check
-            async with aiohttp.ClientSession() as s, s.get(f"{self.base_url}/speakers", timeout=2) as resp:
-                if resp.status == 200:
-                    self.speakers = await resp.json()
-                    if self.speakers: self.is_available = True; logger.info(f"VOICEVOX OK, Speakers: {len(self.speakers)}"); return True
-                    logger.warning("VOICEVOX OK, but no speakers.")
-        except Exception as e: logger.warning(f"VOICEVOX connection error: {e}")
-        self.is_available = False; return False
+
+
+class VOICEVOXEngineAPI(LocalSpeakerEngineBase):
+    engine_name = "voicevox"
+    log_name = "VOICEVOX"
+    default_voice = "ずんだもん(ノーマル)"
+    default_style = "ノーマル"
+    fallback_speaker_id = 3 # ずんだもん(ノーマル)
+    def __init__(self, pool_limit=8, keepalive_timeout=30.0):
+        super().__init__("http://127.0.0.1:50021", 500, pool_limit, keepalive_timeout)
     def get_available_voices(self):
-        if not self.is_available and not self.speakers:
-            try: asyncio.run(self.check_availability())
-            except RuntimeError: pass
-        return sorted([f"{s['name']}({st['name']})" for s in self.speakers for st in s.get('styles',[])]) or ["ずんだもん(ノーマル)"]
+        self.ensure_speakers_sync()
+        return sorted(self.catalog.index.by_name) or ["ずんだもん(ノーマル)"]
     def get_max_text_length(self): return self.max_length
     def get_engine_info(self): return {"name": "VOICEVOX", "cost": "無料", "quality": "★★★☆☆", "description": "ローカル・キャラクター多数"}
-    def _parse_voice_name(self, name):
-        try:
-            s_name, st_name = (name.split('(')[0], name.split('(')[1][:-1]) if '(' in name else (name, "ノーマル")
-            if self.speakers:
-                for s_info in self.speakers:
-                    if s_info.get('name') == s_name:
-                        for style_info in s_info.get('styles', []):
-                            if style_info.get('name') == st_name: return style_info['id']
-            # Fallback for common characters if speakers list is not populated or match fails
-            mapping = {"ずんだもん": {"ノーマル": 3, "あまあま":1}, "四国めたん": {"ノーマル": 2}, "春日部つむぎ": {"ノーマル": 8}}
-            return mapping.get(s_name, {}).get(st_name, 3) # Default to Zundamon Normal
-        except: return 3
-    async def synthesize_speech(self, text, voice_model="ずんだもん(ノーマル)", speed=1.0, **kwargs):
-        if not self.is_available and not await self.check_availability(): return []
-        sid = self._parse_voice_name(voice_model)
-        try:
-            async with aiohttp.ClientSession() as s:
-                async with s.post(f"{self.base_url}/audio_query", params={'text':text,'speaker':sid}, timeout=5) as r_aq:
-                    if r_aq.status!=200: logger.error(f"VOICEVOX AQ Err: {r_aq.status}"); return []
-                    aq = await r_aq.json()
-                if 'speedScale' in aq: aq['speedScale'] = speed
-                async with s.post(f"{self.base_url}/synthesis", params={'speaker':sid}, json=aq, timeout=20) as r_sy:
-                    if r_sy.status!=200: logger.error(f"VOICEVOX Synth Err: {r_sy.status}"); return []
-                    data = await r_sy.read()
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tf: tf.write(data); fname=tf.name
-                    return [fname]
-        except Exception as e: logger.error(f"VOICEVOX Error: {e}"); return []
+
 
 class SystemTTSAPI(VoiceEngineBase):
     def __init__(self):
@@ -165,6 +227,7 @@ class SystemTTSAPI(VoiceEngineBase):
     def get_available_voices(self): return self.voice_models
     def get_max_text_length(self): return self.max_length
     def get_engine_info(self): return {"name": "System TTS", "cost": "無料", "quality": "★★☆☆☆", "description": "OS標準・オフライン"}
+    def resolve_voice_id(self, voice_model): return voice_model or self.default_voice
     async def synthesize_speech(self, text, voice_model=None, speed=1.0, **kwargs):
         voice_model = voice_model or self.default_voice
         with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tf: fname = tf.name
@@ -173,7 +236,9 @@ class SystemTTSAPI(VoiceEngineBase):
             if self.system == "Windows": success = await self._windows_tts(text, fname, voice_model, speed)
             elif self.system == "Darwin": success = await self._macos_tts(text, fname, voice_model, speed)
             else: success = await self._linux_tts(text, fname, voice_model, speed)
-            if success and os.path.exists(fname) and os.path.getsize(fname) > 44: return [fname]
+            # OS の TTS コマンドはファイルにしか出力できないため、読み込んだら一時ファイルは消す
+            if success and os.path.exists(fname) and os.path.getsize(fname) > 44:
+                clip = AudioClip.from_wav_file(fname, source="system_tts"); os.unlink(fname); return [clip]
             if os.path.exists(fname): os.unlink(fname)
             return []
         except Exception as e: logger.error(f"SystemTTS Error: {e}"); 
@@ -208,6 +273,40 @@ class AudioPlayer:
         self.system = platform.system()
         self.config_manager = config_manager
 
+    def _get_setting(self, key, default=None):
+        return self.config_manager.get_system_setting(key, default) if self.config_manager else default
+
+    def get_output_sink(self):
+        """常駐 PCM 出力シンク。設定で無効化されているか、使えるバックエンドがなければ None（サブプロセス再生）"""
+        mode = self._get_setting("audio_output_sink", "auto")
+        if mode == "subprocess": return None
+        return get_pcm_sink(self._get_setting("audio_output_device", "default"), mode, float(self._get_setting("audio_output_buffer_seconds", 2.0)))
+
+    def get_output_stats(self):
+        sink = self.get_output_sink()
+        return sink.get_stats() if sink else {"backend": "subprocess"}
+
+    def flush_output(self):
+        """キューに積まれた未再生の音声を破棄する"""
+        sink = self.get_output_sink()
+        return sink.flush() if sink else 0
+
+    def enqueue_audio_files(self, audio_files, continuous=False, delay_between=0.0):
+        """
+        シンクのキューに積むだけで待たずに返る。各クリップの再生完了 Future のリストを返す。
+        シンクが使えない場合や読み込めないファイルがある場合は None（呼び出し側で play_audio_files を使う）。
+        """
+        sink = self.get_output_sink()
+        if sink is None: return None
+        try: clips = [a if isinstance(a, AudioClip) else AudioClip.from_wav_file(a) for a in audio_files]
+        except Exception as e: logger.debug(f"AudioPlayer: Cannot queue files to sink: {e}"); return None
+        futures = []
+        for i, clip in enumerate(clips):
+            futures.append(sink.enqueue(clip, continuous=continuous or i > 0))
+            if delay_between > 0 and i < len(clips) - 1: # 間隔も無音として積めば、タイミングがずれない
+                sink.enqueue(AudioClip.silence(delay_between, *clip.format()), continuous=True)
+        return futures
+
     def get_available_output_devices(self):
         devices = [{"name": "デフォルト", "id": "default"}]
         try:
@@ -287,25 +386,56 @@ class AudioPlayer:
         return final_devices
 
     async def play_audio_files(self, audio_files, delay_between=0.05):
-        for i, audio_file in enumerate(audio_files):
-            if os.path.exists(audio_file):
-                logger.info(f"Playing {i+1}/{len(audio_files)}: {os.path.basename(audio_file)}")
-                await self.play_audio_file(audio_file)
-                if delay_between > 0 and i < len(audio_files) - 1: await asyncio.sleep(delay_between)
-                try: await asyncio.to_thread(os.unlink, audio_file)
-                except Exception as del_e: logger.warning(f"Failed to delete temp audio file {audio_file}: {del_e}")
+        """AudioClip またはファイルパスのリストを順に再生する。ファイルパスは再生後に削除する（一時ファイル前提）。"""
+        audio_files = [a for a in audio_files if isinstance(a, AudioClip) or os.path.exists(a)]
+        futures = self.enqueue_audio_files(audio_files, delay_between=delay_between)
+        if futures is not None:
+            failed = await self.wait_for_playback(futures, audio_files)
+            for audio in audio_files:
+                if not isinstance(audio, AudioClip) and audio not in failed:
+                    try: await asyncio.to_thread(os.unlink, audio)
+                    except Exception as del_e: logger.warning(f"Failed to delete temp audio file {audio}: {del_e}")
+            if not failed: return
+            audio_files = failed # シンクが途中で使えなくなった分は従来の方法で再生する
+        for i, audio in enumerate(audio_files):
+            is_clip = isinstance(audio, AudioClip)
+            if not is_clip and not os.path.exists(audio): continue
+            logger.info(f"Playing {i+1}/{len(audio_files)}: {audio if is_clip else os.path.basename(audio)}")
+            await self.play_audio_file(audio)
+            if delay_between > 0 and i < len(audio_files) - 1: await asyncio.sleep(delay_between)
+            if not is_clip:
+                try: await asyncio.to_thread(os.unlink, audio)
+                except Exception as del_e: logger.warning(f"Failed to delete temp audio file {audio}: {del_e}")
+    async def wait_for_playback(self, futures, audio_files):
+        """enqueue_audio_files の Future を待ち、シンクの故障で再生できなかった音声のリストを返す"""
+        failed = []
+        for future, audio in zip(futures, audio_files):
+            try: await asyncio.wrap_future(future)
+            except Exception as e: logger.warning(f"AudioPlayer: Sink playback failed, falling back: {e}"); failed.append(audio)
+        return failed
+
     async def play_audio_file(self, audio_file):
         try:
+            futures = self.enqueue_audio_files([audio_file])
+            if futures is not None and not await self.wait_for_playback(futures, [audio_file]): return
             if self.system == "Windows": await self._play_windows(audio_file)
             elif self.system == "Darwin": await self._play_macos(audio_file)
             else: await self._play_linux(audio_file)
         except Exception as e: logger.error(f"Error playing audio file {audio_file}: {e}")
 
+    @staticmethod
+    def _as_path(audio):
+        """外部コマンド用にファイルパスを得る。AudioClip の場合だけ一時ファイルを書き出す（戻り値2つ目が True なら呼び出し側で削除）"""
+        if isinstance(audio, AudioClip): return audio.to_temp_file(), True
+        return str(audio), False
+
     async def _play_windows(self, audio_file):
         dev_id = self.config_manager.get_system_setting("audio_output_device", "default") if self.config_manager else "default"
         try:
             if dev_id != "default": logger.warning(f"Windows: Device specific playback for '{dev_id}' not fully supported, using default.")
             import winsound
+            if isinstance(audio_file, AudioClip): # メモリ上の WAV をそのまま再生（SND_MEMORY は非同期再生できないためスレッドで待つ）
+                await asyncio.to_thread(winsound.PlaySound, audio_file.to_wav_bytes(), winsound.SND_MEMORY); return
             await asyncio.to_thread(winsound.PlaySound, audio_file, winsound.SND_FILENAME | winsound.SND_NOWAIT) # Use SND_NOWAIT for async
             # Since SND_NOWAIT returns immediately, we need a way to know when it's done if we need to wait.
             # For simplicity here, we assume it plays and moves on. If precise timing or waiting is needed,
@@ -315,38 +445,51 @@ class AudioPlayer:
         except Exception as e:
             logger.error(f"Windows playback error (winsound): {e}. Trying PowerShell fallback.")
             # PowerShell fallback can be blocking, consider if this is acceptable.
-            ps_script = f'$player=New-Object System.Media.SoundPlayer("{audio_file}");$player.PlaySync();$player.Dispose()'
-            proc = await asyncio.create_subprocess_exec("powershell", "-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", ps_script, stderr=asyncio.subprocess.PIPE)
-            _, stderr = await proc.communicate()
-            if proc.returncode != 0: logger.error(f"PowerShell playback error: {stderr.decode(errors='ignore')}")
+            path, is_temp = self._as_path(audio_file)
+            try:
+                ps_script = f'$player=New-Object System.Media.SoundPlayer("{path}");$player.PlaySync();$player.Dispose()'
+                proc = await asyncio.create_subprocess_exec("powershell", "-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", ps_script, stderr=asyncio.subprocess.PIPE)
+                _, stderr = await proc.communicate()
+                if proc.returncode != 0: logger.error(f"PowerShell playback error: {stderr.decode(errors='ignore')}")
+            finally:
+                if is_temp: os.unlink(path)
 
     async def _play_macos(self, audio_file):
+        path, is_temp = self._as_path(audio_file) # afplay は標準入力から読めないためファイルが必要
         try:
-            proc = await asyncio.create_subprocess_exec("afplay", audio_file)
+            proc = await asyncio.create_subprocess_exec("afplay", path)
             await proc.wait()
         except Exception as e: logger.error(f"macOS afplay error: {e}")
+        finally:
+            if is_temp: os.unlink(path)
     async def _play_linux(self, audio_file):
         dev_id = self.config_manager.get_system_setting("audio_output_device", "default") if self.config_manager else "default"
+        is_clip = isinstance(audio_file, AudioClip)
         cmd_list = ["aplay"]
         if dev_id != "default": cmd_list.extend(["-D", dev_id])
-        cmd_list.append(audio_file)
+        cmd_list.append("-" if is_clip else audio_file) # AudioClip は標準入力に WAV を流し込む
         try:
-            proc = await asyncio.create_subprocess_exec(*cmd_list, stderr=asyncio.subprocess.PIPE)
-            _, stderr = await proc.communicate()
+            proc = await asyncio.create_subprocess_exec(*cmd_list, stdin=asyncio.subprocess.PIPE if is_clip else None, stderr=asyncio.subprocess.PIPE)
+            _, stderr = await proc.communicate(audio_file.to_wav_bytes() if is_clip else None)
             if proc.returncode != 0:
                 logger.warning(f"aplay failed (code {proc.returncode}): {stderr.decode(errors='ignore')}. Trying paplay.")
-                cmd_list = ["paplay"]
-                if dev_id != "default": cmd_list.extend(["--device", dev_id])
-                cmd_list.append(audio_file)
-                proc_pa = await asyncio.create_subprocess_exec(*cmd_list, stderr=asyncio.subprocess.PIPE)
-                _, stderr_pa = await proc_pa.communicate()
-                if proc_pa.returncode != 0: logger.error(f"paplay failed: {stderr_pa.decode(errors='ignore')}")
+                path, is_temp = self._as_path(audio_file)
+                try:
+                    cmd_list = ["paplay"]
+                    if dev_id != "default": cmd_list.extend(["--device", dev_id])
+                    cmd_list.append(path)
+                    proc_pa = await asyncio.create_subprocess_exec(*cmd_list, stderr=asyncio.subprocess.PIPE)
+                    _, stderr_pa = await proc_pa.communicate()
+                    if proc_pa.returncode != 0: logger.error(f"paplay failed: {stderr_pa.decode(errors='ignore')}")
+                finally:
+                    if is_temp: os.unlink(path)
         except FileNotFoundError: logger.error("aplay/paplay not found on Linux.")
         except Exception as e: logger.error(f"Linux playback error: {e}")
 
 
 class VoiceEngineManager:
-    def __init__(self):
+    def __init__(self, config_manager=None):
+        self.config_manager = config_manager
         self.engines = {
             "google_ai_studio_new": GoogleAIStudioNewVoiceAPI(),
             "avis_speech": AvisSpeechEngineAPI(),
@@ -361,35 +504,396 @@ class VoiceEngineManager:
             "voicevox",
             "system_tts"
         ]
+        for name in ("avis_speech", "voicevox"): # スタンドインサーバーや別ホストのエンジンを使う場合に上書きする
+            base_url = self._get_setting(f"{name}_url")
+            if base_url: self.engines[name].base_url = base_url.rstrip("/")
+        self._configure_http_pools()
+        for engine in self.engines.values():
+            if hasattr(engine, 'catalog'): engine.catalog.ttl = float(self._get_setting("speaker_catalog_ttl", 300.0))
+        self.synthesis_cache = get_synthesis_cache(
+            cache_dir=self._get_setting("voice_cache_dir", "voice_cache"),
+            max_bytes=int(self._get_setting("voice_cache_max_mb", 200)) * 1024 * 1024,
+            enabled=self._get_setting("voice_cache_enabled", True))
+        self.metrics = VoiceMetrics()
+        self.telemetry = get_voice_telemetry()
+        self.scoreboard = get_engine_scoreboard(self._get_setting("voice_priority_scores_file", "engine_scores.json"))
+        self.scoreboard.failure_penalty = float(self._get_setting("voice_priority_failure_penalty", self.scoreboard.failure_penalty))
+        self.postprocessor = AudioPostProcessor(
+            sample_rate=int(self._get_setting("voice_postprocess_sample_rate", 24000)),
+            trim_threshold_db=float(self._get_setting("voice_postprocess_trim_threshold_db", -45.0)),
+            normalize=self._get_setting("voice_postprocess_normalize", "peak"),
+            enabled=self._get_setting("voice_postprocess_enabled", True))
+        self._engine_semaphores = {} # {event_loop: {engine_name: asyncio.Semaphore}}
+        self._semaphores_lock = threading.Lock()
+        self.health = EngineHealthMonitor(
+            self.engines,
+            failure_threshold=int(self._get_setting("voice_breaker_failure_threshold", 3)),
+            backoff_base=float(self._get_setting("voice_breaker_backoff_base", 5.0)),
+            backoff_max=float(self._get_setting("voice_breaker_backoff_max", 120.0)))
+
+    def _get_setting(self, key, default=None):
+        return self.config_manager.get_system_setting(key, default) if self.config_manager else default
+
+    def _configure_http_pools(self):
+        """ローカルエンジンのキープアライブ接続プールを設定値で構成する"""
+        limit = self._get_setting("voice_http_pool_limit", 8)
+        keepalive = self._get_setting("voice_http_keepalive_timeout", 30.0)
+        for engine in self.engines.values():
+            if hasattr(engine, 'http_pool'): engine.http_pool.configure(limit=limit, limit_per_host=limit, keepalive_timeout=keepalive)
+            if hasattr(engine, 'query_cache'): engine.query_cache.configure(max_entries=self._get_setting("voice_audio_query_cache_size", 256))
+
+    def get_http_pool_stats(self):
+        """エンジンごとの接続プール統計（新規接続数・再利用数など）を返す"""
+        return {name: e.http_pool.get_stats() for name, e in self.engines.items() if hasattr(e, 'http_pool')}
+
+    async def close(self):
+        """現在のイベントループで開いている HTTP セッションを全エンジン分閉じ、エンジンのスコアを保存する"""
+        for name, engine in self.engines.items():
+            if not hasattr(engine, 'http_pool'): continue
+            try: await engine.http_pool.close()
+            except Exception as e: logger.warning(f"Failed to close HTTP pool for {name}: {e}")
+        self.scoreboard.save(force=True) # 学習したスコアの未保存分を書き出す
+
     def get_engine_instance(self, name): return self.engines.get(name)
     def set_engine(self, name): self.current_engine = name if name in self.engines else self.current_engine; return name in self.engines
     def get_current_engine(self): return self.engines[self.current_engine]
     def get_available_engines(self): return list(self.engines.keys())
     def get_engine_info(self, name): return self.engines[name].get_engine_info() if name in self.engines else {}
-    async def check_engines_availability(self): return {name: (await e.check_availability() if hasattr(e, 'check_availability') else True) for name, e in self.engines.items()}
-    async def synthesize_with_fallback(self, text, voice_model, speed=1.0, preferred_engine=None, api_key=None):
-        order = ([preferred_engine] if preferred_engine and preferred_engine in self.engines else []) + \
-                  [p for p in self.priority if p != preferred_engine]
-        if not order and self.priority: order = self.priority # preferred_engine が無効な場合、デフォルト優先度を使用
+    async def check_engines_availability(self):
+        results = {name: (await e.check_availability() if hasattr(e, 'check_availability') else True) for name, e in self.engines.items()}
+        for name, ok in results.items(): self.health.record_probe(name, ok) # 明示的な確認結果もブレーカーに反映
+        return results
+    def get_engine_health(self): return self.health.snapshot()
+    def suggest_voices(self, engine_name, voice_model, n=3):
+        """設定された声がエンジンに見つからないときの似た名前の候補（話者カタログを持つローカルエンジンのみ）"""
+        engine = self.engines.get(engine_name)
+        return engine.suggest_voices(voice_model, n=n) if hasattr(engine, 'suggest_voices') else []
+    async def refresh_speaker_catalogs(self, force=False):
+        """ローカルエンジンの話者カタログを並行して更新する"""
+        names = [n for n, e in self.engines.items() if hasattr(e, 'refresh_speakers')]
+        results = await asyncio.gather(*(self.engines[n].refresh_speakers(force=force) for n in names), return_exceptions=True)
+        return {n: r is True for n, r in zip(names, results)}
+    async def warm_up_engine(self, engine_name, voice_model=None, text="テスト", api_key=None):
+        """短いダミー発話を1回合成してエンジンを温める（モデル読み込み・接続確立）。キャッシュ・後処理は通さない。"""
+        engine = self.engines.get(engine_name)
+        if engine is None: return False
+        kwargs_synth = {'api_key': api_key} if "google_ai_studio" in engine_name else {}
+        try:
+            async with self._engine_semaphore(engine_name):
+                files = await engine.synthesize_speech(text, voice_model, 1.0, **kwargs_synth) # 初回は遅いのでレイテンシ窓には記録しない
+        except asyncio.CancelledError: raise
+        except Exception as e: logger.warning(f"Warm-up synthesis failed for {engine_name}: {e}"); return False
+        if files: self.health.record_success(engine_name)
+        return bool(files)
+    def _synthesis_cache_key(self, engine_name, text, voice_model, speed):
+        try: voice_id = self.engines[engine_name].resolve_voice_id(voice_model)
+        except Exception: voice_id = None
+        return SynthesisCache.make_key(engine_name, voice_id, speed, text) if voice_id is not None else None
+
+    def get_engine_concurrency(self, engine_name):
+        """エンジンへの同時合成リクエスト数の上限（ローカルサーバーが捌ける数に合わせて設定で調整する）"""
+        limits = self._get_setting("voice_engine_concurrency", {}) or {}
+        return max(1, int(limits.get(engine_name, DEFAULT_ENGINE_CONCURRENCY.get(engine_name, 2))))
+
+    def _engine_semaphore(self, engine_name):
+        """実行中のイベントループ用のエンジン別セマフォ（UI はスレッドごとにループを作るため、ループ単位で持つ）"""
+        loop = asyncio.get_running_loop()
+        with self._semaphores_lock:
+            for stale in [l for l in self._engine_semaphores if l.is_closed()]: del self._engine_semaphores[stale]
+            per_loop = self._engine_semaphores.setdefault(loop, {})
+            if engine_name not in per_loop: per_loop[engine_name] = asyncio.Semaphore(self.get_engine_concurrency(engine_name))
+            return per_loop[engine_name]
+
+    def get_cache_stats(self): return self.synthesis_cache.get_stats()
+    def get_telemetry_snapshot(self): return self.telemetry.snapshot()
+    def dump_telemetry(self, path): return self.telemetry.dump_json(path)
+    def _telemetry_voice(self, engine_name, voice_model):
+        """テレメトリの集計単位にする声の名前（話者IDはエンジンのバージョンで変わりうるため、名前で集計する）"""
+        return voice_model or getattr(self.engines[engine_name], 'default_voice', None) or "default"
+    def get_postprocess_stats(self): return self.postprocessor.get_stats()
+    def get_audio_query_cache_stats(self): return {name: e.query_cache.get_stats() for name, e in self.engines.items() if hasattr(e, 'query_cache')}
+    def invalidate_character_cache(self, character_id): return self.synthesis_cache.invalidate_character(character_id)
+
+    async def _synthesize_on_engine(self, engine_name, text, voice_model, speed, api_key=None, character_id=None):
+        """1エンジンで合成を試みる（キャッシュ確認・ブレーカー判定・レイテンシ記録込み）。失敗時は []。"""
+        try:
+            engine = self.engines[engine_name]
+            cache_key = self._synthesis_cache_key(engine_name, text, voice_model, speed)
+            cached_files = self.synthesis_cache.get(cache_key)
+            if cached_files:
+                logger.info(f"✅ Synthesis cache hit for {engine_name}")
+                self.telemetry.record_cache_hit(engine_name, self._telemetry_voice(engine_name, voice_model))
+                return cached_files
+            # 毎回の疎通確認は行わず、サーキットブレーカーの状態で判断する（open 中はコストゼロでスキップ）
+            if not self.health.allow_request(engine_name):
+                logger.info(f"⏭️ Engine {engine_name} skipped (circuit {self.health.get_state(engine_name)})"); return []
+            try: files = await self._synthesize_within_limit(engine_name, text, voice_model, speed, api_key)
+            except asyncio.CancelledError: self.health.abandon_request(engine_name); raise
+            except Exception: self.health.record_failure(engine_name); raise
+
+            if files:
+                self.health.record_success(engine_name)
+                logger.info(f"✅ Synthesis successful with {engine_name}")
+                if len(files) == 1:
+                    cache_key = cache_key or self._synthesis_cache_key(engine_name, text, voice_model, speed) # 話者一覧取得後なら解決できる
+                    self.synthesis_cache.put(cache_key, files[0], engine_name, engine.resolve_voice_id(voice_model), speed, text, character_id)
+                return files
+            self.health.record_failure(engine_name)
+            logger.warning(f"⚠️ Synthesis failed with {engine_name}")
+        except Exception as e_synth: logger.error(f"❌ Error during synthesis with {engine_name}: {e_synth}")
+        return []
+
+    async def _call_engine(self, engine_name, text, voice_model, speed, api_key=None):
+        """エンジンの synthesize_speech を同時実行数の制限内で呼び、成功時のレイテンシを記録する"""
+        engine = self.engines[engine_name]
+        kwargs_synth = {'api_key': api_key} if "google_ai_studio" in engine_name else {}
+        voice = self._telemetry_voice(engine_name, voice_model)
+        queued = time.perf_counter()
+        async with self._engine_semaphore(engine_name):
+            # voice_modelがNoneの場合、エンジン側のデフォルトを使用させるか、ここでエラーとするか。
+            # 現状はエンジン側の実装に任せる。
+            started = time.perf_counter() # セマフォ待ちはレイテンシに含めない
+            try: files = await engine.synthesize_speech(text, voice_model, speed, **kwargs_synth)
+            except Exception:
+                self.telemetry.record_request(engine_name, voice, started - queued, time.perf_counter() - started, ok=False)
+                self.scoreboard.record(engine_name, False); raise
+        elapsed = time.perf_counter() - started
+        if files: self.metrics.record_latency(engine_name, elapsed)
+        self.scoreboard.record(engine_name, bool(files), elapsed if files else None)
+        clips = [f for f in files if isinstance(f, AudioClip)]
+        self.telemetry.record_request(engine_name, voice, started - queued, elapsed, nbytes=sum(c.nbytes for c in clips),
+                                      audio_seconds=sum(c.duration for c in clips), ok=bool(files))
+        return files
+
+    async def _synthesize_within_limit(self, engine_name, text, voice_model, speed, api_key=None):
+        """
+        エンジンの最大文字数を超えるテキストは句読点で分割して並行合成し、1つのクリップにつなげて返す。
+        1断片でも失敗したら [] を返す（途中が抜けた音声は使わない）。
+        """
+        max_length = self.engines[engine_name].get_max_text_length()
+        segments = split_for_length(text, max_length) if max_length and len(text) > max_length else [text]
+        if len(segments) <= 1: return await self._call_engine(engine_name, text, voice_model, speed, api_key)
+        logger.info(f"✂️ Splitting {len(text)} chars into {len(segments)} segments for {engine_name} (max {max_length})")
+        tasks = [asyncio.create_task(self._call_engine(engine_name, segment, voice_model, speed, api_key)) for segment in segments]
+        try: results = await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                if not task.done(): task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if not all(results): return []
+        clips = [f if isinstance(f, AudioClip) else AudioClip.from_wav_file(f) for files in results for f in files]
+        return [AudioClip.concat(clips)]
+
+    def get_engine_order(self, preferred_engine=None, character_id=None):
+        """
+        合成を試すエンジンの順序。voice_priority_mode が "adaptive" なら、フォールバック先を学習したスコア順に並べる。
+        キャラクターが選んだエンジン (preferred_engine) は常に先頭に置き、学習結果で入れ替えない。
+        キャラクターの voice_settings.fallback_engines があれば、フォールバック先をその中に限定する。
+        """
+        fallbacks = [p for p in self.priority if p != preferred_engine]
+        char_data = self.config_manager.get_character(character_id) if self.config_manager and character_id and hasattr(self.config_manager, 'get_character') else None
+        allowed = ((char_data or {}).get('voice_settings') or {}).get('fallback_engines')
+        if allowed is not None: fallbacks = [p for p in fallbacks if p in allowed]
+        if self._get_setting("voice_priority_mode", "static") == "adaptive": fallbacks = self.scoreboard.rank(fallbacks)
+        order = ([preferred_engine] if preferred_engine and preferred_engine in self.engines else []) + fallbacks
+        if not order and self.priority and allowed is None: order = self.priority # preferred_engine が無効な場合、デフォルト優先度を使用
         elif not order and not self.priority: order = list(self.engines.keys())# 万が一priorityも空なら全エンジン
+        return order
 
-        for engine_name in order:
-            try:
+    def get_engine_scores(self): return self.scoreboard.snapshot()
+
+    async def synthesize_with_fallback(self, text, voice_model, speed=1.0, preferred_engine=None, api_key=None, character_id=None, allow_fallback=True):
+        """allow_fallback=False なら先頭のエンジン（preferred_engine）だけで合成し、失敗しても他のエンジンの声で代用しない"""
+        order = self.get_engine_order(preferred_engine, character_id)
+        if not allow_fallback: order = order[:1] if not preferred_engine or order[:1] == [preferred_engine] else []
+        if not order: logger.error("❌ No voice engine allowed for this character."); return []
+        if not self._get_setting("voice_coalesce_enabled", True):
+            return await self._synthesize_in_order(order, text, voice_model, speed, api_key, character_id)
+
+        # 同じ条件の合成が実行中なら、エンジンを呼ばずにその結果を待つ（シアターの再生と一括生成、複数ウィンドウの音声テストなど）
+        key = (tuple(order), text, voice_model, float(speed))
+        while True:
+            with _inflight_lock:
+                future = _inflight_syntheses.get(key)
+                is_leader = future is None
+                if is_leader: future = _inflight_syntheses[key] = concurrent.futures.Future()
+            if is_leader: break
+            self.telemetry.record_coalesced(order[0], self._telemetry_voice(order[0], voice_model))
+            files = await asyncio.shield(asyncio.wrap_future(future)) # 自分がキャンセルされても共有の合成は止めない
+            if files is not None: return [f.copy() if isinstance(f, AudioClip) else f for f in files] # 後段で書き換えても他の待ち手に影響しないように
+            # 先行した呼び出し元がキャンセルされた場合は、改めて自分で合成する
+        try:
+            files = await self._synthesize_in_order(order, text, voice_model, speed, api_key, character_id)
+        except BaseException as e:
+            with _inflight_lock: _inflight_syntheses.pop(key, None)
+            if isinstance(e, asyncio.CancelledError): future.set_result(None)
+            else: future.set_exception(e)
+            raise
+        with _inflight_lock: _inflight_syntheses.pop(key, None)
+        future.set_result(files)
+        return files
+
+    async def _synthesize_in_order(self, order, text, voice_model, speed, api_key, character_id):
+        """order の順にエンジンを試し（ヘッジ有効時は並行起動）、後処理済みの音声を返す"""
+        if self._get_setting("voice_hedging_enabled", False) and len(order) > 1:
+            files = await self._synthesize_hedged(order, text, voice_model, speed, api_key, character_id)
+            if files: return self.postprocessor.process_all(files)
+        else:
+            for attempt, engine_name in enumerate(order):
                 logger.info(f"Fallback: Trying engine {engine_name}")
-                engine = self.engines[engine_name]
-                if hasattr(engine, 'check_availability') and not await engine.check_availability():
-                    logger.warning(f"⚠️ Engine {engine_name} is not available."); continue
-
-                kwargs_synth = {'api_key': api_key} if "google_ai_studio" in engine_name else {}
-                # voice_modelがNoneの場合、エンジン側のデフォルトを使用させるか、ここでエラーとするか。
-                # 現状はエンジン側の実装に任せる。
-                files = await engine.synthesize_speech(text, voice_model, speed, **kwargs_synth)
-
-                if files: logger.info(f"✅ Synthesis successful with {engine_name}"); return files
-                logger.warning(f"⚠️ Synthesis failed with {engine_name}")
-            except Exception as e_synth: logger.error(f"❌ Error during synthesis with {engine_name}: {e_synth}"); continue
+                files = await self._synthesize_on_engine(engine_name, text, voice_model, speed, api_key, character_id)
+                if files:
+                    if attempt: self.telemetry.record_fallback(order[0], engine_name)
+                    return self.postprocessor.process_all(files) # エンジン間の音量・無音・フォーマットの差をそろえる
         logger.error("❌ All voice engines failed to synthesize."); return []
 
+    async def synthesize_many(self, items, ordered=False):
+        """
+        複数テキストをまとめて合成する非同期ジェネレーター。
+        items の各要素は synthesize_with_fallback の引数を持つ dict（text, voice_model, speed, preferred_engine, api_key, character_id, allow_fallback）か文字列。
+        エンジンごとの同時実行数は get_engine_concurrency() で制限される。
+        結果は ordered=True なら入力順、False なら完了順に {"index", "item", "files", "error"} を返す。
+        1件の失敗でバッチ全体は止まらず、その要素の error に理由が入る。
+        """
+        async def run(index, item):
+            kwargs = {"text": item} if isinstance(item, str) else dict(item)
+            text = kwargs.pop("text", "")
+            try:
+                files = await self.synthesize_with_fallback(text, kwargs.pop("voice_model", None), **kwargs)
+                return {"index": index, "item": item, "files": files, "error": None if files else "All voice engines failed"}
+            except Exception as e:
+                logger.error(f"synthesize_many: Item {index} failed: {e}")
+                return {"index": index, "item": item, "files": [], "error": str(e)}
+
+        tasks = [asyncio.create_task(run(i, item)) for i, item in enumerate(items)]
+        try:
+            for next_result in (tasks if ordered else asyncio.as_completed(tasks)):
+                yield await next_result
+        finally: # 途中で打ち切られたら残りをキャンセルする
+            for task in tasks:
+                if not task.done(): task.cancel()
+            if tasks: await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _hedge_delay(self, engine_name):
+        """このエンジンの応答をどこまで待ってから次のエンジンを並行起動するか（秒）"""
+        q = float(self._get_setting("voice_hedge_percentile", 0.9))
+        delay = self.metrics.latency_percentile(engine_name, q)
+        if delay is None: delay = float(self._get_setting("voice_hedge_default_delay", 1.5)) # 実績が少ないうちは固定値
+        return max(float(self._get_setting("voice_hedge_min_delay", 0.3)), delay)
+
+    async def _synthesize_hedged(self, order, text, voice_model, speed, api_key, character_id):
+        """
+        ヘッジ合成: 先頭エンジンが過去レイテンシの指定パーセンタイル以内に返らなければ、次のエンジンを並行起動する。
+        最初に成功した結果を採用し、残りはキャンセルする。失敗したら順に次のエンジンへ進む。
+        """
+        max_parallel = max(1, int(self._get_setting("voice_hedge_max_parallel", 2)))
+        remaining = list(order)
+        pending = {} # {task: (engine_name, started_at, is_hedge)}
+        started = time.perf_counter()
+        report = {"engines": [], "winner": None, "hedges_launched": 0, "hedge_won": False, "wasted_seconds": 0.0, "latency_saved_seconds": 0.0}
+
+        def launch_next(is_hedge):
+            if not remaining: return False
+            name = remaining.pop(0)
+            task = asyncio.create_task(self._synthesize_on_engine(name, text, voice_model, speed, api_key, character_id))
+            pending[task] = (name, time.perf_counter(), is_hedge)
+            report["engines"].append(name)
+            if is_hedge: report["hedges_launched"] += 1; logger.info(f"🏁 Hedge: Starting {name} in parallel")
+            return True
+
+        launch_next(False)
+        winner_files = []
+        try:
+            while pending and not winner_files:
+                oldest_name, oldest_started, _ = next(iter(pending.values()))
+                timeout = None
+                if remaining and len(pending) < max_parallel: # 待ち時間はループのたびではなく、そのエンジンを起動した時刻から数える
+                    timeout = max(0.0, oldest_started + self._hedge_delay(oldest_name) - time.perf_counter())
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done: launch_next(True); continue
+                for task in done:
+                    name, task_started, is_hedge = pending.pop(task)
+                    files = task.result()
+                    if files and not winner_files:
+                        winner_files = files
+                        report.update({"winner": name, "hedge_won": is_hedge})
+                    elif files: # 同時に完了した2つ目以降の結果は破棄（メモリ上の AudioClip なので片付け不要）
+                        report["wasted_seconds"] += time.perf_counter() - task_started
+                    elif not winner_files:
+                        report["wasted_seconds"] += time.perf_counter() - task_started
+                if not winner_files and not pending: launch_next(False) # 全て失敗したら通常のフォールバックと同様に次へ
+        finally:
+            now = time.perf_counter()
+            for task, (name, task_started, _) in pending.items():
+                task.cancel()
+                report["wasted_seconds"] += now - task_started
+                if winner_files and report["hedge_won"] and name == report["engines"][0]:
+                    # 先頭エンジンがあとどれだけかかったかは分からないため、そのエンジンの p99 を上限とした推定値
+                    expected = self.metrics.latency_percentile(name, 0.99) or 0.0
+                    report["latency_saved_seconds"] = max(0.0, expected - (now - task_started))
+            if pending: await asyncio.gather(*pending, return_exceptions=True)
+            report["total_seconds"] = time.perf_counter() - started
+            self.metrics.record_hedge(report)
+        if winner_files and report["winner"] != order[0]: self.telemetry.record_fallback(order[0], report["winner"])
+        if winner_files: logger.info(f"✅ Hedge: {report['winner']} won after {report['total_seconds']:.2f}s (hedges={report['hedges_launched']})")
+        return winner_files
+
+    def get_hedge_stats(self): return self.metrics.hedge_summary()
+
+    async def speak_pipelined(self, text, voice_model, speed, audio_player, preferred_engine=None, api_key=None, character_id=None, prefetch=1):
+        """
+        文単位に分割して合成と再生を並行させる（チャンクNの再生中にチャンクN+1を合成）。
+        再生順は元の文の順序を保つ。time_to_first_audio などの計測結果を辞書で返す。
+        """
+        started = time.perf_counter()
+        chunks = split_sentences(text)
+        report = {"chunks": len(chunks), "played": 0, "failed": 0, "time_to_first_audio": None, "first_audio_at": None, "total_time": 0.0}
+        if not chunks: return report
+        queue = asyncio.Queue(maxsize=max(1, prefetch))
+
+        async def produce():
+            for index, chunk in enumerate(chunks):
+                files = await self.synthesize_with_fallback(chunk, voice_model, speed, preferred_engine=preferred_engine, api_key=api_key, character_id=character_id)
+                await queue.put((index, files))
+            await queue.put(None)
+
+        producer = asyncio.create_task(produce())
+        queued = None # 常駐出力シンク使用時、再生中のチャンク (futures, files)。次のチャンクを先に積んで切れ目なく鳴らす
+        try:
+            while True:
+                item = await queue.get()
+                if item is None: break
+                index, files = item
+                if not files:
+                    report["failed"] += 1
+                    logger.warning(f"Pipeline: Chunk {index + 1}/{len(chunks)} synthesis failed, skipping")
+                    continue
+                if report["time_to_first_audio"] is None:
+                    report["first_audio_at"] = time.perf_counter() # 最初のチャンクを再生に渡した時刻（呼び出し側が自分の起点から計れるように）
+                    report["time_to_first_audio"] = report["first_audio_at"] - started
+                futures = audio_player.enqueue_audio_files(files, continuous=queued is not None) if hasattr(audio_player, "enqueue_audio_files") else None
+                if queued is not None: await self._wait_queued_chunk(audio_player, *queued)
+                if futures is None:
+                    queued = None
+                    await audio_player.play_audio_files(files, delay_between=0)
+                else: queued = (futures, files)
+                report["played"] += 1
+            if queued is not None: await self._wait_queued_chunk(audio_player, *queued)
+        finally:
+            if not producer.done():
+                producer.cancel()
+                try: await producer
+                except (asyncio.CancelledError, Exception): pass
+            while not queue.empty(): queue.get_nowait() # 再生されなかった合成済み音声を破棄する
+        report["total_time"] = time.perf_counter() - started
+        logger.info(f"Pipeline: {report['played']}/{report['chunks']} chunks played, first audio after {report['time_to_first_audio'] or 0:.2f}s")
+        return report
+
+    @staticmethod
+    async def _wait_queued_chunk(audio_player, futures, files):
+        failed = await audio_player.wait_for_playback(futures, files)
+        if failed: await audio_player.play_audio_files(failed, delay_between=0)
+
     def get_all_voices(self): return {name: (e.get_available_voices() or ["(N/A)"]) for name, e in self.engines.items()}
     def add_voice(self, data): logger.info(f"add_voice called with {data} (not implemented for standard engines)")
     def get_current_engine_name(self): return self.current_engine
@@ -0,0 +1,134 @@
+"""
+合成音声の後処理（フォーマット統一・無音トリム・音量正規化）
+
+エンジンごとにサンプリングレート・音量・前後の無音がばらばらなため、再生前に NumPy で一括処理する。
+
+1. 共通フォーマット（既定 24kHz・モノラル・16bit）へ変換（リサンプルは線形補間）
+2. 10ms フレームごとのエネルギーがしきい値を超える範囲だけを残し、前後の無音を削る（前後に少し余白を残す）
+3. ピークまたは RMS を目標値にそろえる（クリップしないよう、増幅量には上限を設ける）
+
+処理時間は音声1秒あたり 5ms 未満を目標とし、get_stats() で実測値を確認できる。
+NumPy がインストールされていなければ何もせずにそのまま返す。
+"""
+
+import logging
+import threading
+import time
+
+from audio_clip import AudioClip
+
+try:
+    import numpy as np
+except ImportError:  # オプション依存
+    np = None
+
+logger = logging.getLogger(__name__)
+
+BUDGET_MS_PER_AUDIO_SECOND = 5.0
+FRAME_SECONDS = 0.01
+
+
+def _db_to_amplitude(db): return 10.0 ** (db / 20.0)
+
+
+class AudioPostProcessor:
+    """AudioClip を共通フォーマット・共通音量にそろえ、前後の無音を削る"""
+
+    def __init__(self, sample_rate=24000, channels=1, trim_threshold_db=-45.0, trim_padding=0.08,
+                 normalize="peak", target_peak_db=-1.0, target_rms_db=-20.0, max_gain_db=20.0, enabled=True):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.trim_threshold_db = trim_threshold_db
+        self.trim_padding = trim_padding
+        self.normalize = normalize  # "peak" | "rms" | None
+        self.target_peak_db = target_peak_db
+        self.target_rms_db = target_rms_db
+        self.max_gain_db = max_gain_db
+        self.enabled = enabled and np is not None
+        if enabled and np is None: logger.warning("AudioPostProcessor: numpy is not installed, post-processing disabled")
+        self._lock = threading.Lock()
+        self._stats = {"clips": 0, "audio_seconds": 0.0, "processing_seconds": 0.0, "trimmed_seconds": 0.0, "over_budget": 0}
+
+    def process(self, clip):
+        """処理済みの新しい AudioClip を返す。処理できない形式ならそのまま返す。"""
+        if not self.enabled or not isinstance(clip, AudioClip) or not clip: return clip
+        started = time.perf_counter()
+        try:
+            samples = self._to_float(clip)
+            samples = self._convert_channels(samples)
+            samples = self._resample(samples, clip.sample_rate)
+            before = samples.shape[0]
+            samples = self._trim(samples)
+            samples = self._normalize(samples)
+            pcm = (np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2").tobytes()
+            result = AudioClip(pcm, self.sample_rate, self.channels, 2, source=clip.source)
+        except Exception as e:
+            logger.warning(f"AudioPostProcessor: Skipping {clip}: {e}")
+            return clip
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._stats["clips"] += 1
+            self._stats["audio_seconds"] += clip.duration
+            self._stats["processing_seconds"] += elapsed
+            self._stats["trimmed_seconds"] += (before - samples.shape[0]) / self.sample_rate
+            if clip.duration and elapsed * 1000.0 / clip.duration > BUDGET_MS_PER_AUDIO_SECOND: self._stats["over_budget"] += 1
+        return result
+
+    def process_all(self, clips): return [self.process(c) for c in clips]
+
+    # --- 各段階（samples は shape=(frames, channels) の float32, -1.0〜1.0）---
+    @staticmethod
+    def _to_float(clip):
+        raw = np.frombuffer(clip.pcm, dtype=np.uint8, count=clip.frames * clip.frame_size)
+        width = clip.sample_width
+        if width == 1: data = (raw.astype(np.float32) - 128.0) / 128.0
+        elif width == 2: data = raw.view("<i2").astype(np.float32) / 32768.0
+        elif width == 3: # 24bit は 32bit に詰め直してから変換する
+            padded = np.zeros((raw.size // 3, 4), dtype=np.uint8)
+            padded[:, 1:] = raw.reshape(-1, 3)
+            data = padded.view("<i4").reshape(-1).astype(np.float32) / 2147483648.0
+        elif width == 4: data = raw.view("<i4").astype(np.float32) / 2147483648.0
+        else: raise ValueError(f"Unsupported sample width: {width}")
+        return data.reshape(-1, clip.channels)
+
+    def _convert_channels(self, samples):
+        if samples.shape[1] == self.channels: return samples
+        mono = samples.mean(axis=1, keepdims=True, dtype=np.float32)
+        return mono if self.channels == 1 else np.repeat(mono, self.channels, axis=1)
+
+    def _resample(self, samples, source_rate):
+        if source_rate == self.sample_rate or samples.shape[0] < 2: return samples
+        out_frames = max(1, int(round(samples.shape[0] * self.sample_rate / source_rate)))
+        positions = np.arange(out_frames, dtype=np.float64) * (source_rate / self.sample_rate)
+        source_index = np.arange(samples.shape[0], dtype=np.float64)
+        return np.stack([np.interp(positions, source_index, samples[:, ch]).astype(np.float32) for ch in range(samples.shape[1])], axis=1)
+
+    def _trim(self, samples):
+        frame_len = max(1, int(self.sample_rate * FRAME_SECONDS))
+        n_frames = samples.shape[0] // frame_len
+        if n_frames == 0: return samples
+        energy = np.square(samples[:n_frames * frame_len]).reshape(n_frames, -1).mean(axis=1)
+        loud = np.flatnonzero(energy > _db_to_amplitude(self.trim_threshold_db) ** 2)
+        if loud.size == 0: return samples # 全体が無音ならそのまま（無音のクリップを意図して作ることもある）
+        pad = int(self.trim_padding * self.sample_rate)
+        start = max(0, loud[0] * frame_len - pad)
+        end = min(samples.shape[0], (loud[-1] + 1) * frame_len + pad)
+        return samples[start:end]
+
+    def _normalize(self, samples):
+        if not self.normalize or samples.size == 0: return samples
+        peak = float(np.abs(samples).max())
+        if peak <= 0.0: return samples
+        if self.normalize == "rms":
+            rms = float(np.sqrt(np.mean(np.square(samples), dtype=np.float64)))
+            gain = _db_to_amplitude(self.target_rms_db) / rms if rms > 0 else 1.0
+        else:
+            gain = _db_to_amplitude(self.target_peak_db) / peak
+        gain = min(gain, _db_to_amplitude(self.max_gain_db), 0.999 / peak) # ノイズを持ち上げすぎない・クリップさせない
+        return samples * np.float32(gain)
+
+    def get_stats(self):
+        with self._lock: stats = dict(self._stats)
+        stats["enabled"] = self.enabled
+        stats["ms_per_audio_second"] = stats["processing_seconds"] * 1000.0 / stats["audio_seconds"] if stats["audio_seconds"] else 0.0
+        return stats
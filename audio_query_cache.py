@@ -0,0 +1,94 @@
+"""
+ローカル音声エンジン (Avis Speech / VOICEVOX) の audio_query キャッシュ
+
+/audio_query（テキスト解析・アクセント推定）の結果を (話者ID, テキスト) ごとにメモリに保持する。
+速度・ピッチ・抑揚はキャッシュしたクエリのコピーに上書きして /synthesis に渡すので、
+話速だけ変えた再合成（音声テスト・話速調整・リプレイ）は /synthesis 1回で済む。
+
+- エンジン種別ごとにプロセス内で共有する
+- 件数と合計サイズ（JSON 換算）の上限を超えたら、最後に使われたのが古いものから捨てる (LRU)
+"""
+
+import copy
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+from voice_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_audio_query_cache(engine_name):
+    """エンジン種別ごとに共有される AudioQueryCache を返す"""
+    with _caches_lock:
+        if engine_name not in _caches: _caches[engine_name] = AudioQueryCache(engine_name)
+        return _caches[engine_name]
+
+
+class AudioQueryCache:
+    """audio_query の結果の LRU キャッシュ（件数・サイズ上限付き）"""
+
+    def __init__(self, engine_name, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.engine_name = engine_name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # {(speaker_id, text): (query, size)}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def configure(self, max_entries=None, max_bytes=None):
+        with self._lock:
+            if max_entries is not None: self.max_entries = max(0, int(max_entries))
+            if max_bytes is not None: self.max_bytes = max(0, int(max_bytes))
+            self._evict_locked()
+
+    @staticmethod
+    def _key(speaker_id, text): return (str(speaker_id), normalize_text(text))
+
+    def get(self, speaker_id, text):
+        """キャッシュ済みクエリのコピーを返す（呼び出し側が自由に書き換えてよい）。なければ None。"""
+        key = self._key(speaker_id, text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None: self._stats["misses"] += 1; return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return copy.deepcopy(entry[0])
+
+    def put(self, speaker_id, text, query):
+        if not self.max_entries or not isinstance(query, dict): return
+        size = len(json.dumps(query, ensure_ascii=False))
+        if size > self.max_bytes: return
+        key = self._key(speaker_id, text)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old: self._total_bytes -= old[1]
+            self._entries[key] = (copy.deepcopy(query), size)
+            self._total_bytes += size
+            self._evict_locked()
+
+    def _evict_locked(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes):
+            _, (_, size) = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock: self._entries.clear(); self._total_bytes = 0
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({"entries": len(self._entries), "total_bytes": self._total_bytes, "max_entries": self.max_entries, "max_bytes": self.max_bytes})
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,377 @@
+"""
+常駐型の PCM 出力シンク
+
+クリップごとに aplay / paplay を起動するのをやめ、出力ストリームを開きっぱなしにしてリングバッファ経由で PCM を流し込む。
+キューに積んだクリップは隙間なく連続再生される。
+
+- バックエンド: sounddevice（インストールされていれば）→ 常駐 aplay（Linux・raw PCM を標準入力から）
+  どちらも使えない場合は get_pcm_sink() が None を返し、AudioPlayer は従来のサブプロセス再生を使う
+- 書き込みは専用スレッドが period 単位で行い、デバイスの先行書き込み量を lead_seconds 以内に抑える
+  （flush() したときに捨てきれない音声を短くするため）
+- フォーマット（サンプリングレート等）が変わるクリップが来たら、再生済みになるのを待ってストリームを開き直す
+- underruns: 連続再生すべき音声（クリップの途中、または continuous=True で積まれたクリップ）の前にデバイスが空になった回数
+"""
+
+import concurrent.futures
+import logging
+import platform
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+IDLE_CLOSE_SECONDS = 30.0  # これだけ無音が続いたら出力デバイスを解放する
+STARVATION_TOLERANCE = 0.01
+
+_sinks = {}
+_sinks_lock = threading.Lock()
+
+
+def get_pcm_sink(device="default", backend="auto", buffer_seconds=2.0):
+    """出力デバイスごとに共有されるシンクを返す。使えるバックエンドがなければ None。"""
+    key = (device or "default", backend)
+    with _sinks_lock:
+        if key not in _sinks:
+            backend_cls = _select_backend(backend)
+            _sinks[key] = PCMOutputSink(backend_cls(device or "default"), buffer_seconds) if backend_cls else None
+        sink = _sinks[key]
+    return sink if sink is not None and sink.available else None
+
+
+def _select_backend(backend):
+    if backend in ("auto", "sounddevice"):
+        try:
+            import sounddevice  # noqa: F401  # オプション依存
+            return _SoundDeviceBackend
+        except Exception:
+            if backend == "sounddevice": logger.warning("PCMOutputSink: sounddevice is not installed")
+    if backend in ("auto", "aplay") and platform.system() == "Linux" and shutil.which("aplay"):
+        return _AplayBackend
+    return None
+
+
+def _resolve(future, result=None, exception=None):
+    """待ち手側でキャンセル済みの Future もあるため、完了済みなら何もしない"""
+    try:
+        if exception is not None: future.set_exception(exception)
+        else: future.set_result(result)
+    except concurrent.futures.InvalidStateError:
+        pass
+
+
+class PCMRingBuffer:
+    """固定長のバイトリングバッファ（スレッドセーフではない。PCMOutputSink のロック下で使う）"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._buf = bytearray(capacity)
+        self._read = 0
+        self._size = 0
+
+    @property
+    def available(self): return self._size
+    @property
+    def free(self): return self.capacity - self._size
+
+    def write(self, data):
+        """書けるだけ書き込み、書き込んだバイト数を返す"""
+        n = min(len(data), self.free)
+        if n <= 0: return 0
+        start = (self._read + self._size) % self.capacity
+        first = min(n, self.capacity - start)
+        self._buf[start:start + first] = data[:first]
+        if n > first: self._buf[0:n - first] = data[first:n]
+        self._size += n
+        return n
+
+    def read(self, n):
+        n = min(n, self._size)
+        first = min(n, self.capacity - self._read)
+        out = bytes(self._buf[self._read:self._read + first])
+        if n > first: out += bytes(self._buf[0:n - first])
+        self._read = (self._read + n) % self.capacity
+        self._size -= n
+        return out
+
+    def clear(self): self._read = 0; self._size = 0
+
+
+class _Ticket:
+    __slots__ = ("data", "offset", "format", "future", "continuous", "started")
+
+    def __init__(self, data, fmt, future, continuous):
+        self.data, self.offset, self.format, self.future, self.continuous, self.started = data, 0, fmt, future, continuous, False
+
+
+class PCMOutputSink:
+    """出力ストリームを保持し、キューに積まれた PCM クリップを連続再生する"""
+
+    def __init__(self, backend, buffer_seconds=2.0, period_seconds=0.02, lead_seconds=0.15):
+        self.backend = backend
+        self.buffer_seconds = buffer_seconds
+        self.period_seconds = period_seconds
+        self.lead_seconds = lead_seconds
+        self.available = True
+        self._cond = threading.Condition()
+        self._pending = deque()    # リングに入りきっていないクリップ
+        self._starts = deque()     # (開始バイト位置, continuous)
+        self._markers = deque()    # (終了バイト位置, future) リングに入りきったクリップ
+        self._finishing = deque()  # (再生終了予定時刻, future) デバイスに書き終えたクリップ
+        self._ring = None
+        self._format = None
+        self._written_total = 0    # リングに書き込んだ累計バイト数
+        self._consumed_total = 0   # デバイスに書き込んだ累計バイト数
+        self._play_until = 0.0     # 書き込み済みの音声をデバイスが鳴らし終える時刻 (monotonic)
+        self._playing = False
+        self._discard = False
+        self._closed = False
+        self._thread = None
+        self._stats = {"clips_enqueued": 0, "clips_played": 0, "clips_dropped": 0, "underruns": 0, "flushes": 0, "stream_opens": 0}
+
+    # --- 公開 API ---
+    def enqueue(self, clip, continuous=False):
+        """
+        AudioClip を再生キューに積み、再生し終わったら True（flush で破棄されたら False）になる Future を返す。
+        continuous=True は「直前のクリップに続けて鳴るべき」ことを示し、間に合わなかった場合は underrun として数える。
+        """
+        future = concurrent.futures.Future()
+        usable = clip.nbytes - clip.nbytes % clip.frame_size if clip.frame_size else 0
+        if usable <= 0: future.set_result(True); return future
+        with self._cond:
+            if not self.available or self._closed:
+                future.set_exception(RuntimeError("PCM output sink is not available")); return future
+            self._pending.append(_Ticket(clip.pcm[:usable], clip.format(), future, continuous))
+            self._stats["clips_enqueued"] += 1
+            self._top_up_locked()
+            self._ensure_thread_locked()
+            self._cond.notify_all()
+        return future
+
+    def flush(self):
+        """キュー・バッファ内の未再生音声をすべて破棄する（再生中の音声も止める）"""
+        with self._cond:
+            dropped = [t.future for t in self._pending] + [f for _, f in self._markers] + [f for _, f in self._finishing]
+            self._pending.clear(); self._markers.clear(); self._finishing.clear(); self._starts.clear()
+            if self._ring: self._ring.clear()
+            self._written_total = self._consumed_total
+            self._discard = True
+            self._stats["flushes"] += 1
+            self._stats["clips_dropped"] += len(dropped)
+            self._cond.notify_all()
+        for future in dropped:
+            _resolve(future, False)
+        return len(dropped)
+
+    def stop(self):
+        """未再生音声を破棄してストリームを閉じる。以後このシンクは使えない。"""
+        self.flush()
+        with self._cond:
+            self._closed = True; self.available = False
+            self._cond.notify_all()
+            thread = self._thread
+        if thread and thread is not threading.current_thread(): thread.join(timeout=2.0)
+
+    def queue_depth(self):
+        """再生待ち（再生中を含む）のクリップ数"""
+        with self._cond: return len(self._pending) + len(self._markers) + len(self._finishing)
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            bytes_per_second = self._bytes_per_second(self._format) if self._format else 0
+            pending_bytes = sum(len(t.data) - t.offset for t in self._pending)
+            buffered = self._ring.available if self._ring else 0
+            stats.update({
+                "backend": self.backend.name, "available": self.available, "format": self._format,
+                "queue_depth": len(self._pending) + len(self._markers) + len(self._finishing),
+                "buffered_bytes": buffered, "pending_bytes": pending_bytes,
+                "queued_seconds": ((buffered + pending_bytes) / bytes_per_second if bytes_per_second else 0.0) + max(0.0, self._play_until - time.monotonic())})
+        return stats
+
+    # --- 内部処理 ---
+    @staticmethod
+    def _bytes_per_second(fmt):
+        rate, channels, width = fmt
+        return rate * channels * width
+
+    def _ensure_thread_locked(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._worker, name="PCMOutputSink", daemon=True)
+            self._thread.start()
+
+    def _top_up_locked(self):
+        """保留中のクリップを、現在のフォーマットである限りリングバッファに移す"""
+        while self._pending and self._ring is not None and self._pending[0].format == self._format:
+            ticket = self._pending[0]
+            n = self._ring.write(ticket.data[ticket.offset:])
+            if n and not ticket.started:
+                ticket.started = True
+                self._starts.append((self._written_total, ticket.continuous))
+            ticket.offset += n
+            self._written_total += n
+            if ticket.offset < len(ticket.data): break # リングが満杯
+            self._pending.popleft()
+            self._markers.append((self._written_total, ticket.future))
+
+    def _worker(self):
+        idle_since = time.monotonic()
+        try:
+            while True:
+                reopen_format = None
+                backend_action = None # バックエンドの開閉は時間がかかる（aplay の起動など）ので、ロックを放してから行う
+                with self._cond:
+                    now = time.monotonic()
+                    while self._finishing and self._finishing[0][0] <= now:
+                        _, future = self._finishing.popleft()
+                        self._stats["clips_played"] += 1
+                        _resolve(future, True)
+                    if self._closed: break
+                    if self._discard: # flush 後: デバイス側に書き込み済みの音声も捨てるため、ストリームを開き直す
+                        self._discard = False
+                        backend_action = ("discard", self._format)
+                        self._play_until = now; self._playing = False
+                    else:
+                        self._top_up_locked()
+                        if not self._ring or not self._ring.available:
+                            if self._finishing: # 最後のクリップが鳴り終わるのを待つ
+                                self._cond.wait(timeout=max(0.001, self._finishing[0][0] - now)); continue
+                            if self._pending: # 別フォーマット（または初回）: 鳴り終わってから開き直す
+                                reopen_format = self._pending[0].format
+                            else:
+                                if self._format and now - idle_since > IDLE_CLOSE_SECONDS:
+                                    self._format = None; self._ring = None
+                                    backend_action = ("idle_close", None)
+                                else:
+                                    self._cond.wait(timeout=IDLE_CLOSE_SECONDS if self._format else None); continue
+                        else:
+                            ahead = self._play_until - now
+                            if ahead > self.lead_seconds:
+                                self._cond.wait(timeout=ahead - self.lead_seconds); continue
+                            data = self._read_period_locked(now)
+                            idle_since = now
+                if backend_action is not None:
+                    action, fmt = backend_action
+                    if action == "discard":
+                        self.backend.close(discard=True)
+                        if fmt: self.backend.open(fmt)
+                    else:
+                        self.backend.close()
+                        logger.debug("PCMOutputSink: Output stream closed (idle)")
+                    continue
+                if reopen_format is not None:
+                    self._reopen(reopen_format)
+                    continue
+                if self.backend.write(data): # sounddevice がアンダーフローを報告した
+                    with self._cond: self._stats["underruns"] += 1
+        except Exception as e:
+            logger.error(f"PCMOutputSink: Output stream failed ({self.backend.name}): {e}")
+            self._fail(e)
+        finally:
+            try: self.backend.close(discard=True)
+            except Exception: pass
+            with self._cond: self._thread = None
+
+    def _read_period_locked(self, now):
+        bytes_per_second = self._bytes_per_second(self._format)
+        frame_size = self._format[1] * self._format[2]
+        period = max(frame_size, int(bytes_per_second * self.period_seconds) // frame_size * frame_size)
+        starting = self._starts[0] if self._starts and self._starts[0][0] == self._consumed_total else None
+        starved = self._playing and now > self._play_until + STARVATION_TOLERANCE
+        if starved and (starting is None or starting[1]): # クリップの途中、または連続再生指定のクリップの前で途切れた
+            self._stats["underruns"] += 1
+        data = self._ring.read(period)
+        self._consumed_total += len(data)
+        while self._starts and self._starts[0][0] < self._consumed_total: self._starts.popleft()
+        self._play_until = max(now, self._play_until) + len(data) / bytes_per_second
+        self._playing = True
+        while self._markers and self._markers[0][0] <= self._consumed_total:
+            _, future = self._markers.popleft()
+            self._finishing.append((self._play_until + self.backend.latency, future))
+        self._top_up_locked()
+        return data
+
+    def _reopen(self, fmt):
+        self.backend.close()
+        self.backend.open(fmt)
+        bytes_per_second = self._bytes_per_second(fmt)
+        frame_size = fmt[1] * fmt[2]
+        with self._cond:
+            self._format = fmt
+            self._ring = PCMRingBuffer(max(frame_size, int(bytes_per_second * self.buffer_seconds) // frame_size * frame_size))
+            self._play_until = time.monotonic()
+            self._playing = False
+            self._stats["stream_opens"] += 1
+            self._top_up_locked()
+        logger.info(f"PCMOutputSink: Output stream opened ({self.backend.name}, {fmt[0]}Hz, {fmt[1]}ch, {fmt[2] * 8}bit)")
+
+    def _fail(self, error):
+        """バックエンドが壊れたら以後使わない。未再生のクリップは例外で終わらせ、呼び出し側のフォールバックに任せる。"""
+        with self._cond:
+            self.available = False
+            futures = [t.future for t in self._pending] + [f for _, f in self._markers] + [f for _, f in self._finishing]
+            self._pending.clear(); self._markers.clear(); self._finishing.clear(); self._starts.clear()
+        for future in futures: _resolve(future, exception=RuntimeError(f"PCM output sink failed: {error}"))
+
+
+class _AplayBackend:
+    """常駐 aplay プロセスの標準入力に raw PCM を書き込む"""
+    name = "aplay"
+    latency = 0.1  # -B で指定する ALSA バッファ長
+    _FORMATS = {1: "U8", 2: "S16_LE", 3: "S24_3LE", 4: "S32_LE"}
+
+    def __init__(self, device="default"):
+        self.device = device
+        self.proc = None
+
+    def open(self, fmt):
+        rate, channels, width = fmt
+        cmd = ["aplay", "-q", "-t", "raw", "-f", self._FORMATS[width], "-r", str(rate), "-c", str(channels), "-B", str(int(self.latency * 1_000_000))]
+        if self.device != "default": cmd.extend(["-D", self.device])
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def write(self, data):
+        if self.proc.poll() is not None: raise RuntimeError(f"aplay exited with code {self.proc.returncode}")
+        self.proc.stdin.write(data); self.proc.stdin.flush()
+        return False
+
+    def close(self, discard=False):
+        proc, self.proc = self.proc, None
+        if proc is None: return
+        try:
+            if discard: proc.kill()
+            else: proc.stdin.close()
+            proc.wait(timeout=2.0)
+        except Exception:
+            proc.kill()
+
+
+class _SoundDeviceBackend:
+    """sounddevice の RawOutputStream（ブロッキング書き込み）"""
+    name = "sounddevice"
+    latency = 0.05
+    _DTYPES = {1: "uint8", 2: "int16", 3: "int24", 4: "int32"}
+
+    def __init__(self, device="default"):
+        self.device = None if device in (None, "", "default") else device
+        self.stream = None
+
+    def open(self, fmt):
+        import sounddevice as sd
+        rate, channels, width = fmt
+        self.stream = sd.RawOutputStream(samplerate=rate, channels=channels, dtype=self._DTYPES[width], device=self.device, latency="low")
+        self.stream.start()
+
+    def write(self, data):
+        return bool(self.stream.write(data)) # True ならアンダーフロー
+
+    def close(self, discard=False):
+        stream, self.stream = self.stream, None
+        if stream is None: return
+        try:
+            if discard: stream.abort()
+            else: stream.stop()
+        finally:
+            stream.close()
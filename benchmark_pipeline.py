@@ -0,0 +1,303 @@
+"""
+コメント → 音声パイプラインのエンドツーエンド・ベンチマーク
+
+standin_servers.py のスタンドイン（YouTube Live Chat・LM Studio・VOICEVOX / AivisSpeech）を同じプロセス内で起動し、
+実際の AITuberStreamingSystem を指定したコメント流量で一定時間動かして、次の値を JSON に書き出す。
+
+- コメント投稿から最初の音声が鳴り始めるまでの時間 (p50 / p95 / p99)
+- 応答できなかったコメント数（取りこぼし）
+- CPU 時間・CPU 使用率・RSS（psutil があれば平均とピーク、なければ resource のピークのみ）
+- エンジン別のリクエスト数・失敗率と、フォールバック率（VoiceTelemetry より）
+
+結果ファイルにはコミットハッシュと実行条件も入れるので、コミット間の差を数値で比較できる。
+
+使い方:
+    python benchmark_pipeline.py --duration 60 --comment-rate 30 --engine voicevox
+    python benchmark_pipeline.py --profile profile.json --error-rate 0.1 --output results/run.json
+
+音声は既定では実際には鳴らさず、クリップの長さだけ待つ（--real-audio で AudioPlayer を使う）。
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+try:
+    import psutil
+except ImportError:  # オプション依存
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from audio_clip import AudioClip
+from audio_manager import VoiceEngineManager, AudioPlayer
+from character_manager import CharacterManager
+from config import ConfigManager
+from standin_servers import StandInServers, merge_profiles
+from streaming import AITuberStreamingSystem
+from voice_metrics import get_voice_telemetry, percentile
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_CHARACTER_ID = "benchmark"
+_COMMENT_INDEX_RE = re.compile(r"\((\d+)\)$") # スタンドインのコメントは末尾に通し番号が付く
+
+
+class LatencyRecorder:
+    """どのコメントに応答中かを追い、最初の音声が鳴った時刻との差を記録する"""
+
+    def __init__(self, youtube_standin):
+        self.youtube_standin = youtube_standin
+        self.comment_to_first_audio = []
+        self.replied_indices = set()
+        self._current = None  # (コメント番号, 投稿時刻)
+
+    def begin_reply(self, comment_text):
+        match = _COMMENT_INDEX_RE.search(comment_text.strip())
+        if not match: self._current = None; return
+        index = int(match.group(1))
+        published = self.youtube_standin.messages[index]["snippet"]["publishedAt"]
+        self._current = (index, datetime.fromisoformat(published.replace("Z", "+00:00")).timestamp())
+
+    def first_audio(self):
+        if self._current is None: return
+        index, published = self._current
+        self._current = None # 2つ目以降のチャンクは数えない
+        self.replied_indices.add(index)
+        self.comment_to_first_audio.append(time.time() - published)
+
+
+class SimulatedAudioPlayer:
+    """音声デバイスを使わず、クリップの長さだけ待つプレイヤー（ヘッドレス環境でも再生時間を含めて計測できる）"""
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.played_seconds = 0.0
+
+    async def play_audio_files(self, audio_files, delay_between=0.05):
+        self.recorder.first_audio()
+        for index, audio in enumerate(audio_files):
+            duration = audio.duration if isinstance(audio, AudioClip) else AudioClip.from_wav_file(audio).duration
+            self.played_seconds += duration
+            await asyncio.sleep(duration + (delay_between if index < len(audio_files) - 1 else 0.0))
+
+
+class RecordingAudioPlayer(AudioPlayer):
+    """実際に再生しつつ、最初の音声の時刻を記録する"""
+
+    def __init__(self, config_manager, recorder):
+        super().__init__(config_manager=config_manager)
+        self.recorder = recorder
+
+    def enqueue_audio_files(self, audio_files, continuous=False, delay_between=0.0):
+        futures = super().enqueue_audio_files(audio_files, continuous, delay_between)
+        if futures is not None: self.recorder.first_audio() # 出力シンクに積んだ時点で、先行分が鳴り終わり次第すぐ鳴る
+        return futures
+
+    async def play_audio_files(self, audio_files, delay_between=0.05):
+        self.recorder.first_audio()
+        return await super().play_audio_files(audio_files, delay_between)
+
+
+class BenchmarkStreamingSystem(AITuberStreamingSystem):
+    """応答対象のコメントを LatencyRecorder に知らせる以外は本番と同じ"""
+
+    def __init__(self, *args, recorder=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.recorder = recorder
+
+    def _on_reply_start(self, comment):
+        self.recorder.begin_reply(comment.text)
+
+
+class ResourceSampler:
+    """一定間隔で CPU・RSS を記録する"""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.rss_samples = []
+        self._process = psutil.Process() if psutil else None
+        self._task = None
+
+    @staticmethod
+    def _cpu_seconds():
+        if psutil: times = psutil.Process().cpu_times(); return times.user + times.system
+        if resource: usage = resource.getrusage(resource.RUSAGE_SELF); return usage.ru_utime + usage.ru_stime
+        return time.process_time()
+
+    async def _run(self):
+        while True:
+            if self._process: self.rss_samples.append(self._process.memory_info().rss)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._started_wall = time.perf_counter()
+        self._started_cpu = self._cpu_seconds()
+        if self._process: self._process.cpu_percent(None)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        wall = time.perf_counter() - self._started_wall
+        cpu = self._cpu_seconds() - self._started_cpu
+        result = {"cpu_seconds": cpu, "cpu_percent": cpu * 100.0 / wall if wall else 0.0, "rss_mean_mb": None, "rss_peak_mb": None}
+        if self.rss_samples:
+            result["rss_mean_mb"] = sum(self.rss_samples) / len(self.rss_samples) / 1048576
+            result["rss_peak_mb"] = max(self.rss_samples) / 1048576
+        elif resource:
+            # ru_maxrss は Linux では KB、macOS ではバイト
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            result["rss_peak_mb"] = peak / 1048576 if sys.platform == "darwin" else peak / 1024
+        return result
+
+
+def summarize_latencies(values):
+    return {"count": len(values), "p50": percentile(values, 0.5), "p95": percentile(values, 0.95), "p99": percentile(values, 0.99),
+            "mean": sum(values) / len(values) if values else None, "max": max(values) if values else None}
+
+
+def summarize_engines(snapshot):
+    """テレメトリのスナップショットからエンジン別の失敗率とフォールバック率を出す"""
+    engines = {}
+    for series in snapshot["series"]:
+        e = engines.setdefault(series["engine"], {"requests": 0, "failures": 0, "cache_hits": 0})
+        e["requests"] += series["requests"]; e["failures"] += series["failures"]; e["cache_hits"] += series["cache_hits"]
+    for e in engines.values(): e["failure_rate"] = e["failures"] / e["requests"] if e["requests"] else 0.0
+    fallbacks = sum(fb["count"] for fb in snapshot["fallbacks"])
+    served = sum(e["requests"] - e["failures"] + e["cache_hits"] for e in engines.values())
+    return {"engines": engines, "fallbacks": snapshot["fallbacks"], "fallback_count": fallbacks, "fallback_rate": fallbacks / served if served else 0.0}
+
+
+def git_commit():
+    try: return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, timeout=5, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except Exception: return None
+
+
+def build_config(workdir, urls, args):
+    """一時ディレクトリ上の設定（保存はしない）にスタンドインの URL とベンチマーク条件を入れる"""
+    config = ConfigManager(os.path.join(workdir, "benchmark_config.json"))
+    settings = dict(urls, text_generation_model="local_lm_studio", youtube_api_key="standin", google_ai_api_key="",
+                    chat_monitor_interval=args.poll_interval, voice_pipeline_mode=not args.no_pipeline,
+                    stream_pipeline_enabled=not args.serial, stream_target_reply_latency=args.target_latency,
+                    voice_cache_enabled=args.cache, voice_cache_dir=os.path.join(workdir, "voice_cache"),
+                    phrase_bank_enabled=False) # 事前合成が計測中の合成と競合しないようにする
+    for key, value in settings.items(): config.set_system_setting(key, value)
+    character = CharacterManager(config)._create_blank_character()
+    character.update({"name": "ベンチちゃん"})
+    character["voice_settings"].update({"engine": args.engine, "model": args.voice, "speed": 1.0})
+    config.config.setdefault("characters", {})[BENCHMARK_CHARACTER_ID] = character
+    return config
+
+
+async def run_benchmark(args):
+    overrides = {}
+    if args.profile:
+        with open(args.profile, "r", encoding="utf-8") as f: overrides = json.load(f)
+    overrides.setdefault("youtube", {})["comments_per_minute"] = args.comment_rate
+    overrides["youtube"].setdefault("polling_interval_ms", int(args.poll_interval * 1000)) # 取得間隔はサーバー推奨値 (pollingIntervalMillis) に従うため
+    for service in ("voicevox", "avis_speech", "llm", "youtube"): overrides.setdefault(service, {}).setdefault("port", 0) # 空きポートを使う
+    servers = StandInServers(merge_profiles(overrides, args.latency_scale, args.error_rate), seed=args.seed)
+    urls = await servers.start()
+    youtube_standin = servers.services["youtube"]
+
+    workdir = tempfile.mkdtemp(prefix="aituber_bench_")
+    os.chdir(workdir) # 話者カタログ・通信ログなどカレントディレクトリに書かれるファイルを本番環境と混ぜない
+    config = build_config(workdir, urls, args)
+    recorder = LatencyRecorder(youtube_standin)
+    voice_manager = VoiceEngineManager(config_manager=config)
+    audio_player = RecordingAudioPlayer(config, recorder) if args.real_audio else SimulatedAudioPlayer(recorder)
+    telemetry = get_voice_telemetry()
+    telemetry.reset()
+
+    system = BenchmarkStreamingSystem(config, BENCHMARK_CHARACTER_ID, CharacterManager(config), voice_manager, audio_player,
+                                      log_callback=logger.info, recorder=recorder)
+    started_at = datetime.now().isoformat(timespec="seconds")
+    sampler = ResourceSampler()
+    sampler.start()
+    youtube_standin.started_at = time.time() # コメントの流れはベンチマーク開始時点から数える
+    started = time.perf_counter()
+    task = asyncio.create_task(system.run_streaming("benchmark"))
+    try:
+        await asyncio.wait_for(asyncio.shield(task), timeout=args.duration)
+    except asyncio.TimeoutError:
+        pass
+    system.running = False
+    try: await asyncio.wait_for(task, timeout=args.drain_timeout) # 応答中の1件は最後まで鳴らす
+    except asyncio.TimeoutError: task.cancel(); await asyncio.gather(task, return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    resources = await sampler.stop()
+
+    youtube_standin._generate_until_now()
+    deadline = youtube_standin.started_at + args.duration
+    total_comments = sum(1 for m in youtube_standin.messages if datetime.fromisoformat(m["snippet"]["publishedAt"].replace("Z", "+00:00")).timestamp() <= deadline)
+    replied = len(recorder.replied_indices)
+    result = {
+        "benchmark": "comment_to_voice",
+        "format_version": 1,
+        "git_commit": git_commit(),
+        "started_at": started_at,
+        "params": {key: value for key, value in vars(args).items() if key != "output"},
+        "elapsed_seconds": elapsed,
+        "comments": {"posted": total_comments, "replied": replied, "dropped": max(0, total_comments - replied)},
+        "comment_to_first_audio_seconds": summarize_latencies(recorder.comment_to_first_audio),
+        "reply_to_first_audio_seconds": summarize_latencies(list(system.reply_latencies)),
+        "resources": resources,
+        "voice": summarize_engines(telemetry.snapshot()),
+        "standin_stats": servers.get_stats(),
+        "youtube_quota": system.get_quota_stats(),
+        "comment_queue": system.get_queue_metrics(),
+        "reply_batches": dict(system.batch_stats),
+        "stages": system.get_stage_stats(),
+    }
+    await servers.stop()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="コメント → 音声パイプラインのベンチマーク（スタンドインサーバー使用）")
+    parser.add_argument("--duration", type=float, default=60.0, help="計測時間 (秒)")
+    parser.add_argument("--comment-rate", type=float, default=30.0, help="1分あたりのコメント数")
+    parser.add_argument("--engine", default="voicevox", help="キャラクターの音声エンジン")
+    parser.add_argument("--voice", default=None, help="音声モデル（省略時はエンジンの既定）")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="コメント取得の間隔（スタンドインが返す pollingIntervalMillis）")
+    parser.add_argument("--no-pipeline", action="store_true", help="文単位のパイプライン合成を使わない")
+    parser.add_argument("--serial", action="store_true", help="生成・合成・再生を並行させず1件ずつ処理する（stream_pipeline_enabled=False）")
+    parser.add_argument("--target-latency", type=float, default=30.0, help="返答までの目標秒数（間に合わないコメントは間引く。0 で無効）")
+    parser.add_argument("--cache", action="store_true", help="合成キャッシュを有効にする（既定ではエンジンの実力を測るため無効）")
+    parser.add_argument("--real-audio", action="store_true", help="実際に音を鳴らす")
+    parser.add_argument("--profile", help="スタンドインのプロファイル JSON（standin_servers.DEFAULT_PROFILES の上書き）")
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--error-rate", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--drain-timeout", type=float, default=30.0, help="計測終了後、応答中の1件を待つ最大秒数")
+    parser.add_argument("--output", default=None, help="結果 JSON の出力先（既定: benchmark_results/benchmark_日時.json）")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    output = os.path.abspath(args.output or os.path.join("benchmark_results", f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"))
+    result = asyncio.run(run_benchmark(args))
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f: json.dump(result, f, ensure_ascii=False, indent=2)
+
+    latency = result["comment_to_first_audio_seconds"]
+    fmt = lambda v: f"{v:.2f}s" if v is not None else "-"
+    print(f"comment→first audio: p50 {fmt(latency['p50'])}  p95 {fmt(latency['p95'])}  p99 {fmt(latency['p99'])}  (n={latency['count']})")
+    print(f"comments: posted {result['comments']['posted']}  replied {result['comments']['replied']}  dropped {result['comments']['dropped']}")
+    print(f"cpu {result['resources']['cpu_percent']:.1f}%  rss peak {result['resources']['rss_peak_mb'] or 0:.1f}MB  fallback rate {result['voice']['fallback_rate']:.1%}")
+    print(f"results: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -287,7 +287,12 @@ class CharacterEditDialog:
         if saved_model and saved_model in self.voice_combo.cget("values"): # CTkComboBoxは .cget("values")
             self.voice_var.set(saved_model)
         elif self.voice_combo.cget("values"):
-             self.voice_var.set(self.voice_combo.cget("values")[0])
+            # エンジン側で声が消えた・改名されたときは、黙って先頭の声にせず似た名前を候補として示す
+            suggestions = self.voice_api.suggest_voices(saved_model) if saved_model and hasattr(self.voice_api, 'suggest_voices') else []
+            self.voice_var.set(suggestions[0] if suggestions else self.voice_combo.cget("values")[0])
+            if suggestions:
+                messagebox.showwarning(self._("character_edit_dialog.messagebox.voice_missing.title"),
+                                       self._("character_edit_dialog.messagebox.voice_missing.message", voice=saved_model, suggestions=", ".join(suggestions)), parent=self.dialog)
         self.speed_var.set(voice_settings.get('speed', 1.0))
 
         # 品質設定の読み込み
@@ -389,15 +394,11 @@ class CharacterEditDialog:
         elif engine_choice == "avis_speech": api_instance = AvisSpeechEngineAPI()
         elif engine_choice == "voicevox": api_instance = VOICEVOXEngineAPI()
         elif engine_choice == "system_tts": api_instance = SystemTTSAPI()
+        self.voice_api = api_instance # 保存済みの声が見つからないときの候補探しに使う
 
         if api_instance:
             try:
-                if asyncio.iscoroutinefunction(getattr(api_instance, 'check_availability', None)):
-                    loop = asyncio.new_event_loop(); asyncio.set_event_loop(loop)
-                    try: loop.run_until_complete(api_instance.check_availability())
-                    finally: loop.close()
-                elif hasattr(api_instance, 'check_availability'): api_instance.check_availability()
-                voices = api_instance.get_available_voices()
+                voices = api_instance.get_available_voices() # ローカルエンジンは共有の話者カタログ (TTL付き) から取得
                 default_voice = voices[0] if voices else ""
             except Exception as e:
                 logger.error(f"Error getting voices for {engine_choice}: {e}")
@@ -435,9 +436,9 @@ class CharacterEditDialog:
 
         def run_test_async():
             loop = asyncio.new_event_loop(); asyncio.set_event_loop(loop)
+            audio_player = AudioPlayer(config_manager=self.config_manager)
+            voice_manager_local = VoiceEngineManager(config_manager=self.config_manager)
             try:
-                audio_player = AudioPlayer(config_manager=self.config_manager)
-                voice_manager_local = VoiceEngineManager()
                 audio_files = loop.run_until_complete(
                     voice_manager_local.synthesize_with_fallback(
                         text, voice_model_choice, speed_choice,
@@ -455,7 +456,9 @@ class CharacterEditDialog:
                 # logger.error(f"Voice test error: {e}", exc_info=True) # 英語ログはそのまま
                 messagebox.showerror(self._("character_edit_dialog.messagebox.voice_test_error.title"),
                                      self._("character_edit_dialog.messagebox.voice_test_error.message_generic", error=e), parent=self.dialog)
-            finally: loop.close()
+            finally:
+                loop.run_until_complete(voice_manager_local.close())
+                loop.close()
         threading.Thread(target=run_test_async, daemon=True).start()
 
     def compare_voice_engines(self):
@@ -465,15 +468,16 @@ class CharacterEditDialog:
 
         def run_comparison_async():
             loop = asyncio.new_event_loop(); asyncio.set_event_loop(loop)
+            audio_player = AudioPlayer(config_manager=self.config_manager)
+            voice_manager_local = VoiceEngineManager(config_manager=self.config_manager)
             try:
-                audio_player = AudioPlayer(config_manager=self.config_manager)
-                voice_manager_local = VoiceEngineManager()
                 engines_to_test_config = [
                     {"engine": "google_ai_studio_new", "default_model": "alloy"},
                     {"engine": "avis_speech", "default_model": "Anneli(ノーマル)"},
                     {"engine": "voicevox", "default_model": "ずんだもん(ノーマル)"},
                     {"engine": "system_tts", "default_model": None}
                 ]
+                requests_to_run = []
                 for i, config in enumerate(engines_to_test_config, 1):
                     engine_name = config["engine"]
                     engine_instance = voice_manager_local.get_engine_instance(engine_name)
@@ -490,22 +494,26 @@ class CharacterEditDialog:
                     # logger.info(f"Comparing engine {i}: {engine_name} with model {model_to_use}") # 英語ログ
                     test_text_engine = self._("character_edit_dialog.engine_comparison.text_per_engine",
                                               i=i, engine_name=engine_name, model_to_use=model_to_use, text=base_text)
-                    audio_files = loop.run_until_complete(
-                        voice_manager_local.synthesize_with_fallback(
-                            test_text_engine, model_to_use, 1.0, preferred_engine=engine_name, api_key=api_key_google
-                        )
-                    )
-                    if audio_files:
-                        loop.run_until_complete(audio_player.play_audio_files(audio_files))
-                        # logger.info(f"Comparison for {engine_name} successful.") # 英語ログ
-                    # else: logger.error(f"Comparison for {engine_name} failed.") # 英語ログ
-                    time.sleep(1)
+                    requests_to_run.append({"text": test_text_engine, "voice_model": model_to_use, "speed": 1.0,
+                                            "preferred_engine": engine_name, "api_key": api_key_google})
+
+                async def synthesize_and_play_in_order():
+                    # 全エンジンの合成を並行して始め、再生だけ順番に行う
+                    async for result in voice_manager_local.synthesize_many(requests_to_run, ordered=True):
+                        if result["files"]:
+                            await audio_player.play_audio_files(result["files"])
+                            # logger.info(f"Comparison for {engine_name} successful.") # 英語ログ
+                        # else: logger.error(f"Comparison for {engine_name} failed.") # 英語ログ
+                        await asyncio.sleep(1)
+                loop.run_until_complete(synthesize_and_play_in_order())
                 # logger.info("Voice engine comparison finished.") # 英語ログ
             except Exception as e:
                 # logger.error(f"Voice engine comparison error: {e}", exc_info=True) # 英語ログ
                 messagebox.showerror(self._("character_edit_dialog.messagebox.comparison_error.title"),
                                      self._("character_edit_dialog.messagebox.comparison_error.message_generic", error=e), parent=self.dialog)
-            finally: loop.close()
+            finally:
+                loop.run_until_complete(voice_manager_local.close())
+                loop.close()
         threading.Thread(target=run_comparison_async, daemon=True).start()
 
     def save_character(self):
@@ -532,6 +540,9 @@ class CharacterEditDialog:
                 }
             }
             if self.is_edit_mode:
+                if "fallback_engines" in self.char_data.get("voice_settings", {}): # 設定ファイルで指定したフォールバック先は画面にないので引き継ぐ
+                    char_data["voice_settings"]["fallback_engines"] = self.char_data["voice_settings"]["fallback_engines"]
+                if "phrase_bank" in self.char_data: char_data["phrase_bank"] = self.char_data["phrase_bank"] # 定型フレーズも画面にないので引き継ぐ
                 char_data["char_id"] = self.char_id
                 char_data["created_at"] = self.char_data.get("created_at", datetime.now().isoformat())
                 char_data["updated_at"] = datetime.now().isoformat()
@@ -544,6 +555,7 @@ class CharacterEditDialog:
                     custom_settings=char_data
                 )
                 self.result = {"char_id": char_id_new, "name": name, "action": "created"}
+            self.character_manager.refresh_phrase_bank(self.result["char_id"]) # 声の設定が変わっていれば定型フレーズを合成し直す
             self.dialog.destroy()
         except Exception as e:
             action_key = "character_edit_dialog.action.edit" if self.is_edit_mode else "character_edit_dialog.action.create"
@@ -838,12 +850,12 @@ class CharacterManagementWindow:
 
         def run_test_async():
             loop = asyncio.new_event_loop(); asyncio.set_event_loop(loop)
+            audio_player = AudioPlayer(config_manager=self.config_manager)
+            voice_manager_local = VoiceEngineManager(config_manager=self.config_manager)
             try:
-                audio_player = AudioPlayer(config_manager=self.config_manager)
-                voice_manager_local = VoiceEngineManager()
                 audio_files = loop.run_until_complete(
                     voice_manager_local.synthesize_with_fallback(
-                        test_text, model_choice, speed_choice, preferred_engine=engine_choice, api_key=api_key_google
+                        test_text, model_choice, speed_choice, preferred_engine=engine_choice, api_key=api_key_google, character_id=char_id
                     )
                 )
                 if audio_files:
@@ -857,7 +869,9 @@ class CharacterManagementWindow:
                 self.log(self._("character_manager.log.voice_test_error", error=e))
                 messagebox.showerror(self._("character_manager.messagebox.voice_test_error.title"),
                                      self._("character_manager.messagebox.voice_test_error.message_generic", error=e), parent=self.root)
-            finally: loop.close()
+            finally:
+                loop.run_until_complete(voice_manager_local.close())
+                loop.close()
         threading.Thread(target=run_test_async, daemon=True).start()
 
 def main():
@@ -47,6 +47,9 @@ import json # JSONモジュールをインポート (macOSデバイス取得で
 import csv
 import traceback # エラー追跡用に追加
 
+from phrase_bank import get_phrase_bank, get_phrases
+from voice_cache import get_synthesis_cache
+
 
 # キャラクター管理システム v2.2（4エンジン完全対応版）
 class CharacterManager:
@@ -326,6 +329,20 @@ YouTubeライブ配信での短時間の応答に適した内容にしてくだ
         """保存されている全てのキャラクターデータを辞書として返す。"""
         return self.config.get_all_characters()
 
+    def get_phrases(self, char_id):
+        """定型フレーズ {カテゴリ: [テキスト]}（キャラクター設定の phrase_bank、なければ既定のフレーズ）"""
+        return get_phrases(self.config.get_character(char_id))
+
+    def get_phrase_bank(self, char_id):
+        """キャラクターの合成済みフレーズバンク（PhraseBank）"""
+        return get_phrase_bank(char_id, self.config.get_system_setting("phrase_bank_dir", "phrase_bank"))
+
+    def refresh_phrase_bank(self, char_id):
+        """キャラクターや声の設定が変わっていれば、フレーズバンクをバックグラウンドで作り直す"""
+        if not self.config.get_system_setting("phrase_bank_enabled", True): return False
+        from audio_manager import VoiceEngineManager # 音声エンジン一式の読み込みは必要になるまで遅らせる
+        return self.get_phrase_bank(char_id).refresh_in_background(self.config, lambda: VoiceEngineManager(config_manager=self.config))
+
     def get_character_id_by_name(self, char_name):
         """キャラクター名からキャラクターIDを取得する。"""
         all_chars = self.get_all_characters()
@@ -334,6 +351,13 @@ YouTubeライブ配信での短時間の応答に適した内容にしてくだ
                 return char_id
         return None
 
+    def invalidate_voice_cache(self, char_id):
+        """キャラクターの合成キャッシュ音声を破棄する（音声エンジンは起動せず、キャッシュのディレクトリだけを扱う）"""
+        cache = get_synthesis_cache(cache_dir=self.config.get_system_setting("voice_cache_dir", "voice_cache"),
+                                    max_bytes=int(self.config.get_system_setting("voice_cache_max_mb", 200)) * 1024 * 1024,
+                                    enabled=self.config.get_system_setting("voice_cache_enabled", True))
+        return cache.invalidate_character(char_id)
+
     def delete_character(self, char_id):
         """
         指定されたキャラクターIDのキャラクターを削除する。
@@ -341,6 +365,8 @@ YouTubeライブ配信での短時間の応答に適した内容にしてくだ
         """
         try:
             if self.config.delete_character(char_id):
+                self.get_phrase_bank(char_id).delete()
+                self.invalidate_voice_cache(char_id)
                 # logging.info(f"キャラクター (ID: {char_id}) の削除に成功しました。") # CharacterManagerではロギングしない方針の場合
                 return True
             else:
@@ -0,0 +1,254 @@
+"""
+ライブチャットのコメント取り込みキュー
+
+取得したコメントを最新の1件だけでなくすべて受け付け、応答を生成するワーカーに優先度順で渡す。
+
+- YouTube のメッセージIDで重複を除く（同じ視聴者が同じ文を再投稿しても別のコメントとして扱う）
+  既読IDは上限付きで、古いものから忘れる
+- スーパーチャット・スーパーステッカー > メンバー・モデレーター > 通常コメントの順、同じ優先度なら古い順に取り出す
+- キューの長さ・待ち時間・コメントの鮮度（投稿からの経過秒数）・破棄した理由ごとの件数を集計する
+
+しゃべる速さを超えてコメントが来るときは、policies に指定した方針で間引く（破棄理由 "shed_*" として数える）。
+- "deadline": 投稿から max_age 秒を過ぎたコメントは応答しない（返答までの目標時間に間に合わないため）
+- "one_per_author": 同じ視聴者の応答待ちは最新の1件だけ残す（スーパーチャットは通常コメントで置き換えない）
+- "prefer_priority": 満杯のとき、優先度の低いコメントを先に捨てて、メンバー・スーパーチャットを受け付ける
+- "drop_oldest": 満杯のとき、新しいコメントではなく最も古いコメントを捨てる
+上限件数は max_size と、配信側が見積もった「目標時間内に応答しきれる件数」(capacity) の小さいほう。
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from voice_metrics import Histogram, SECONDS_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_SUPERCHAT, PRIORITY_MEMBER, PRIORITY_NORMAL = 0, 1, 2
+PRIORITY_NAMES = {PRIORITY_SUPERCHAT: "superchat", PRIORITY_MEMBER: "member", PRIORITY_NORMAL: "normal"}
+PAID_MESSAGE_TYPES = ("superChatEvent", "superStickerEvent")
+SHED_POLICIES = ("deadline", "one_per_author", "prefer_priority", "drop_oldest")
+
+
+def _parse_published_at(value):
+    try: return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except (AttributeError, ValueError): return None
+
+
+class ChatComment:
+    """キューに積む1コメント（liveChatMessage から必要な項目だけ取り出したもの）"""
+
+    __slots__ = ("id", "text", "author", "author_id", "kind", "priority", "published_at", "received_at", "raw")
+
+    def __init__(self, id, text, author, author_id="", kind="textMessageEvent", priority=PRIORITY_NORMAL, published_at=None, received_at=None, raw=None):
+        self.id = id
+        self.text = text
+        self.author = author
+        self.author_id = author_id
+        self.kind = kind
+        self.priority = priority
+        self.received_at = received_at if received_at is not None else time.time()
+        self.published_at = published_at if published_at is not None else self.received_at
+        self.raw = raw
+
+    @classmethod
+    def from_item(cls, item, received_at=None):
+        """liveChatMessages.list の items の1要素から作る"""
+        snippet, author = item.get("snippet", {}), item.get("authorDetails", {})
+        kind = snippet.get("type", "textMessageEvent")
+        if kind in PAID_MESSAGE_TYPES: priority = PRIORITY_SUPERCHAT
+        elif author.get("isChatSponsor") or author.get("isChatModerator") or author.get("isChatOwner"): priority = PRIORITY_MEMBER
+        else: priority = PRIORITY_NORMAL
+        return cls(item.get("id"), (snippet.get("displayMessage") or "").strip(), author.get("displayName", ""), author.get("channelId", ""),
+                   kind, priority, _parse_published_at(snippet.get("publishedAt")), received_at, item)
+
+    def age(self, now=None): return (now or time.time()) - self.published_at
+
+    def __repr__(self): return f"ChatComment({self.id}, {PRIORITY_NAMES.get(self.priority)}, {self.author}: {self.text[:20]})"
+
+
+class SeenSet:
+    """上限付きの既読ID集合（上限を超えたら古いIDから忘れる）"""
+
+    def __init__(self, max_size=5000):
+        self.max_size = max_size
+        self._ids = OrderedDict()
+
+    def add(self, key):
+        """初めて見たIDなら True"""
+        if key in self._ids: return False
+        self._ids[key] = None
+        if len(self._ids) > self.max_size: self._ids.popitem(last=False)
+        return True
+
+    def __contains__(self, key): return key in self._ids
+    def __len__(self): return len(self._ids)
+
+
+class CommentQueue:
+    """重複除去付きの優先度キュー。offer() は配信ループから、get() は応答ワーカーから呼ぶ（同じイベントループ内）。"""
+
+    def __init__(self, max_size=100, seen_size=5000, policies=(), max_age=None):
+        self.max_size = max_size
+        self.capacity = None  # 目標時間内に応答しきれる件数（配信側が update_limits() で更新する）
+        self.max_age = max_age  # "deadline" で応答をあきらめる投稿からの経過秒数
+        self.policies = set()
+        for policy in policies or ():
+            if policy in SHED_POLICIES: self.policies.add(policy)
+            else: logger.warning(f"CommentQueue: Unknown shedding policy '{policy}' ignored (available: {', '.join(SHED_POLICIES)})")
+        self.seen = SeenSet(seen_size)
+        self._heap = []  # [(priority, seq, ChatComment)]
+        self._by_author = {}  # {author_id: 応答待ちのエントリ}（"one_per_author" 用）
+        self._seq = itertools.count()
+        self._not_empty = asyncio.Event()
+        self._closed = False
+        self._lock = threading.Lock()  # 集計値は UI スレッドからも読むため
+        self._counts = {"received": 0, "enqueued": 0, "dequeued": 0, "max_depth": 0}
+        self._dropped = {}  # {理由: 件数}
+        self._enqueued_by_priority = {}
+        self._queue_wait = Histogram(SECONDS_BUCKETS)   # キューに入ってから取り出されるまで
+        self._comment_age = Histogram(SECONDS_BUCKETS)  # 投稿されてから取り出されるまで（取得間隔の分も含む）
+
+    def __len__(self): return len(self._heap)
+
+    @property
+    def limit(self):
+        """今の上限件数"""
+        return max(1, min(self.max_size, self.capacity)) if self.capacity is not None else self.max_size
+
+    def update_limits(self, max_age=None, capacity=None):
+        """返答までの目標時間から見積もった、待てる秒数と件数を設定する（None はその制限なし）"""
+        self.max_age, self.capacity = max_age, capacity
+        self._expire()
+        while len(self._heap) > self.limit: # 上限を下げた分は方針に従って捨てる（方針がなければ新しいコメントを受け付けないだけ）
+            victim, _ = self._choose_victim(None)
+            if victim is None: break
+            self._remove(victim)
+            self._drop("shed_capacity")
+
+    def _drop(self, reason):
+        with self._lock: self._dropped[reason] = self._dropped.get(reason, 0) + 1
+        return False
+
+    def _remove(self, entry):
+        self._heap.remove(entry)
+        heapq.heapify(self._heap)
+        comment = entry[2]
+        if self._by_author.get(comment.author_id) is entry: del self._by_author[comment.author_id]
+
+    def _expire(self, now=None):
+        """"deadline": 投稿から max_age 秒を過ぎたコメントを捨てる"""
+        if "deadline" not in self.policies or self.max_age is None: return
+        now = now or time.time()
+        for entry in [e for e in self._heap if e[2].age(now) > self.max_age]:
+            self._remove(entry)
+            self._drop("shed_deadline")
+
+    def _choose_victim(self, comment):
+        """満杯のとき代わりに捨てるエントリと理由。None なら新しいコメント（comment）のほうを捨てる。"""
+        if not self._heap: return None, None
+        priority = comment.priority if comment is not None else PRIORITY_SUPERCHAT - 1
+        worst = max(e[0] for e in self._heap)
+        oldest_of_worst = lambda: min((e for e in self._heap if e[0] == worst), key=lambda e: e[2].received_at)
+        if "prefer_priority" in self.policies and worst > priority: return oldest_of_worst(), "shed_priority"
+        if "drop_oldest" in self.policies:
+            if "prefer_priority" in self.policies: # 優先度の高いコメントを古いからといって捨てない
+                return (oldest_of_worst(), "shed_oldest") if worst >= priority else (None, None)
+            return min(self._heap, key=lambda e: e[2].received_at), "shed_oldest"
+        return None, None
+
+    def offer(self, item):
+        """liveChatMessage の dict または ChatComment を受け付ける。キューに入れたら True、捨てたら False（理由は集計される）。"""
+        comment = item if isinstance(item, ChatComment) else ChatComment.from_item(item)
+        with self._lock: self._counts["received"] += 1
+        if self._closed: return self._drop("closed")
+        if comment.id is not None and not self.seen.add(comment.id): return self._drop("duplicate")
+        if not comment.text: return self._drop("no_text")
+        now = time.time()
+        if "deadline" in self.policies and self.max_age is not None and comment.age(now) > self.max_age: return self._drop("shed_deadline")
+        self._expire(now)
+        previous = self._by_author.get(comment.author_id) if "one_per_author" in self.policies and comment.author_id else None
+        if previous is not None:
+            if comment.priority > previous[0]: return self._drop("shed_same_author") # 応答待ちのスーパーチャットを残す
+            self._remove(previous)
+            self._drop("shed_same_author")
+        if len(self._heap) >= self.limit:
+            victim, reason = self._choose_victim(comment)
+            if victim is None: return self._drop("queue_full")
+            self._remove(victim)
+            self._drop(reason)
+        entry = (comment.priority, next(self._seq), comment)
+        heapq.heappush(self._heap, entry)
+        if comment.author_id: self._by_author[comment.author_id] = entry
+        with self._lock:
+            self._counts["enqueued"] += 1
+            self._counts["max_depth"] = max(self._counts["max_depth"], len(self._heap))
+            name = PRIORITY_NAMES.get(comment.priority, str(comment.priority))
+            self._enqueued_by_priority[name] = self._enqueued_by_priority.get(name, 0) + 1
+        self._not_empty.set()
+        return True
+
+    def offer_all(self, items):
+        """まとめて受け付け、キューに入った件数を返す"""
+        return sum(1 for item in items if self.offer(item))
+
+    def skip(self, items, reason):
+        """キューに入れずに既読にする（接続前の過去ログなど）。reason ごとの破棄件数に数える。"""
+        for item in items:
+            comment = item if isinstance(item, ChatComment) else ChatComment.from_item(item)
+            with self._lock: self._counts["received"] += 1
+            if comment.id is not None: self.seen.add(comment.id)
+            self._drop(reason)
+
+    async def get(self):
+        """優先度の高い順（同じなら古い順）に1件取り出す。空なら届くまで待つ。close() 後は None。"""
+        while not self._closed:
+            self._expire()
+            if self._heap: return self._pop()
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        return None
+
+    def take(self, n):
+        """待たずに最大 n 件を取り出す（まとめて返答するとき）"""
+        self._expire()
+        return [self._pop() for _ in range(min(max(0, n), len(self._heap)))]
+
+    def _pop(self):
+        entry = heapq.heappop(self._heap)
+        comment = entry[2]
+        if self._by_author.get(comment.author_id) is entry: del self._by_author[comment.author_id]
+        now = time.time()
+        with self._lock:
+            self._counts["dequeued"] += 1
+            self._queue_wait.observe(now - comment.received_at)
+            self._comment_age.observe(comment.age(now))
+        return comment
+
+    def close(self):
+        """待っているワーカーを起こして終了させる（残っているコメントは応答しない）"""
+        self._closed = True
+        self._not_empty.set()
+
+    def metrics(self):
+        now = time.time()
+        oldest = min((c.received_at for _, _, c in self._heap), default=None)
+        with self._lock:
+            return {**self._counts, "depth": len(self._heap), "oldest_wait_seconds": now - oldest if oldest is not None else 0.0,
+                    "limit": self.limit, "max_age": self.max_age, "policies": sorted(self.policies),
+                    "shed": sum(count for reason, count in self._dropped.items() if reason.startswith("shed_")),
+                    "dropped": dict(self._dropped), "enqueued_by_priority": dict(self._enqueued_by_priority),
+                    "queue_wait_seconds": self._queue_wait.to_dict(), "comment_age_seconds": self._comment_age.to_dict()}
+
+    @staticmethod
+    def format_metrics(metrics):
+        wait, age = metrics["queue_wait_seconds"], metrics["comment_age_seconds"]
+        def sec(h, key): return f"{h[key]:.1f}s" if h.get(key) is not None else "-"
+        dropped = ", ".join(f"{reason} {count}" for reason, count in sorted(metrics["dropped"].items())) or "0"
+        return (f"コメントキュー: 受信 {metrics['received']} / 応答待ち {metrics['depth']} (最大 {metrics['max_depth']}, 上限 {metrics['limit']}) / 取り出し {metrics['dequeued']}"
+                f" / 待ち p50 {sec(wait, 'p50')} p90 {sec(wait, 'p90')} / 鮮度 p50 {sec(age, 'p50')} / 破棄 {dropped}")
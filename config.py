@@ -111,7 +111,59 @@ class ConfigManager:
                 "conversation_history_length": 0, # 会話履歴の保持数 (0は記憶なし、1以上でその回数分の直近の会話を記憶)
                 "text_generation_model": "gemini-1.5-flash-latest", # デフォルトのテキスト生成モデルを更新
                 "ai_chat_processing_mode": "sequential", # "sequential" または "parallel"
-                "local_llm_endpoint_url": "" # LM StudioなどのローカルLLMのエンドポイントURL
+                "local_llm_endpoint_url": "", # LM StudioなどのローカルLLMのエンドポイントURL
+                "avis_speech_url": "http://127.0.0.1:10101", # Avis Speech Engine の URL（standin_servers.py で検証するときなどに変更）
+                "voicevox_url": "http://127.0.0.1:50021", # VOICEVOX Engine の URL
+                "youtube_api_base_url": "https://www.googleapis.com/youtube/v3", # YouTube Data API の URL
+                "chat_max_results": 200, # 1回のコメント取得の最大件数（埋まっていたら待たずに続きを取る）
+                "chat_min_poll_interval": 1.0, # サーバー推奨の取得間隔 (pollingIntervalMillis) の下限 (秒)
+                "chat_cursor_file": "live_chat_cursor.json", # 再接続時に続きから取得するためのカーソルの保存先
+                "comment_queue_max_size": 100, # 応答待ちコメントの上限（超えた分は破棄して件数を記録）
+                "comment_seen_ids_max": 5000, # 重複除去のために覚えておくメッセージIDの数
+                "comment_shed_policies": ["deadline", "one_per_author", "prefer_priority", "drop_oldest"], # 応答が追いつかないときの間引き方（deadline / one_per_author / prefer_priority / drop_oldest）
+                "stream_target_reply_latency": 30.0, # コメントの投稿から返答までの目標秒数（これに間に合わないコメントは間引く。0 で無効）
+                "stream_batch_enabled": True, # 応答待ちが多いとき、複数コメントへの返答を1回の LLM 呼び出しでまとめて生成する
+                "stream_batch_threshold": 3, # 応答待ちがこの件数以上になったらまとめる
+                "stream_batch_latency_budget": 4.0, # 待ち件数 × LLM レイテンシがこの秒数に収まるようにまとめる件数を決める
+                "stream_batch_max_size": 5,
+                "stream_reply_workers": 1, # 応答を並行して生成するワーカー数（読み上げは常に1件ずつ）
+                "stream_pipeline_enabled": True, # 生成・合成・再生を別タスクで並行させ、読み上げ中に次の返答を用意する（False で1件ずつ逐次処理）
+                "stream_stage_queue_size": 2, # 段の間のキューの上限（先に用意しておく返答・音声の数）
+                "youtube_daily_quota": 10000, # YouTube Data API の1日のクォータ（消費ペースの表示用）
+                "voice_http_pool_limit": 8, # ローカル音声エンジンへの同時接続数上限 (キープアライブ接続プール)
+                "voice_http_keepalive_timeout": 30.0, # キープアライブ接続の保持秒数
+                "voice_cache_enabled": True, # 合成済み音声のディスクキャッシュ
+                "voice_cache_dir": "voice_cache",
+                "voice_cache_max_mb": 200, # キャッシュの合計サイズ上限 (MB)。超過分は古いものから削除
+                "voice_pipeline_mode": True, # 配信時、文単位で合成と再生を並行させて最初の音声を早く出す
+                "voice_postprocess_enabled": True, # 合成音声のフォーマット統一・前後の無音除去・音量正規化 (numpy が必要)
+                "voice_postprocess_sample_rate": 24000,
+                "voice_postprocess_normalize": "peak", # "peak" | "rms" | None
+                "voice_postprocess_trim_threshold_db": -45.0, # これより小さい音量の区間を無音とみなす (dBFS)
+                "audio_output_sink": "auto", # "auto" | "sounddevice" | "aplay" | "subprocess"（クリップごとに再生コマンドを起動する従来方式）
+                "audio_output_buffer_seconds": 2.0, # 常駐出力ストリームのリングバッファ長 (秒)
+                "voice_breaker_failure_threshold": 3, # 連続失敗がこの回数に達したエンジンは一時的に遮断する
+                "voice_breaker_backoff_base": 5.0, # 遮断後の最初の再試行までの秒数 (失敗ごとに倍増)
+                "voice_breaker_backoff_max": 120.0,
+                "speaker_catalog_ttl": 300.0, # Avis Speech / VOICEVOX の話者一覧キャッシュの有効秒数
+                "voice_audio_query_cache_size": 256, # Avis Speech / VOICEVOX の audio_query 結果をメモリに保持する件数
+                "voice_priority_mode": "static", # "static"（固定の優先順）| "adaptive"（フォールバック先を成功率・レイテンシの実績順に並べる。キャラクターのエンジンは常に先頭）
+                "voice_priority_scores_file": "engine_scores.json", # adaptive 用に学習したエンジンのスコアの保存先
+                "voice_priority_failure_penalty": 5.0, # 失敗1回を何秒の遅れとみなすか (adaptive の順位付け用)
+                "phrase_bank_enabled": True, # あいさつ・お礼・つなぎ・おわびの定型フレーズをキャラクターごとに事前合成しておく
+                "phrase_bank_dir": "phrase_bank",
+                "phrase_bank_filler_enabled": False, # 応答生成が phrase_bank_filler_delay 秒を超えたら、つなぎのフレーズを先に再生する
+                "phrase_bank_filler_delay": 1.5,
+                "voice_coalesce_enabled": True, # 同じテキスト・声・話速の合成が実行中なら、エンジンを呼ばずにその結果を共有する
+                "voice_hedging_enabled": False, # 優先エンジンが遅いとき次のエンジンを並行起動し、先に返った方を使う
+                "voice_hedge_percentile": 0.9, # 優先エンジンの過去レイテンシのこのパーセンタイルを超えたら並行起動
+                "voice_hedge_default_delay": 1.5, # レイテンシ実績が少ないうちの待ち時間 (秒)
+                "voice_hedge_min_delay": 0.3,
+                "voice_hedge_max_parallel": 2, # 同時に走らせるエンジン数の上限
+                "voice_engine_concurrency": {"google_ai_studio_new": 4, "avis_speech": 2, "voicevox": 2, "system_tts": 1}, # エンジンごとの同時合成数の上限
+                "warmup_enabled": False, # 起動時に音声エンジン・話者一覧・LLM 接続をバックグラウンドで温めておく
+                "warmup_text": "テスト", # ウォームアップで合成するダミー発話
+                "voice_telemetry_dump_file": "" # 空でなければ配信終了時に音声合成テレメトリをこのパスへ JSON で書き出す
             },
             "characters": {},
             "streaming_settings": {
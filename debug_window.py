@@ -1,6 +1,6 @@
 import customtkinter
 import tkinter as tk # 基本的な型 (StringVarなど) と標準ダイアログのため
-from tkinter import messagebox, simpledialog # 標準ダイアログはそのまま使用 (filedialogは未使用)
+from tkinter import messagebox, simpledialog, filedialog # 標準ダイアログはそのまま使用
 import json
 import os
 import asyncio
@@ -14,6 +14,7 @@ import sys # フォント選択のため
 from config import ConfigManager
 from character_manager import CharacterManager
 from audio_manager import VoiceEngineManager, AudioPlayer, GoogleAIStudioNewVoiceAPI, AvisSpeechEngineAPI, VOICEVOXEngineAPI, SystemTTSAPI
+from voice_metrics import VoiceTelemetry
 from google import genai
 from google.genai import types as genai_types
 
@@ -44,7 +45,7 @@ class DebugWindow:
 
         self.config = ConfigManager()
         self.character_manager = CharacterManager(self.config)
-        self.voice_manager = VoiceEngineManager()
+        self.voice_manager = VoiceEngineManager(config_manager=self.config)
         self.audio_player = AudioPlayer(config_manager=self.config)
 
         self.current_test_character_id = None
@@ -117,6 +118,14 @@ class DebugWindow:
         api_test_frame.pack(fill="x", padx=5, pady=5)
         self._create_api_test_widgets(api_test_frame)
 
+        # 音声合成テレメトリ
+        telemetry_outer_frame = customtkinter.CTkFrame(main_scroll_frame)
+        telemetry_outer_frame.pack(fill="x", padx=5, pady=5)
+        customtkinter.CTkLabel(telemetry_outer_frame, text=self._("debug.label.voice_telemetry"), font=self.label_font).pack(anchor="w", padx=10, pady=(5,0))
+        telemetry_frame = customtkinter.CTkFrame(telemetry_outer_frame)
+        telemetry_frame.pack(fill="x", padx=5, pady=5)
+        self._create_telemetry_widgets(telemetry_frame)
+
         # AI対話テスト
         chat_test_outer_frame = customtkinter.CTkFrame(main_scroll_frame)
         chat_test_outer_frame.pack(fill="both", expand=True, padx=5, pady=5)
@@ -174,6 +183,50 @@ class DebugWindow:
         customtkinter.CTkButton(api_buttons, text=self._("debug.button.test_avis_speech"), command=self.test_avis_speech_connection, font=self.default_font).pack(side="left", padx=5, pady=5)
         customtkinter.CTkButton(api_buttons, text=self._("debug.button.test_voicevox"), command=self.test_voicevox_connection, font=self.default_font).pack(side="left", padx=5, pady=5)
 
+    def _create_telemetry_widgets(self, parent_frame: customtkinter.CTkFrame):
+        telemetry_buttons = customtkinter.CTkFrame(parent_frame, fg_color="transparent")
+        telemetry_buttons.pack(fill="x", pady=5)
+        customtkinter.CTkButton(telemetry_buttons, text=self._("debug.button.refresh_telemetry"), command=self.refresh_telemetry_view, font=self.default_font).pack(side="left", padx=2)
+        customtkinter.CTkButton(telemetry_buttons, text=self._("debug.button.save_telemetry"), command=self.save_telemetry_json, font=self.default_font).pack(side="left", padx=2)
+        customtkinter.CTkButton(telemetry_buttons, text=self._("debug.button.load_telemetry"), command=self.load_telemetry_json, font=self.default_font).pack(side="left", padx=2)
+        customtkinter.CTkButton(telemetry_buttons, text=self._("debug.button.reset_telemetry"), command=self.reset_telemetry, font=self.default_font).pack(side="left", padx=2)
+        self.telemetry_text = customtkinter.CTkTextbox(parent_frame, height=180, wrap="none", state="disabled", font=("Courier New", self.default_font[1] - 1))
+        self.telemetry_text.pack(fill="x", pady=5)
+
+    def _show_telemetry(self, snapshot, source_label):
+        self.telemetry_text.configure(state="normal")
+        self.telemetry_text.delete("1.0", "end")
+        self.telemetry_text.insert("end", f"{source_label}\n{VoiceTelemetry.format_snapshot(snapshot)}\n")
+        self.telemetry_text.configure(state="disabled")
+
+    def refresh_telemetry_view(self):
+        self._show_telemetry(self.voice_manager.get_telemetry_snapshot(), self._("debug.telemetry.current_process"))
+
+    def save_telemetry_json(self):
+        filepath = filedialog.asksaveasfilename(title=self._("debug.button.save_telemetry"), defaultextension=".json",
+                                                initialfile=f"voice_telemetry_{time.strftime('%Y%m%d_%H%M%S')}.json",
+                                                filetypes=[("JSON", "*.json")], parent=self.root)
+        if not filepath: return
+        try:
+            self.voice_manager.dump_telemetry(filepath)
+            self.log(self._("debug.log.telemetry_saved", path=filepath))
+        except Exception as e:
+            messagebox.showerror(self._("debug.messagebox.test_error.title"), self._("debug.messagebox.test_error.generic", e=e), parent=self.root)
+
+    def load_telemetry_json(self):
+        """別ウィンドウ（別プロセス）や別バージョンで保存したダンプを表示する"""
+        filepath = filedialog.askopenfilename(title=self._("debug.button.load_telemetry"), filetypes=[("JSON", "*.json")], parent=self.root)
+        if not filepath: return
+        try:
+            with open(filepath, "r", encoding="utf-8") as f: snapshot = json.load(f)
+            self._show_telemetry(snapshot, os.path.basename(filepath))
+        except Exception as e:
+            messagebox.showerror(self._("debug.messagebox.test_error.title"), self._("debug.messagebox.test_error.generic", e=e), parent=self.root)
+
+    def reset_telemetry(self):
+        self.voice_manager.telemetry.reset()
+        self.refresh_telemetry_view()
+
     def _create_chat_test_widgets(self, parent_frame: customtkinter.CTkFrame):
         char_select_frame = customtkinter.CTkFrame(parent_frame, fg_color="transparent")
         char_select_frame.pack(fill="x", pady=5)
@@ -247,12 +300,7 @@ class DebugWindow:
         engine_instance = self.voice_manager.get_engine_instance(engine_choice)
         if engine_instance:
             try:
-                if asyncio.iscoroutinefunction(getattr(engine_instance, 'check_availability', None)):
-                    loop = asyncio.new_event_loop(); asyncio.set_event_loop(loop)
-                    try: loop.run_until_complete(engine_instance.check_availability())
-                    finally: loop.close()
-                elif hasattr(engine_instance, 'check_availability'): engine_instance.check_availability()
-                voices = engine_instance.get_available_voices()
+                voices = engine_instance.get_available_voices() # ローカルエンジンは共有の話者カタログ (TTL付き) から取得
                 default_voice = voices[0] if voices else ""
             except Exception as e:
                 self.log(self._("debug.log.engine_voice_list_error", engine_choice=engine_choice, e=e))
@@ -297,25 +345,31 @@ class DebugWindow:
             loop = asyncio.new_event_loop(); asyncio.set_event_loop(loop)
             try:
                 engines_to_test = ["google_ai_studio_new", "avis_speech", "voicevox", "system_tts"]
+                # 話者一覧の更新はまとめて並行に行う（止まっているエンジンのタイムアウトを順に待たない）
+                refreshers = [e.refresh_speakers() for e in map(self.voice_manager.get_engine_instance, engines_to_test) if e and hasattr(e, 'refresh_speakers')]
+                if refreshers: loop.run_until_complete(asyncio.gather(*refreshers, return_exceptions=True))
+                requests_to_run = []
                 for i, engine_name in enumerate(engines_to_test):
                     engine_instance = self.voice_manager.get_engine_instance(engine_name)
                     if not engine_instance: continue
-                    if asyncio.iscoroutinefunction(getattr(engine_instance, 'check_availability', None)):
-                        loop.run_until_complete(engine_instance.check_availability())
-                    elif hasattr(engine_instance, 'check_availability'): engine_instance.check_availability()
                     voices = engine_instance.get_available_voices()
                     model_to_use = voices[0] if voices else None
                     if not model_to_use: self.log(self._("debug.log.engine_no_voices_skip", engine_name=engine_name)); continue
                     self.log(self._("debug.log.comparing_engine", current_engine_num=i+1, total_engines=len(engines_to_test), engine_name=engine_name, model_to_use=model_to_use))
                     current_test_text = self._("debug.log.comparison_engine_text_prefix", engine_num=i+1, engine_name=engine_name) + text
-                    audio_files = loop.run_until_complete(
-                        self.voice_manager.synthesize_with_fallback(current_test_text, model_to_use, 1.0, preferred_engine=engine_name, api_key=api_key_google)
-                    )
-                    if audio_files:
-                        loop.run_until_complete(self.audio_player.play_audio_files(audio_files))
-                        self.log(self._("debug.log.engine_comparison_playback_success", engine_name=engine_name))
-                    else: self.log(self._("debug.log.engine_comparison_playback_failure", engine_name=engine_name))
-                    time.sleep(0.5)
+                    requests_to_run.append({"text": current_test_text, "voice_model": model_to_use, "speed": 1.0, "preferred_engine": engine_name, "api_key": api_key_google,
+                                            "allow_fallback": False}) # 比較対象のエンジンが失敗したら、別のエンジンの声で代用せず失敗として記録する
+
+                async def synthesize_and_play_in_order():
+                    # 全エンジンの合成を並行して始め、再生だけ順番に行う
+                    async for result in self.voice_manager.synthesize_many(requests_to_run, ordered=True):
+                        engine_name = result["item"]["preferred_engine"]
+                        if result["files"]:
+                            await self.audio_player.play_audio_files(result["files"])
+                            self.log(self._("debug.log.engine_comparison_playback_success", engine_name=engine_name))
+                        else: self.log(self._("debug.log.engine_comparison_playback_failure", engine_name=engine_name))
+                        await asyncio.sleep(0.5)
+                loop.run_until_complete(synthesize_and_play_in_order())
                 self.log(self._("debug.log.all_engines_comparison_complete"))
             except Exception as e:
                 self.log(self._("debug.log.all_engines_comparison_error", e=e))
@@ -412,8 +466,8 @@ class DebugWindow:
         self.log(self._("debug.log.local_engine_connection_test_start", engine_name=engine_name))
         def run_async():
             loop = asyncio.new_event_loop(); asyncio.set_event_loop(loop)
+            engine = engine_class()
             try:
-                engine = engine_class()
                 is_available = loop.run_until_complete(engine.check_availability())
                 if is_available:
                     voices = engine.get_available_voices()
@@ -426,7 +480,9 @@ class DebugWindow:
             except Exception as e:
                 self.log(self._("debug.log.local_engine_test_error", engine_name=engine_name, e=e))
                 messagebox.showerror(self._("debug.messagebox.local_engine_test_error.title", engine_name=engine_name), self._("debug.messagebox.test_error.generic", e=e), parent=self.root)
-            finally: loop.close()
+            finally:
+                loop.run_until_complete(engine.http_pool.close())
+                loop.close()
         threading.Thread(target=run_async, daemon=True).start()
 
     def test_avis_speech_connection(self): self._test_local_engine_connection("Avis Speech Engine", AvisSpeechEngineAPI)
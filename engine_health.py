@@ -0,0 +1,160 @@
+"""
+音声エンジンのヘルス管理（サーキットブレーカー）
+
+合成のたびに check_availability() で疎通確認するのをやめ、実際の合成結果で各エンジンの状態を管理する。
+
+- closed    : 正常。リクエストを通す
+- open      : 連続失敗で遮断中。再試行時刻まではリクエストを通さない（コストゼロでスキップ）
+- half_open : 再試行時刻を過ぎた。試行リクエストを1件だけ通し、成功で closed・失敗で open に戻す
+
+open 中のエンジンは専用スレッドのイベントループでバックグラウンドに疎通確認し、
+成功したら half_open に移す。確認間隔は失敗するたびに倍増する（上限あり）。
+"""
+
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class EngineHealth:
+    """1エンジン分のサーキットブレーカー状態"""
+
+    def __init__(self, name, failure_threshold=3, backoff_base=5.0, backoff_max=120.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.backoff = backoff_base
+        self.retry_at = 0.0
+        self.trial_in_flight = False
+        self.total_successes = 0
+        self.total_failures = 0
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self, probe_capable=False):
+        """このエンジンにリクエストを送ってよいか。open 中は再試行時刻まで False。"""
+        with self._lock:
+            if self.state == CLOSED: return True
+            if self.state == OPEN:
+                # 疎通確認できるエンジンはバックグラウンド確認の結果を待つ。できないものは実リクエストを試行にする
+                if probe_capable or time.monotonic() < self.retry_at: return False
+                self.state = HALF_OPEN
+            if self.trial_in_flight: return False
+            self.trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED: logger.info(f"EngineHealth[{self.name}]: {self.state} -> closed")
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self.backoff = self.backoff_base
+            self.trial_in_flight = False
+            self.total_successes += 1
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.total_failures += 1
+            self.trial_in_flight = False
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self._open_locked()
+
+    def _open_locked(self):
+        # 再試行でも失敗した場合のみ間隔を倍増する
+        self.backoff = min(self.backoff * 2, self.backoff_max) if self.state in (OPEN, HALF_OPEN) else self.backoff_base
+        self.state = OPEN
+        self.times_opened += 1
+        self.retry_at = time.monotonic() + self.backoff
+        logger.warning(f"EngineHealth[{self.name}]: open (retry in {self.backoff:.0f}s, failures={self.consecutive_failures})")
+
+    def abandon_request(self):
+        """キャンセルなどで結果が出なかったリクエストの試行枠を解放する"""
+        with self._lock: self.trial_in_flight = False
+
+    def record_probe(self, ok):
+        """バックグラウンド疎通確認の結果を反映する"""
+        with self._lock:
+            if self.state != OPEN: return
+            if ok:
+                self.state = HALF_OPEN
+                logger.info(f"EngineHealth[{self.name}]: probe ok, open -> half_open")
+            else:
+                self._open_locked()
+
+    def is_probe_due(self):
+        with self._lock: return self.state == OPEN and time.monotonic() >= self.retry_at
+
+    def snapshot(self):
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.consecutive_failures,
+                    "retry_in": max(0.0, self.retry_at - time.monotonic()) if self.state == OPEN else 0.0,
+                    "backoff": self.backoff, "times_opened": self.times_opened,
+                    "total_successes": self.total_successes, "total_failures": self.total_failures}
+
+
+class EngineHealthMonitor:
+    """全エンジンのブレーカーと、open 中エンジンのバックグラウンド疎通確認スレッドを管理する"""
+
+    def __init__(self, engines, failure_threshold=3, backoff_base=5.0, backoff_max=120.0):
+        self.engines = engines
+        self.health = {name: EngineHealth(name, failure_threshold, backoff_base, backoff_max) for name in engines}
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def _probe_capable(self, name):
+        return asyncio.iscoroutinefunction(getattr(self.engines[name], 'check_availability', None))
+
+    def allow_request(self, name): return self.health[name].allow_request(self._probe_capable(name))
+    def record_success(self, name): self.health[name].record_success()
+    def abandon_request(self, name): self.health[name].abandon_request()
+    def record_probe(self, name, ok): self.health[name].record_probe(ok)
+
+    def record_failure(self, name):
+        health = self.health[name]
+        health.record_failure()
+        if health.state == OPEN and self._probe_capable(name): self._ensure_probe_thread()
+
+    def get_state(self, name): return self.health[name].state
+    def snapshot(self): return {name: h.snapshot() for name, h in self.health.items()}
+
+    def _ensure_probe_thread(self):
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._probe_worker, name="EngineHealthProbe", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def _probe_worker(self):
+        """open 中のエンジンを再試行時刻ごとに疎通確認する。open のエンジンがなくなったら終了する。"""
+        loop = asyncio.new_event_loop()
+        try:
+            while True:
+                with self._thread_lock: # 終了判定と _ensure_probe_thread の競合を防ぐ
+                    open_names = [n for n, h in self.health.items() if h.state == OPEN and self._probe_capable(n)]
+                    if not open_names: self._thread = None; break
+                for name in open_names:
+                    if not self.health[name].is_probe_due(): continue
+                    try: ok = bool(loop.run_until_complete(self.engines[name].check_availability()))
+                    except Exception as e: logger.debug(f"EngineHealth[{name}]: probe error {e}"); ok = False
+                    self.health[name].record_probe(ok)
+                next_due = min((self.health[n].retry_at for n in open_names if self.health[n].state == OPEN), default=time.monotonic())
+                self._wakeup.wait(timeout=max(0.05, min(1.0, next_due - time.monotonic())))
+                self._wakeup.clear()
+        finally:
+            for engine in self.engines.values():
+                if hasattr(engine, 'http_pool'):
+                    try: loop.run_until_complete(engine.http_pool.close())
+                    except Exception: pass
+            loop.close()
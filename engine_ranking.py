@@ -0,0 +1,120 @@
+"""
+音声エンジンの適応的な優先順位
+
+エンジンごとに成功率とレイテンシの指数移動平均 (EWMA) を持ち、
+「使える音声が得られるまでの期待秒数」= 平均レイテンシ + 失敗率 × 失敗ペナルティ で順位を付ける。
+学習結果はディスクに保存し、次回起動時にも引き継ぐ（話者カタログと同じくプロセス内で共有）。
+ランチャーの各ウィンドウは別プロセスで同じファイルに保存するため、保存時にディスク上の内容と
+エンジンごとに突き合わせ、更新時刻 (updated_at) の新しいほうを残す。プロセス終了時にも未保存分を書き出す。
+
+ガードレール（VoiceEngineManager.get_engine_order 側で適用）:
+- キャラクターが選んだエンジンは学習結果に関係なく常に先頭（声が勝手に差し替わらない）
+- 並べ替えるのは、そのエンジンが失敗したときのフォールバック先だけ
+- キャラクターの voice_settings.fallback_engines でフォールバック先を限定できる
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCORES_FILE = "engine_scores.json"
+DEFAULT_ALPHA = 0.1            # EWMA の重み（直近 10 件程度が支配的）
+DEFAULT_FAILURE_PENALTY = 5.0  # 失敗1回あたりの損失（秒）。失敗するとフォールバックでこれくらい待たされる
+DEFAULT_PRIOR_LATENCY = 1.0    # 実績のないエンジンの仮の平均レイテンシ（楽観的に置いて試されるようにする）
+SAVE_INTERVAL = 30.0
+
+_scoreboards = {}
+_scoreboards_lock = threading.Lock()
+
+
+def get_engine_scoreboard(path=DEFAULT_SCORES_FILE):
+    """保存先ファイルごとに共有される EngineScoreboard を返す"""
+    path = os.path.abspath(path)
+    with _scoreboards_lock:
+        if path not in _scoreboards:
+            _scoreboards[path] = EngineScoreboard(path)
+            atexit.register(_scoreboards[path].save, force=True) # 間引いて保存しているぶんを終了時に書き出す
+        return _scoreboards[path]
+
+
+class EngineScoreboard:
+    """エンジン別の成功率・レイテンシの EWMA と、それに基づく順位付け"""
+
+    def __init__(self, path=DEFAULT_SCORES_FILE, alpha=DEFAULT_ALPHA, failure_penalty=DEFAULT_FAILURE_PENALTY, prior_latency=DEFAULT_PRIOR_LATENCY):
+        self.path = path
+        self.alpha = alpha
+        self.failure_penalty = failure_penalty
+        self.prior_latency = prior_latency
+        self._scores = {}  # {engine_name: {"success_rate", "latency", "samples", "updated_at"}}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = 0.0
+        self._load()
+
+    def _read(self):
+        """ディスク上の {engine_name: スコア}。読めなければ空。"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f: data = json.load(f)
+            return {name: s for name, s in data.get("engines", {}).items() if isinstance(s, dict)}
+        except FileNotFoundError: return {}
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"EngineScoreboard: Failed to load {self.path}: {e}")
+            return {}
+
+    def _load(self):
+        self._scores = self._read()
+        if self._scores: logger.info(f"EngineScoreboard: Loaded scores for {list(self._scores)} from {self.path}")
+
+    def save(self, force=False):
+        """変更があれば保存する（force=False なら SAVE_INTERVAL 秒に1回まで）"""
+        with self._lock:
+            if not self._dirty or (not force and time.time() - self._saved_at < SAVE_INTERVAL): return False
+            # 他のプロセスが保存したエンジンのスコアのほうが新しければ、そちらを取り込んでから書き出す
+            for name, theirs in self._read().items():
+                ours = self._scores.get(name)
+                if ours is None or theirs.get("updated_at", 0) > ours.get("updated_at", 0): self._scores[name] = theirs
+            data = {"saved_at": time.time(), "engines": {name: dict(s) for name, s in self._scores.items()}}
+            self._dirty = False
+            self._saved_at = time.time()
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f: json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+            return True
+        except OSError as e:
+            logger.warning(f"EngineScoreboard: Failed to save {self.path}: {e}")
+            return False
+
+    def record(self, engine_name, ok, latency=None):
+        """合成1回分の結果を反映する。latency は成功時のみ（失敗時の時間は失敗ペナルティで代表させる）"""
+        with self._lock:
+            s = self._scores.get(engine_name)
+            if s is None: s = self._scores[engine_name] = {"success_rate": 1.0 if ok else 0.0, "latency": latency if ok and latency is not None else None, "samples": 0}
+            else: s["success_rate"] += self.alpha * ((1.0 if ok else 0.0) - s["success_rate"])
+            if ok and latency is not None:
+                s["latency"] = latency if s.get("latency") is None else s["latency"] + self.alpha * (latency - s["latency"])
+            s["samples"] += 1
+            s["updated_at"] = time.time()
+            self._dirty = True
+        self.save()
+
+    def expected_cost(self, engine_name):
+        """使える音声が得られるまでの期待秒数（小さいほど良い）"""
+        with self._lock: s = dict(self._scores.get(engine_name) or {})
+        latency = s.get("latency")
+        if latency is None: latency = self.prior_latency
+        return latency + (1.0 - s.get("success_rate", 1.0)) * self.failure_penalty
+
+    def rank(self, engine_names):
+        """期待秒数の小さい順に並べる（同点なら元の順序を保つ）"""
+        return sorted(engine_names, key=self.expected_cost)
+
+    def snapshot(self):
+        with self._lock: scores = {name: dict(s) for name, s in self._scores.items()}
+        for name in scores: scores[name]["expected_cost"] = self.expected_cost(name)
+        return scores
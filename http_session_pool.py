@@ -0,0 +1,96 @@
+"""
+音声エンジン用 HTTP 接続プール
+
+ローカル音声エンジン (Avis Speech / VOICEVOX) への HTTP 通信で
+aiohttp.ClientSession を毎回作り直さず、キープアライブ接続を再利用するためのヘルパー。
+
+- セッションはイベントループ単位で保持する（aiohttp のセッションは生成したループに束縛されるため）
+- UI 側はスレッドごとに new_event_loop() を作るので、閉じられたループのセッションは自動的に破棄する
+- 接続の新規作成数・再利用数を TraceConfig で数え、get_stats() で参照できる
+"""
+
+import asyncio
+import logging
+import threading
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPSessionPool:
+    """イベントループ単位で aiohttp.ClientSession を保持するキープアライブ接続プール"""
+
+    def __init__(self, name, limit=8, limit_per_host=8, keepalive_timeout=30.0):
+        self.name = name
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self._sessions = {}  # {event_loop: aiohttp.ClientSession}
+        self._lock = threading.Lock()
+        self._stats = {"sessions_created": 0, "requests": 0, "connections_created": 0, "connections_reused": 0}
+
+    def configure(self, limit=None, limit_per_host=None, keepalive_timeout=None):
+        """プール設定を変更する。既存セッションには次回作成時から反映される。"""
+        if limit is not None: self.limit = int(limit)
+        if limit_per_host is not None: self.limit_per_host = int(limit_per_host)
+        if keepalive_timeout is not None: self.keepalive_timeout = float(keepalive_timeout)
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _create_trace_config(self):
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx, params): self._count("requests")
+        async def on_connection_create_end(session, ctx, params): self._count("connections_created")
+        async def on_connection_reuseconn(session, ctx, params): self._count("connections_reused")
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    def _discard_stale_sessions_locked(self):
+        """閉じられたイベントループに紐づくセッションを破棄する（_lock 取得済みで呼ぶこと）"""
+        for loop in [l for l in self._sessions if l.is_closed()]:
+            session = self._sessions.pop(loop)
+            # ループが既に閉じているので await できない。コネクタを同期的にクローズ済みにして
+            # "Unclosed client session" の警告を防ぐ（aiohttp 内部の _close は閉じたループを考慮済み）
+            try:
+                if session.connector is not None and hasattr(session.connector, "_close"): session.connector._close()
+            except Exception: pass
+
+    def get_session(self):
+        """現在のイベントループ用のセッションを返す（なければ作成）。コルーチン内から呼ぶこと。"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._discard_stale_sessions_locked()
+            session = self._sessions.get(loop)
+            if session is None or session.closed:
+                connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host,
+                                                 keepalive_timeout=self.keepalive_timeout)
+                session = aiohttp.ClientSession(connector=connector, trace_configs=[self._create_trace_config()])
+                self._sessions[loop] = session
+                self._stats["sessions_created"] += 1
+                logger.debug(f"HTTPSessionPool[{self.name}]: New session for loop {id(loop)}")
+            return session
+
+    async def close(self):
+        """現在のイベントループのセッションを閉じ、閉じられたループのセッションも破棄する"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            session = self._sessions.pop(loop, None)
+            self._discard_stale_sessions_locked()
+        if session is not None and not session.closed:
+            await session.close()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["open_sessions"] = sum(1 for s in self._sessions.values() if not s.closed)
+        total = stats["connections_created"] + stats["connections_reused"]
+        stats["reuse_ratio"] = stats["connections_reused"] / total if total else 0.0
+        stats.update({"limit": self.limit, "limit_per_host": self.limit_per_host, "keepalive_timeout": self.keepalive_timeout})
+        return stats
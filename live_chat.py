@@ -0,0 +1,161 @@
+"""
+YouTube ライブチャットの差分取得
+
+liveChatMessages.list を nextPageToken で続きから取得し、前回以降の新しいメッセージだけを受け取る。
+次の取得までの間隔はレスポンスの pollingIntervalMillis（サーバーの推奨値）に従う。
+
+- 1ページが maxResults 件で埋まっていたら取りこぼしがないよう待たずに続きを取る（コメントが集中したとき）
+- カーソル (nextPageToken) はチャットIDごとにファイルへ保存し、配信を再接続しても続きから取得する
+- API のクォータ消費（videos.list = 1, liveChatMessages.list = 5 ユニット）を記録し、1時間あたりの消費量を出す
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# YouTube Data API v3 のクォータコスト（ユニット）
+QUOTA_COSTS = {"videos.list": 1, "liveChatMessages.list": 5}
+DEFAULT_CURSOR_FILE = "live_chat_cursor.json"
+CURSOR_MAX_AGE = 6 * 3600  # これより古いカーソルは使わない（トークンの期限切れ・別の配信）
+
+
+class QuotaMeter:
+    """API 呼び出しごとのクォータ消費を記録する"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.calls = {}  # {method: 回数}
+        self.total_units = 0
+        self._recent = deque()  # [(時刻, ユニット)]（直近1時間分）
+        self._lock = threading.Lock()
+
+    def record(self, method, units=None):
+        units = QUOTA_COSTS.get(method, 1) if units is None else units
+        now = time.time()
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            self.total_units += units
+            self._recent.append((now, units))
+            self._trim(now)
+
+    def _trim(self, now):
+        while self._recent and now - self._recent[0][0] > 3600: self._recent.popleft()
+
+    def snapshot(self):
+        now = time.time()
+        with self._lock:
+            self._trim(now)
+            last_hour = sum(units for _, units in self._recent)
+            elapsed_hours = max((now - self.started_at) / 3600.0, 1e-9)
+            return {"total_units": self.total_units, "units_last_hour": last_hour,
+                    "units_per_hour": self.total_units / elapsed_hours if elapsed_hours >= 1.0 else last_hour, # 1時間未満は直近1時間の実績と同じ
+                    "calls": dict(self.calls), "elapsed_seconds": now - self.started_at}
+
+    @staticmethod
+    def format_snapshot(snapshot, daily_quota=None):
+        text = f"API クォータ: 直近1時間 {snapshot['units_last_hour']} ユニット / 累計 {snapshot['total_units']} ユニット ({snapshot['calls']})"
+        if daily_quota and snapshot["units_per_hour"] > 0:
+            text += f" / 1日の上限 {daily_quota} まで約 {daily_quota / snapshot['units_per_hour']:.1f} 時間"
+        return text
+
+
+class LiveChatPoller:
+    """liveChatMessages.list を nextPageToken で続きから取得する"""
+
+    def __init__(self, api_key, base_url, chat_id, quota=None, cursor_path=DEFAULT_CURSOR_FILE, max_results=200, default_interval=5.0, min_interval=1.0):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.chat_id = chat_id
+        self.quota = quota or QuotaMeter()
+        self.cursor_path = cursor_path
+        self.max_results = max(1, min(2000, int(max_results)))
+        self.default_interval = default_interval  # サーバーから推奨値が来ないときの間隔
+        self.min_interval = min_interval          # 推奨値が極端に短い場合の下限
+        self.page_token = None
+        self.server_interval = None
+        self.page_was_full = False
+        self.stats = {"polls": 0, "items": 0, "empty_polls": 0, "full_pages": 0, "errors": 0, "resumed": False}
+        self._resume_cursor()
+
+    # --- カーソルの保存・復元 ---
+    def _read_cursors(self):
+        try:
+            with open(self.cursor_path, "r", encoding="utf-8") as f: data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except FileNotFoundError: return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"LiveChatPoller: Failed to read {self.cursor_path}: {e}")
+            return {}
+
+    def _resume_cursor(self):
+        if not self.cursor_path: return
+        entry = self._read_cursors().get(self.chat_id)
+        if entry and entry.get("page_token") and time.time() - entry.get("saved_at", 0) < CURSOR_MAX_AGE:
+            self.page_token = entry["page_token"]
+            self.stats["resumed"] = True
+            logger.info(f"LiveChatPoller: Resuming chat {self.chat_id} from the saved cursor")
+
+    def _save_cursor(self):
+        if not self.cursor_path: return
+        now = time.time()
+        cursors = {chat_id: entry for chat_id, entry in self._read_cursors().items() if now - entry.get("saved_at", 0) < CURSOR_MAX_AGE}
+        cursors[self.chat_id] = {"page_token": self.page_token, "saved_at": now}
+        try:
+            tmp_path = f"{self.cursor_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f: json.dump(cursors, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.cursor_path)
+        except OSError as e:
+            logger.warning(f"LiveChatPoller: Failed to save cursor: {e}")
+
+    def reset_cursor(self):
+        """カーソルを捨てて、次回は直近のメッセージから取り直す"""
+        self.page_token = None
+
+    # --- 取得 ---
+    def _fetch(self):
+        params = {"liveChatId": self.chat_id, "part": "snippet,authorDetails", "maxResults": self.max_results, "key": self.api_key}
+        if self.page_token: params["pageToken"] = self.page_token
+        response = requests.get(f"{self.base_url}/liveChat/messages", params=params, timeout=10)
+        self.quota.record("liveChatMessages.list") # エラー応答でもクォータは消費される
+        return response
+
+    async def poll(self):
+        """前回の取得以降の新しいメッセージ（古い順）を返す。取得に失敗したら例外を送出する。"""
+        self.stats["polls"] += 1
+        try:
+            response = await asyncio.to_thread(self._fetch)
+            if response.status_code == 400 and self.page_token: # 期限切れなどで使えないカーソル
+                logger.warning(f"LiveChatPoller: Page token rejected ({response.status_code}); restarting from the latest messages")
+                self.reset_cursor()
+                response = await asyncio.to_thread(self._fetch)
+            response.raise_for_status()
+            data = response.json()
+        except Exception:
+            self.stats["errors"] += 1
+            self.server_interval, self.page_was_full = None, False
+            raise
+        items = data.get("items", [])
+        interval_ms = data.get("pollingIntervalMillis")
+        self.server_interval = interval_ms / 1000.0 if isinstance(interval_ms, (int, float)) else None
+        self.page_was_full = len(items) >= self.max_results and bool(data.get("nextPageToken"))
+        if data.get("nextPageToken") and data["nextPageToken"] != self.page_token:
+            self.page_token = data["nextPageToken"]
+            self._save_cursor()
+        self.stats["items"] += len(items)
+        if not items: self.stats["empty_polls"] += 1
+        if self.page_was_full: self.stats["full_pages"] += 1
+        return items
+
+    def next_delay(self):
+        """次の取得までに待つ秒数（サーバーの推奨値。ページが埋まっていたら待たずに続きを取る）"""
+        if self.page_was_full: return 0.0
+        if self.server_interval is None: return self.default_interval
+        return max(self.min_interval, self.server_interval)
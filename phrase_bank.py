@@ -0,0 +1,216 @@
+"""
+キャラクターごとの定型フレーズバンク
+
+あいさつ・コメントへのお礼・「ちょっと考え中です」のようなつなぎ・エラー時のおわびなど、
+毎回同じになる短いセリフを事前に合成しておき、合成待ちなしで再生できるようにする。
+
+- フレーズはキャラクター設定の "phrase_bank"（{カテゴリ: [テキスト, ...]}）で上書きでき、ない場合は DEFAULT_PHRASES
+- 1キャラクター = <char_id>.pcm（全フレーズの PCM を連結したもの）+ <char_id>.json（各フレーズの位置・フォーマット）
+  読み込みはファイル1回分で、各フレーズは memoryview の切り出しなのでコピーしない
+- 声の設定（エンジン・声・話速）とフレーズのフィンガープリントが変わったらバックグラウンドで作り直す
+- ランチャーから各ウィンドウが別プロセスで起動されるため、他プロセスが作り直した結果はフィンガープリントで検出して読み直す
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+
+from audio_clip import AudioClip
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BANK_DIR = "phrase_bank"
+
+# streaming.py の固定の応答文もここに含め、合成せずに再生できるようにする
+DEFAULT_PHRASES = {
+    "greeting": ["こんにちは！配信に来てくれてありがとう！", "いらっしゃい！ゆっくりしていってね。"],
+    "thanks": ["コメントありがとう！", "ありがとう、うれしいです！"],
+    "thinking": ["ちょっと考え中です。", "うーん、そうですね…", "えっとですね…"],
+    "error": ["ごめんなさい、ちょっと考え中です。", "うーん、うまく言葉にできませんでした。",
+              "予期せぬエラーで応答できませんでした。", "その内容についてはお答えできません。"],
+}
+
+_banks = {}
+_banks_lock = threading.Lock()
+
+
+def get_phrase_bank(char_id, bank_dir=DEFAULT_BANK_DIR):
+    """キャラクターごとに共有される PhraseBank を返す"""
+    key = (os.path.abspath(bank_dir), char_id)
+    with _banks_lock:
+        if key not in _banks: _banks[key] = PhraseBank(char_id, bank_dir)
+        return _banks[key]
+
+
+def get_phrases(char_data):
+    """キャラクター設定のフレーズ（未指定のカテゴリは DEFAULT_PHRASES）"""
+    phrases = {category: list(texts) for category, texts in DEFAULT_PHRASES.items()}
+    for category, texts in ((char_data or {}).get("phrase_bank") or {}).items():
+        if isinstance(texts, list): phrases[category] = [t for t in texts if isinstance(t, str) and t.strip()]
+    return phrases
+
+
+class PhraseBank:
+    """1キャラクター分の合成済みフレーズ（メモリ上の AudioClip とディスク上の連結 PCM）"""
+
+    def __init__(self, char_id, bank_dir=DEFAULT_BANK_DIR):
+        self.char_id = char_id
+        self.bank_dir = os.path.abspath(bank_dir)
+        self.fingerprint = None
+        self._clips = {}   # {text: AudioClip}
+        self._categories = {}  # {category: [text, ...]}（合成できたものだけ）
+        self._lock = threading.Lock()
+        self._build_thread = None
+        self._loaded_mtime = None
+
+    def _pcm_path(self): return os.path.join(self.bank_dir, f"{self.char_id}.pcm")
+    def _index_path(self): return os.path.join(self.bank_dir, f"{self.char_id}.json")
+
+    @staticmethod
+    def make_fingerprint(char_data, sample_rate=None):
+        """声の設定とフレーズが同じなら同じ値になる（変わったら作り直す）"""
+        voice_settings = (char_data or {}).get("voice_settings", {})
+        payload = json.dumps([voice_settings.get("engine"), voice_settings.get("model"), round(float(voice_settings.get("speed", 1.0) or 1.0), 3),
+                              sample_rate, get_phrases(char_data)], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # --- 参照 ---
+    def is_ready(self, fingerprint=None):
+        self._reload_if_changed()
+        return bool(self._clips) and (fingerprint is None or fingerprint == self.fingerprint)
+
+    def lookup(self, text, fingerprint=None):
+        """
+        テキストが完全に一致する合成済みフレーズ。なければ None。
+        fingerprint（今の声の設定の make_fingerprint()）を渡すと、違う声で作られたバンクは作り直しが終わるまで使わない。
+        """
+        self._reload_if_changed()
+        with self._lock:
+            if fingerprint is not None and fingerprint != self.fingerprint: return None
+            return self._clips.get((text or "").strip())
+
+    def pick(self, category, fingerprint=None):
+        """カテゴリからランダムに1つ選んで (テキスト, AudioClip) を返す。なければ (None, None)。fingerprint は lookup() と同じ。"""
+        self._reload_if_changed()
+        with self._lock:
+            if fingerprint is not None and fingerprint != self.fingerprint: return None, None
+            texts = self._categories.get(category)
+            if not texts: return None, None
+            text = random.choice(texts)
+            return text, self._clips[text]
+
+    def get_stats(self):
+        with self._lock:
+            return {"phrases": len(self._clips), "bytes": sum(c.nbytes for c in self._clips.values()),
+                    "seconds": sum(c.duration for c in self._clips.values()), "building": self.is_building()}
+
+    def is_building(self): return bool(self._build_thread and self._build_thread.is_alive())
+
+    # --- 読み込み・保存 ---
+    def _reload_if_changed(self):
+        try: mtime = os.path.getmtime(self._index_path())
+        except OSError: return
+        if mtime != self._loaded_mtime: self.load()
+
+    def load(self):
+        """ディスクから読み込む。成功なら True。"""
+        try:
+            index_mtime = os.path.getmtime(self._index_path())
+            with open(self._index_path(), "r", encoding="utf-8") as f: index = json.load(f)
+            with open(self._pcm_path(), "rb") as f: pcm = memoryview(f.read())
+            clips, categories = {}, {}
+            for entry in index.get("phrases", []):
+                start, length = entry["offset"], entry["length"]
+                if start + length > len(pcm): raise ValueError(f"PCM file is shorter than the index ({entry['text'][:20]})")
+                clips[entry["text"]] = AudioClip(pcm[start:start + length], entry["sample_rate"], entry["channels"], entry["sample_width"], source="phrase_bank")
+                categories.setdefault(entry["category"], []).append(entry["text"])
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"PhraseBank[{self.char_id}]: Failed to load: {e}")
+            return False
+        with self._lock:
+            self._clips, self._categories = clips, categories
+            self.fingerprint = index.get("fingerprint")
+            self._loaded_mtime = index_mtime
+        logger.info(f"PhraseBank[{self.char_id}]: Loaded {len(clips)} phrases")
+        return True
+
+    def _save(self, fingerprint, entries):
+        """entries = [(category, text, AudioClip)] を連結 PCM とインデックスに書き出す（他プロセスが読みかけでも壊れないよう置き換えで保存）"""
+        os.makedirs(self.bank_dir, exist_ok=True)
+        index, offset = [], 0
+        tmp_pcm, tmp_index = f"{self._pcm_path()}.tmp", f"{self._index_path()}.tmp"
+        with open(tmp_pcm, "wb") as f:
+            for category, text, clip in entries:
+                f.write(clip.pcm)
+                index.append({"category": category, "text": text, "offset": offset, "length": clip.nbytes,
+                              "sample_rate": clip.sample_rate, "channels": clip.channels, "sample_width": clip.sample_width})
+                offset += clip.nbytes
+        with open(tmp_index, "w", encoding="utf-8") as f:
+            json.dump({"char_id": self.char_id, "fingerprint": fingerprint, "phrases": index}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_pcm, self._pcm_path()) # PCM を先に置き換え、インデックスの更新をもって完了とする
+        os.replace(tmp_index, self._index_path())
+
+    def delete(self):
+        with self._lock: self._clips, self._categories, self.fingerprint = {}, {}, None
+        for path in (self._pcm_path(), self._index_path()):
+            try: os.unlink(path)
+            except FileNotFoundError: pass
+            except OSError as e: logger.warning(f"PhraseBank[{self.char_id}]: Failed to delete {path}: {e}")
+
+    # --- 合成 ---
+    async def build(self, voice_manager, char_data, api_key=None):
+        """全フレーズを合成して保存する。合成できたフレーズ数を返す。"""
+        voice_settings = char_data.get("voice_settings", {})
+        engine = voice_settings.get("engine")
+        phrases = get_phrases(char_data)
+        fingerprint = self.make_fingerprint(char_data, voice_manager.postprocessor.sample_rate)
+        items = [{"text": text, "voice_model": voice_settings.get("model"), "speed": voice_settings.get("speed", 1.0),
+                  "preferred_engine": engine, "api_key": api_key if engine and "google_ai_studio" in engine else None, "character_id": self.char_id,
+                  "allow_fallback": False} # 別のエンジンの声をこのキャラクターの声として保存しない
+                 for texts in phrases.values() for text in dict.fromkeys(texts)]
+        categories = {text: category for category, texts in phrases.items() for text in texts}
+        entries = []
+        async for result in voice_manager.synthesize_many(items, ordered=True):
+            clips = [c for c in result["files"] if isinstance(c, AudioClip)]
+            if not clips:
+                logger.warning(f"PhraseBank[{self.char_id}]: Failed to synthesize '{result['item']['text']}': {result['error']}")
+                continue
+            try: clip = AudioClip.concat(clips)
+            except ValueError as e: logger.warning(f"PhraseBank[{self.char_id}]: {e}"); continue
+            entries.append((categories[result["item"]["text"]], result["item"]["text"], clip))
+        if not entries: return 0
+        await asyncio.to_thread(self._save, fingerprint, entries)
+        self.load()
+        logger.info(f"PhraseBank[{self.char_id}]: Built {len(entries)}/{len(items)} phrases")
+        return len(entries)
+
+    def refresh_in_background(self, config_manager, voice_manager_factory):
+        """
+        キャラクター設定と保存済みバンクのフィンガープリントが違えば、バックグラウンドスレッドで作り直す。
+        voice_manager_factory() はそのスレッド用の VoiceEngineManager を返す。作り直しを始めたら True。
+        """
+        char_data = config_manager.get_character(self.char_id)
+        if not char_data: return False
+        with self._lock:
+            if self.is_building(): return False
+            self._build_thread = threading.Thread(target=self._run_build, args=(config_manager, voice_manager_factory, char_data), daemon=True)
+            self._build_thread.start()
+        return True
+
+    def _run_build(self, config_manager, voice_manager_factory, char_data):
+        voice_manager = voice_manager_factory()
+        if self.is_ready(self.make_fingerprint(char_data, voice_manager.postprocessor.sample_rate)): return
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try: loop.run_until_complete(self.build(voice_manager, char_data, config_manager.get_system_setting("google_ai_api_key")))
+        except Exception as e: logger.error(f"PhraseBank[{self.char_id}]: Build failed: {e}")
+        finally:
+            try: loop.run_until_complete(voice_manager.close())
+            except Exception as e: logger.warning(f"PhraseBank[{self.char_id}]: Failed to close voice sessions: {e}")
+            loop.close()
@@ -66,7 +66,7 @@ class SettingsWindow:
             self.loading_label.destroy()
 
         self.config = ConfigManager()
-        self.voice_manager = VoiceEngineManager()
+        self.voice_manager = VoiceEngineManager(config_manager=self.config)
         self.audio_player = AudioPlayer(config_manager=self.config)
         self.log_text_widget = None # オプション
 
@@ -0,0 +1,164 @@
+"""
+ローカル音声エンジン (Avis Speech / VOICEVOX) の話者カタログ
+
+/speakers の結果をエンジン種別ごとにプロセス内で共有し、TTL 付きでキャッシュする。
+
+- 同時に複数の更新要求が来ても実際の取得は1回だけ（別スレッド・別イベントループからの要求も合流する）
+- 取得結果はディスクに保存し、起動直後でもエンジンに問い合わせずに声の一覧を表示できる
+- UI など同期コードからの更新は LocalSpeakerEngineBase.ensure_speakers_sync() が担う（audio_manager.py）
+- 更新のたびに "名前(スタイル)" ⇔ 話者ID の索引 (VoiceIndex) を作り直し、合成のたびに一覧を走査しなくて済むようにする
+"""
+
+import asyncio
+import concurrent.futures
+import difflib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOG_FILE = "speaker_catalog.json"
+DEFAULT_TTL = 300.0
+FAILURE_RETRY_INTERVAL = 30.0  # 取得に失敗してから、強制でない更新を再び試すまでの秒数（止まっているエンジンに毎回問い合わせない）
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_speaker_catalog(engine_name, ttl=None, path=DEFAULT_CATALOG_FILE):
+    """エンジン種別ごとに共有される SpeakerCatalog を返す"""
+    with _catalogs_lock:
+        catalog = _catalogs.get(engine_name)
+        if catalog is None:
+            catalog = _catalogs[engine_name] = SpeakerCatalog(engine_name, ttl if ttl is not None else DEFAULT_TTL, path)
+        elif ttl is not None:
+            catalog.ttl = ttl
+        return catalog
+
+
+class VoiceIndex:
+    """話者一覧から作る "名前(スタイル)" ⇔ 話者ID の辞書"""
+
+    def __init__(self, speakers=()):
+        self.by_name = {}      # {"名前(スタイル)": id}
+        self.by_id = {}        # {id: "名前(スタイル)"}
+        self.first_style = {}  # {名前: 最初のスタイルの id}
+        for speaker in speakers or ():
+            name = speaker.get('name', '')
+            for style in speaker.get('styles', []):
+                if 'id' not in style: continue
+                label = f"{name}({style.get('name', '')})"
+                self.by_name.setdefault(label, style['id'])
+                self.by_id.setdefault(style['id'], label)
+                self.first_style.setdefault(name, style['id'])
+
+    def __len__(self): return len(self.by_name)
+
+    def lookup(self, voice_name, default_style=None):
+        """
+        "名前(スタイル)" を話者IDに変換する。見つからなければ None。
+        スタイルを省略した "名前" は default_style（None ならその話者の最初のスタイル）として扱う。
+        """
+        if not voice_name: return None
+        style_id = self.by_name.get(voice_name)
+        if style_id is not None or '(' in voice_name: return style_id
+        if default_style is not None: return self.by_name.get(f"{voice_name}({default_style})")
+        return self.first_style.get(voice_name)
+
+    def name_of(self, style_id): return self.by_id.get(style_id)
+
+    def suggest(self, voice_name, n=3, cutoff=0.4):
+        """設定された声がエンジンから消えたときの候補（似ている名前順）"""
+        return difflib.get_close_matches(voice_name or "", list(self.by_name), n=n, cutoff=cutoff)
+
+
+class SpeakerCatalog:
+    """1エンジン分の話者一覧キャッシュ（TTL・ディスク永続化・単一フライト更新）"""
+
+    def __init__(self, engine_name, ttl=DEFAULT_TTL, path=DEFAULT_CATALOG_FILE):
+        self.engine_name = engine_name
+        self.ttl = ttl
+        self.path = os.path.abspath(path)
+        self.speakers = []
+        self.index = VoiceIndex()
+        self.fetched_at = 0.0  # time.time()。ディスクから読んだ場合は保存時刻
+        self.refresh_count = 0
+        self.failed_at = 0.0  # 最後に取得に失敗した時刻
+        self._lock = threading.Lock()
+        self._inflight = None  # concurrent.futures.Future（ループをまたいで待てるように）
+        self._load()
+
+    def is_fresh(self):
+        return bool(self.speakers) and (time.time() - self.fetched_at) < self.ttl
+
+    def update(self, speakers):
+        index = VoiceIndex(speakers)
+        with self._lock:
+            self.speakers = speakers
+            self.index = index # 読み取り側はロックなしで参照するので、作り終えてから差し替える
+            self.fetched_at = time.time()
+            self.refresh_count += 1
+        self._save()
+
+    async def refresh(self, fetch, force=False):
+        """
+        fetch() で話者一覧を取得して更新する。成功（1人以上の話者を取得）なら True。
+        実行中の更新があればそれに合流し、その結果を返す。
+        """
+        if not force and self.is_fresh(): return True
+        if not force and time.time() - self.failed_at < FAILURE_RETRY_INTERVAL: return bool(self.speakers)
+        with self._lock:
+            future = self._inflight
+            is_leader = future is None
+            if is_leader: future = self._inflight = concurrent.futures.Future()
+        if not is_leader:
+            return await asyncio.wrap_future(future)
+        ok = False
+        try:
+            speakers = await fetch()
+            if speakers:
+                self.update(speakers); ok = True
+        except Exception as e:
+            logger.debug(f"SpeakerCatalog[{self.engine_name}]: Refresh failed: {e}")
+        finally:
+            with self._lock:
+                self._inflight = None
+                if not ok: self.failed_at = time.time()
+            future.set_result(ok)
+        return ok
+
+    def _load(self):
+        try:
+            if not os.path.exists(self.path): return
+            with open(self.path, "r", encoding="utf-8") as f:
+                entry = json.load(f).get(self.engine_name)
+            if entry and entry.get("speakers"):
+                self.speakers = entry["speakers"]
+                self.index = VoiceIndex(self.speakers)
+                self.fetched_at = float(entry.get("fetched_at", 0.0))
+                logger.info(f"SpeakerCatalog[{self.engine_name}]: Loaded {len(self.speakers)} speakers from {self.path}")
+        except Exception as e:
+            logger.warning(f"SpeakerCatalog[{self.engine_name}]: Failed to load {self.path}: {e}")
+
+    def _save(self):
+        """他エンジン・他プロセスの内容を保ったまま自分のエントリだけ書き換える"""
+        try:
+            with _catalogs_lock:
+                data = {}
+                if os.path.exists(self.path):
+                    try:
+                        with open(self.path, "r", encoding="utf-8") as f: data = json.load(f)
+                    except Exception: data = {}
+                data[self.engine_name] = {"fetched_at": self.fetched_at, "speakers": self.speakers}
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f: json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"SpeakerCatalog[{self.engine_name}]: Failed to save {self.path}: {e}")
+
+    def snapshot(self):
+        return {"speakers": len(self.speakers), "age": time.time() - self.fetched_at if self.fetched_at else None,
+                "ttl": self.ttl, "fresh": self.is_fresh(), "refresh_count": self.refresh_count}
@@ -0,0 +1,69 @@
+"""
+音声合成向けのテキスト分割ユーティリティ
+
+長い応答を文単位に分け、先頭の文から順に合成・再生できるようにする。
+日本語（。！？…）と英語（. ! ? の後に空白）の文末、および改行で区切る。
+エンジンの最大文字数を超えるテキストは split_for_length() で収まる長さに分ける。
+"""
+
+import re
+
+# 文末記号の直後に続く閉じ括弧・引用符も同じ文に含める
+_SENTENCE_RE = re.compile(r'.*?(?:[。！？!?…♪]+[」』）)\]"\'”]*|\.+(?=\s)|\n+|$)', re.S)
+# 1文が長すぎる場合の区切り位置（読点・カンマ・セミコロン・空白）
+_CLAUSE_RE = re.compile(r'.*?(?:[、，,;；:：]+|\s+|$)', re.S)
+
+
+def split_sentences(text, min_chars=6):
+    """テキストを文単位に分割する。min_chars 未満の短い断片は次の文と結合する。"""
+    if not text: return []
+    pieces = [m.group(0).strip() for m in _SENTENCE_RE.finditer(text)]
+    pieces = [p for p in pieces if p]
+    sentences = []
+    buffer = ""
+    for piece in pieces:
+        buffer = f"{buffer} {piece}" if buffer and _needs_space(buffer, piece) else buffer + piece
+        if len(buffer) >= min_chars:
+            sentences.append(buffer); buffer = ""
+    if buffer:
+        if sentences: sentences[-1] = f"{sentences[-1]} {buffer}" if _needs_space(sentences[-1], buffer) else sentences[-1] + buffer
+        else: sentences.append(buffer)
+    return sentences
+
+
+def split_for_length(text, max_chars):
+    """
+    テキストを max_chars 文字以下の断片に分ける。できるだけ文末で区切り、短い文は上限まで詰める。
+    1文が上限を超える場合は読点・空白で、それでも収まらなければ文字数で区切る。
+    """
+    if not text: return []
+    if len(text) <= max_chars: return [text]
+    segments = []
+    current = ""
+    for sentence in split_sentences(text, min_chars=1):
+        for piece in _fit(sentence, max_chars):
+            joined = f"{current} {piece}" if current and _needs_space(current, piece) else current + piece
+            if len(joined) <= max_chars: current = joined
+            else:
+                if current: segments.append(current)
+                current = piece
+    if current: segments.append(current)
+    return segments
+
+
+def _fit(sentence, max_chars):
+    if len(sentence) <= max_chars: yield sentence; return
+    current = ""
+    for clause in (m.group(0) for m in _CLAUSE_RE.finditer(sentence)):
+        if not clause: continue
+        if len(current) + len(clause) <= max_chars: current += clause; continue
+        if current.strip(): yield current.strip()
+        while len(clause) > max_chars: # 区切り位置がない長い文字列は文字数で切る
+            yield clause[:max_chars]; clause = clause[max_chars:]
+        current = clause
+    if current.strip(): yield current.strip()
+
+
+def _needs_space(left, right):
+    """英語の文同士を結合するときだけ空白を挟む"""
+    return left[-1:].isascii() and right[:1].isascii()
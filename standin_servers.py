@@ -0,0 +1,348 @@
+"""
+ローカル検証用のスタンドインサーバー（VOICEVOX / AivisSpeech / LM Studio / YouTube Live Chat）
+
+実エンジンやネットワークがない環境でも、パイプライン全体のベンチマークや回帰確認ができるように、
+audio_manager.py・streaming.py・ai_chat_window.py が呼ぶエンドポイントを同じ形で返す偽サーバー。
+
+- VOICEVOX / AivisSpeech: GET /speakers, POST /audio_query, POST /synthesis, GET /version
+- LM Studio (OpenAI 互換): POST /v1/chat/completions, GET /v1/models
+- YouTube Data API: GET /youtube/v3/videos, GET /youtube/v3/liveChat/messages
+
+サービスごとにレイテンシ分布（fixed / uniform / normal / lognormal）・エラー率・ペイロードサイズを設定でき、
+乱数のシードを固定すれば同じ条件を何度でも再現できる。各サーバーの GET /standin/stats でリクエスト数などを確認できる。
+
+使い方:
+    python standin_servers.py                          # 既定ポートで全サービスを起動
+    python standin_servers.py --profile profile.json --seed 1 --latency-scale 2.0
+    アプリ側は voicevox_url / avis_speech_url / local_llm_endpoint_url / youtube_api_base_url をスタンドインに向ける。
+
+profile.json は DEFAULT_PROFILES と同じ形で、上書きしたいキーだけを書けばよい。
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import re
+import struct
+import time
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILES = {
+    "voicevox": {
+        "port": 50021,
+        "audio_query_latency": {"dist": "lognormal", "median": 0.03, "sigma": 0.3},
+        "synthesis_latency": {"dist": "lognormal", "median": 0.25, "sigma": 0.4},
+        "synthesis_latency_per_char": 0.01,  # 文字数に比例して増える分 (秒/文字)
+        "error_rate": 0.0,
+        "sample_rate": 24000,
+        "seconds_per_char": 0.12,  # 生成する音声の長さ (話速 1.0 のとき)
+    },
+    "avis_speech": {
+        "port": 10101,
+        "audio_query_latency": {"dist": "lognormal", "median": 0.05, "sigma": 0.3},
+        "synthesis_latency": {"dist": "lognormal", "median": 0.4, "sigma": 0.4},
+        "synthesis_latency_per_char": 0.015,
+        "error_rate": 0.0,
+        "sample_rate": 44100,
+        "seconds_per_char": 0.12,
+    },
+    "llm": {
+        "port": 1234,
+        "latency": {"dist": "lognormal", "median": 0.8, "sigma": 0.5},
+        "latency_per_token": 0.02,  # max_tokens ではなく実際に返す文字数に比例
+        "error_rate": 0.0,
+        "reply_chars": 60,
+    },
+    "youtube": {
+        "port": 8089,
+        "latency": {"dist": "lognormal", "median": 0.12, "sigma": 0.3},
+        "error_rate": 0.0,
+        "comments_per_minute": 30.0,
+        "polling_interval_ms": 5000,
+        "authors": 20,
+    },
+}
+
+SPEAKERS = {
+    "voicevox": [
+        {"name": "四国めたん", "speaker_uuid": "standin-metan", "styles": [{"name": "ノーマル", "id": 2}, {"name": "あまあま", "id": 0}]},
+        {"name": "ずんだもん", "speaker_uuid": "standin-zundamon", "styles": [{"name": "ノーマル", "id": 3}, {"name": "あまあま", "id": 1}]},
+        {"name": "春日部つむぎ", "speaker_uuid": "standin-tsumugi", "styles": [{"name": "ノーマル", "id": 8}]},
+    ],
+    "avis_speech": [
+        {"name": "Anneli", "speaker_uuid": "standin-anneli", "styles": [{"name": "ノーマル", "id": 888753760}, {"name": "通常", "id": 888753761}]},
+    ],
+}
+
+SAMPLE_COMMENTS = ["こんにちは！", "初見です", "今日は何するの？", "かわいい", "8888", "おすすめのゲームある？",
+                   "お疲れさまです", "声が聞こえません", "wwww", "次の配信はいつですか？", "歌ってほしい！", "こんばんは〜"]
+REPLY_TEXT = "ありがとうございます。今日も配信に来てくれてうれしいです。ゆっくりしていってくださいね。"
+
+
+def merge_profiles(overrides=None, latency_scale=1.0, error_rate=None):
+    """DEFAULT_PROFILES に上書き設定を重ねる。latency_scale は全レイテンシに掛ける倍率。"""
+    profiles = json.loads(json.dumps(DEFAULT_PROFILES))
+    for service, values in (overrides or {}).items():
+        profiles.setdefault(service, {}).update(values)
+    for profile in profiles.values():
+        profile["latency_scale"] = latency_scale
+        if error_rate is not None: profile["error_rate"] = error_rate
+    return profiles
+
+
+class LatencyModel:
+    """レイテンシ分布からの標本（秒）。dist: fixed(value) / uniform(low, high) / normal(mean, std) / lognormal(median, sigma)"""
+
+    def __init__(self, spec, rng, scale=1.0):
+        self.spec = spec or {"dist": "fixed", "value": 0.0}
+        self.rng = rng
+        self.scale = scale
+
+    def sample(self):
+        spec, rng = self.spec, self.rng
+        dist = spec.get("dist", "fixed")
+        if dist == "uniform": value = rng.uniform(spec.get("low", 0.0), spec.get("high", 0.0))
+        elif dist == "normal": value = rng.gauss(spec.get("mean", 0.0), spec.get("std", 0.0))
+        elif dist == "lognormal": value = spec.get("median", 0.0) * math.exp(rng.gauss(0.0, spec.get("sigma", 0.0)))
+        else: value = spec.get("value", 0.0)
+        return max(0.0, value * self.scale)
+
+
+class StandInService:
+    """スタンドインサーバー1種類分の共通処理（遅延・エラー注入・統計）"""
+
+    name = ""
+
+    def __init__(self, profile, rng):
+        self.profile = profile
+        self.rng = rng
+        self.port = profile.get("port")
+        self.stats = {"requests": 0, "errors_injected": 0, "bytes_sent": 0, "busy_seconds": 0.0}
+        self._runner = None
+
+    def latency(self, key="latency"):
+        return LatencyModel(self.profile.get(key), self.rng, self.profile.get("latency_scale", 1.0))
+
+    async def delay(self, seconds):
+        self.stats["busy_seconds"] += seconds
+        if seconds > 0: await asyncio.sleep(seconds)
+
+    def should_fail(self):
+        if self.rng.random() < self.profile.get("error_rate", 0.0):
+            self.stats["errors_injected"] += 1
+            return True
+        return False
+
+    @web.middleware
+    async def _count(self, request, handler):
+        self.stats["requests"] += 1
+        response = await handler(request)
+        if response.body is not None and hasattr(response.body, "__len__"): self.stats["bytes_sent"] += len(response.body)
+        return response
+
+    def routes(self): raise NotImplementedError
+
+    def build_app(self):
+        app = web.Application(middlewares=[self._count])
+        app.add_routes(self.routes() + [web.get("/standin/stats", self.handle_stats)])
+        return app
+
+    async def handle_stats(self, request): return web.json_response(dict(self.stats, service=self.name))
+
+    async def start(self, host="127.0.0.1"):
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, self.port)
+        await site.start()
+        if not self.port: self.port = self._runner.addresses[0][1] # port=0 なら空いているポートが割り当てられる
+        logger.info(f"Stand-in {self.name} listening on http://{host}:{self.port}")
+        return self.port
+
+    async def stop(self):
+        if self._runner: await self._runner.cleanup(); self._runner = None
+
+
+class SpeechEngineStandIn(StandInService):
+    """VOICEVOX / AivisSpeech 互換（/audio_query が返すクエリにテキストを持たせ、/synthesis はその長さの音声を返す）"""
+
+    def __init__(self, name, profile, rng):
+        super().__init__(profile, rng)
+        self.name = name
+        self._tone_cache = {}
+
+    def routes(self):
+        return [web.get("/speakers", self.handle_speakers), web.get("/version", self.handle_version),
+                web.post("/audio_query", self.handle_audio_query), web.post("/synthesis", self.handle_synthesis)]
+
+    async def handle_speakers(self, request): return web.json_response(SPEAKERS.get(self.name, SPEAKERS["voicevox"]))
+    async def handle_version(self, request): return web.json_response(f"standin-{self.name}")
+
+    async def handle_audio_query(self, request):
+        await self.delay(self.latency("audio_query_latency").sample())
+        if self.should_fail(): return web.Response(status=500, text="injected error")
+        text = request.query.get("text", "")
+        return web.json_response({"accent_phrases": [], "speedScale": 1.0, "pitchScale": 0.0, "intonationScale": 1.0, "volumeScale": 1.0,
+                                  "prePhonemeLength": 0.1, "postPhonemeLength": 0.1, "outputSamplingRate": self.profile.get("sample_rate", 24000),
+                                  "outputStereo": False, "kana": text})
+
+    async def handle_synthesis(self, request):
+        query = await request.json()
+        text = query.get("kana", "")
+        await self.delay(self.latency("synthesis_latency").sample() + len(text) * self.profile.get("synthesis_latency_per_char", 0.0) * self.profile.get("latency_scale", 1.0))
+        if self.should_fail(): return web.Response(status=500, text="injected error")
+        seconds = max(0.2, len(text) * self.profile.get("seconds_per_char", 0.12)) / max(0.1, float(query.get("speedScale", 1.0)))
+        return web.Response(body=self._wav(seconds, int(query.get("outputSamplingRate", self.profile.get("sample_rate", 24000)))), content_type="audio/wav")
+
+    def _wav(self, seconds, sample_rate):
+        # 無音だと後処理で削られてしまうので、1周期分の正弦波を繰り返した音にする
+        period = self._tone_cache.get(sample_rate)
+        if period is None:
+            n = max(1, sample_rate // 220)
+            period = self._tone_cache[sample_rate] = struct.pack(f"<{n}h", *(int(8000 * math.sin(2 * math.pi * i / n)) for i in range(n)))
+        frames = int(seconds * sample_rate)
+        pcm = (period * (frames * 2 // len(period) + 1))[:frames * 2]
+        header = struct.pack("<4sI4s4sIHHIIHH4sI", b"RIFF", 36 + len(pcm), b"WAVE", b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16, b"data", len(pcm))
+        return header + pcm
+
+
+class LLMStandIn(StandInService):
+    """LM Studio（OpenAI 互換 chat completions）"""
+
+    name = "llm"
+
+    def routes(self):
+        return [web.post("/v1/chat/completions", self.handle_chat), web.get("/v1/models", self.handle_models)]
+
+    async def handle_models(self, request): return web.json_response({"object": "list", "data": [{"id": "local-model", "object": "model"}]})
+
+    async def handle_chat(self, request):
+        payload = await request.json()
+        chars = min(int(payload.get("max_tokens") or self.profile.get("reply_chars", 60)), self.profile.get("reply_chars", 60))
+        reply = (REPLY_TEXT * (chars // len(REPLY_TEXT) + 1))[:chars]
+        # 複数コメントへのまとめての返答（"1. 視聴者 ..." の行が並ぶプロンプト）には JSON 配列で答える
+        prompt = str((payload.get("messages") or [{}])[-1].get("content", ""))
+        batch = len(re.findall(r"^\d+\. 視聴者 ", prompt, re.M))
+        content = json.dumps([{"id": i, "reply": reply} for i in range(1, batch + 1)], ensure_ascii=False) if batch > 1 else reply
+        chars *= max(1, batch)
+        await self.delay(self.latency().sample() + chars * self.profile.get("latency_per_token", 0.0) * self.profile.get("latency_scale", 1.0))
+        if self.should_fail(): return web.json_response({"error": {"message": "injected error"}}, status=500)
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in payload.get("messages", []))
+        return web.json_response({"id": f"standin-{self.stats['requests']}", "object": "chat.completion", "created": int(time.time()), "model": payload.get("model", "local-model"),
+                                  "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                                  "usage": {"prompt_tokens": prompt_chars, "completion_tokens": chars, "total_tokens": prompt_chars + chars}})
+
+
+class YouTubeStandIn(StandInService):
+    """YouTube Data API v3 の videos（チャットID取得）と liveChat/messages（コメント取得）"""
+
+    name = "youtube"
+
+    def __init__(self, profile, rng):
+        super().__init__(profile, rng)
+        self.started_at = time.time()
+        self.messages = []  # 起動からの経過時間に応じて comments_per_minute の割合で増える
+
+    def routes(self):
+        return [web.get("/youtube/v3/videos", self.handle_videos), web.get("/youtube/v3/liveChat/messages", self.handle_messages)]
+
+    def _generate_until_now(self):
+        expected = int((time.time() - self.started_at) * self.profile.get("comments_per_minute", 30.0) / 60.0)
+        while len(self.messages) < expected:
+            index = len(self.messages)
+            author = self.rng.randrange(max(1, self.profile.get("authors", 20)))
+            published = datetime.fromtimestamp(self.started_at + index * 60.0 / self.profile.get("comments_per_minute", 30.0), timezone.utc)
+            text = f"{self.rng.choice(SAMPLE_COMMENTS)} ({index})"
+            self.messages.append({
+                "kind": "youtube#liveChatMessage", "id": f"standin-msg-{index}",
+                "snippet": {"type": "textMessageEvent", "publishedAt": published.isoformat().replace("+00:00", "Z"), "hasDisplayContent": True,
+                            "displayMessage": text, "textMessageDetails": {"messageText": text}},
+                "authorDetails": {"channelId": f"standin-viewer-{author}", "displayName": f"視聴者{author}"}})
+
+    async def handle_videos(self, request):
+        await self.delay(self.latency().sample())
+        if self.should_fail(): return web.json_response({"error": {"code": 503, "message": "injected error"}}, status=503)
+        video_id = request.query.get("id", "")
+        return web.json_response({"kind": "youtube#videoListResponse", "items": [{"id": video_id, "liveStreamingDetails": {"activeLiveChatId": f"standin-chat-{video_id}"}}]})
+
+    async def handle_messages(self, request):
+        await self.delay(self.latency().sample())
+        if self.should_fail(): return web.json_response({"error": {"code": 503, "message": "injected error"}}, status=503)
+        self._generate_until_now()
+        max_results = min(2000, max(1, int(request.query.get("maxResults", 500))))
+        token = request.query.get("pageToken")
+        # pageToken なしなら直近 maxResults 件、ありならその位置以降（実 API と同じく nextPageToken で続きを取る）
+        start = int(token) if token and token.isdigit() else max(0, len(self.messages) - max_results)
+        items = self.messages[start:start + max_results]
+        return web.json_response({"kind": "youtube#liveChatMessageListResponse", "pollingIntervalMillis": self.profile.get("polling_interval_ms", 5000),
+                                  "nextPageToken": str(start + len(items)), "pageInfo": {"totalResults": len(self.messages), "resultsPerPage": len(items)}, "items": items})
+
+
+class StandInServers:
+    """複数のスタンドインサーバーをまとめて起動・停止する（ベンチマークからも同じプロセス内で使える）"""
+
+    SERVICES = ("voicevox", "avis_speech", "llm", "youtube")
+
+    def __init__(self, profiles=None, services=SERVICES, seed=0):
+        profiles = profiles or merge_profiles()
+        rng = random.Random(seed)
+        self.services = {}
+        for name in services:
+            service_rng = random.Random(rng.random()) # サービスごとに独立した乱数列（起動するサービスの組み合わせで結果が変わらないように）
+            if name in ("voicevox", "avis_speech"): self.services[name] = SpeechEngineStandIn(name, profiles[name], service_rng)
+            elif name == "llm": self.services[name] = LLMStandIn(profiles[name], service_rng)
+            elif name == "youtube": self.services[name] = YouTubeStandIn(profiles[name], service_rng)
+            else: raise ValueError(f"Unknown stand-in service: {name}")
+
+    async def start(self, host="127.0.0.1"):
+        for service in self.services.values(): await service.start(host)
+        return self.urls(host)
+
+    async def stop(self):
+        for service in self.services.values(): await service.stop()
+
+    def urls(self, host="127.0.0.1"):
+        """アプリの設定キーと、スタンドインを指すURLの対応"""
+        keys = {"voicevox": ("voicevox_url", ""), "avis_speech": ("avis_speech_url", ""),
+                "llm": ("local_llm_endpoint_url", "/v1/chat/completions"), "youtube": ("youtube_api_base_url", "/youtube/v3")}
+        return {keys[name][0]: f"http://{host}:{service.port}{keys[name][1]}" for name, service in self.services.items()}
+
+    def get_stats(self): return {name: dict(service.stats) for name, service in self.services.items()}
+
+
+async def _serve_forever(servers, host):
+    urls = await servers.start(host)
+    for key, url in urls.items(): print(f"{key}: {url}")
+    try:
+        while True: await asyncio.sleep(3600)
+    finally:
+        await servers.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VOICEVOX / AivisSpeech / LM Studio / YouTube Live Chat のスタンドインサーバー")
+    parser.add_argument("--services", default=",".join(StandInServers.SERVICES), help="起動するサービス（カンマ区切り）")
+    parser.add_argument("--profile", help="DEFAULT_PROFILES を上書きする JSON ファイル")
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード（レイテンシ・エラー・コメント内容の再現用）")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="全レイテンシに掛ける倍率")
+    parser.add_argument("--error-rate", type=float, default=None, help="全サービスのエラー率を上書き (0.0〜1.0)")
+    parser.add_argument("--host", default="127.0.0.1")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    overrides = None
+    if args.profile:
+        with open(args.profile, "r", encoding="utf-8") as f: overrides = json.load(f)
+    servers = StandInServers(merge_profiles(overrides, args.latency_scale, args.error_rate), [s.strip() for s in args.services.split(",") if s.strip()], args.seed)
+    try: asyncio.run(_serve_forever(servers, args.host))
+    except KeyboardInterrupt: pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+配信パイプラインの段ごとの稼働率
+
+配信ループはコメント取得 → 応答生成 → 音声合成 → 再生の各段を別タスクで動かし、上限付きのキューでつなぐ。
+段ごとに「処理中」「入力待ち（前の段が遅い）」「出力待ち（次の段が詰まっている）」の時間を計り、
+どこがボトルネックかを調整の手がかりにする（稼働率 = 処理中の時間 / 経過時間）。
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+STAGE_NAMES = ("poll", "generate", "synthesize", "playback")
+MEASURE_KINDS = ("busy", "wait_input", "wait_output")
+
+
+class StageMeter:
+    """1段分の処理件数と時間の内訳"""
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = time.perf_counter()
+        self.items = 0
+        self.seconds = {kind: 0.0 for kind in MEASURE_KINDS}
+        self.active = 0  # 処理中のタスク数（生成ワーカーは複数ありうる。つなぎのフレーズを挟んでよいかの判断に使う）
+        self._busy_since = None  # 処理中のタスクが1つ以上になった時刻
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, kind):
+        """
+        with ブロックの経過時間を kind（busy / wait_input / wait_output）に加算する。await を含んでよい。
+        busy は複数のタスクが同時に処理中でも、1つ以上が処理中だった時間として数える（稼働率が 100% を超えない）。
+        """
+        started = time.perf_counter()
+        if kind == "busy":
+            with self._lock:
+                if self.active == 0: self._busy_since = started
+                self.active += 1
+        try: yield
+        finally:
+            now = time.perf_counter()
+            with self._lock:
+                if kind != "busy": self.seconds[kind] += now - started
+                else:
+                    self.active -= 1
+                    if self.active == 0: self.seconds["busy"] += now - self._busy_since # 重なった処理中の時間は二重に数えない
+
+    def count(self, n=1):
+        with self._lock: self.items += n
+
+    def snapshot(self):
+        with self._lock:
+            now = time.perf_counter()
+            elapsed = max(now - self.started_at, 1e-9)
+            seconds = dict(self.seconds)
+            if self.active: seconds["busy"] += now - self._busy_since # 処理中の分も含める
+            return {"items": self.items, "elapsed_seconds": elapsed, "utilization": seconds["busy"] / elapsed, "active": self.active,
+                    **{f"{kind}_seconds": value for kind, value in seconds.items()}}
+
+
+def format_stage_stats(stats):
+    """{段: snapshot()} を1行にまとめる（段以外のキー、例えば "queue_depths" は無視する）"""
+    parts = [f"{name} {s['utilization'] * 100:.0f}% ({s['items']}件, 入力待ち {s['wait_input_seconds']:.0f}s, 出力待ち {s['wait_output_seconds']:.0f}s)"
+             for name, s in stats.items() if name in STAGE_NAMES]
+    return "段ごとの稼働率: " + " / ".join(parts)
@@ -23,6 +23,12 @@ from config import ConfigManager
 from character_manager import CharacterManager
 from audio_manager import VoiceEngineManager, AudioPlayer
 from communication_logger import CommunicationLogger # 追加
+from warmup import get_gemini_client
+from live_chat import LiveChatPoller, QuotaMeter
+from comment_queue import CommentQueue
+from phrase_bank import PhraseBank
+from stream_stages import StageMeter, STAGE_NAMES, format_stage_stats
+from speech_text import split_sentences
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, simpledialog
@@ -51,6 +57,9 @@ import re # 正規表現モジュールをインポート
 # import json # JSONモジュールをインポート (macOSデバイス取得で使用) # 重複インポートなのでコメントアウト
 import csv
 import traceback # エラー追跡用に追加
+import math
+import statistics
+from collections import deque
 
 
 
@@ -72,7 +81,7 @@ class AITuberStreamingSystem:
 
         if api_key:
             try:
-                self.client = genai.Client(api_key=api_key) # Client を初期化
+                self.client = get_gemini_client(api_key) # Client を初期化（ウォームアップ済みの接続を共有）
             except Exception as e:
                 self.client = None
                 self.log(f"警告: Google AI Clientの初期化に失敗しました。APIキーが正しいか確認してください。エラー: {e}")
@@ -82,16 +91,29 @@ class AITuberStreamingSystem:
 
         # YouTube API設定
         self.youtube_api_key = self.config.get_system_setting("youtube_api_key")
-        self.youtube_base_url = "https://www.googleapis.com/youtube/v3"
+        self.youtube_base_url = self.config.get_system_setting("youtube_api_base_url", "https://www.googleapis.com/youtube/v3").rstrip("/") # スタンドインサーバーでの検証時に差し替える
 
         # 状態管理
         self.chat_id = None
-        self.previous_comment = ""
+        self.chat_poller = None # チャットID取得後に作る（nextPageToken で差分だけ取得する）
+        self.quota = QuotaMeter() # YouTube API のクォータ消費
+        self.comment_queue = None # 配信開始時に作る（取得したコメントをすべて入れ、応答ワーカーが優先度順に処理する）
+        self._speak_lock = None # 応答ワーカーが複数でも、しゃべるのは1件ずつ
+        self.stage_meters = {} # 段ごとの稼働率（配信開始時に作る）
+        self._reply_queue = None # 生成 → 合成の段の間（上限付き）
+        self._audio_queue = None # 合成 → 再生の段の間（上限付き）
         self.viewer_memory = {}
         self.running = False
         self.chat_history = [] # 会話履歴を保存するリスト
+        self.reply_latencies = deque(maxlen=500) # 返答のテキストができてから最初の音声が鳴り始めるまでの秒数 (time-to-first-audio)。並行処理では前の返答の読み上げ待ちも含む
+        self.llm_latencies = deque(maxlen=50) # LLM 呼び出し1回の秒数（まとめて返答する件数の調整に使う）
+        self.batch_stats = {"batches": 0, "batched_comments": 0, "parse_fallbacks": 0}
 
-    async def _generate_response_local_llm_streaming(self, prompt_text: str, endpoint_url: str, char_name_for_log: str = "LocalLLMStream") -> str:
+        # 定型フレーズ（あいさつ・つなぎ・おわびなど）は事前合成したものを合成待ちなしで再生する
+        self.phrase_bank = self.character_manager.get_phrase_bank(self.character_id)
+        self.character_manager.refresh_phrase_bank(self.character_id)
+
+    async def _generate_response_local_llm_streaming(self, prompt_text: str, endpoint_url: str, char_name_for_log: str = "LocalLLMStream", max_tokens: int = 100) -> str:
         """ローカルLLM（LM Studio想定）から応答を生成する非同期メソッド (ストリーミングシステム用)"""
         self.log(f"🤖 {char_name_for_log}: ローカルLLM ({endpoint_url}) にリクエスト送信中...")
         # リクエストとレスポンスのロギングは呼び出し元の generate_response で行う
@@ -100,7 +122,7 @@ class AITuberStreamingSystem:
             "model": "local-model",
             "messages": [{"role": "user", "content": prompt_text}],
             "temperature": 0.7,
-            "max_tokens": 100
+            "max_tokens": max_tokens
         }
         headers = {"Content-Type": "application/json"}
         generated_text = f"ローカルLLM ({endpoint_url}) 呼び出しエラー。" # デフォルトエラー
@@ -148,41 +170,239 @@ class AITuberStreamingSystem:
                 return
 
             self.log("✅ YouTube配信に接続しました")
+            self.chat_poller = LiveChatPoller(
+                self.youtube_api_key, self.youtube_base_url, self.chat_id, quota=self.quota,
+                cursor_path=self.config.get_system_setting("chat_cursor_file", "live_chat_cursor.json"),
+                max_results=self.config.get_system_setting("chat_max_results", 200),
+                default_interval=self.config.get_system_setting("chat_monitor_interval", 5),
+                min_interval=self.config.get_system_setting("chat_min_poll_interval", 1.0))
+            if self.chat_poller.stats["resumed"]: self.log("↪️ 前回の続きからコメントを取得します")
+            reported_at = time.time()
             self.running = True
             char_data = self.config.get_character(self.character_id)
             char_name = char_data.get('name', 'AIちゃん')
             self.log(f"🌟 {char_name}が配信開始しました！")
 
-            while self.running:
-                try:
-                    comments = await self.get_latest_comments()
-                    if comments:
-                        latest_comment = comments[-1]
-                        comment_text = latest_comment['snippet']['displayMessage']
-                        author_name = latest_comment['authorDetails']['displayName']
-
-                        if comment_text != self.previous_comment:
-                            self.log(f"💬 {author_name}: {comment_text}")
-                            response_text = await self.generate_response(comment_text, author_name)
-
-                            if response_text:
-                                self.log(f"🤖 {char_name}: {response_text}")
-                                await self.synthesize_and_play(response_text)
-                                history_length = self.config.get_system_setting("conversation_history_length", 0)
-                                if history_length > 0:
-                                    self.chat_history.append({"user": author_name, "comment": comment_text, "response": response_text})
-                                    if len(self.chat_history) > history_length:
-                                        self.chat_history.pop(0)
-                            self.previous_comment = comment_text
-                    await asyncio.sleep(self.config.get_system_setting("chat_monitor_interval", 5))
-                except Exception as loop_e: # ループ内のエラー
-                    self.log(f"⚠️ 配信ループ中にエラー: {loop_e}\n{traceback.format_exc()}")
-                    await asyncio.sleep(10) # 少し待って再試行
+            self.comment_queue = CommentQueue(
+                max_size=self.config.get_system_setting("comment_queue_max_size", 100),
+                seen_size=self.config.get_system_setting("comment_seen_ids_max", 5000),
+                policies=self.config.get_system_setting("comment_shed_policies", ["deadline", "one_per_author", "prefer_priority", "drop_oldest"]))
+            self._speak_lock = asyncio.Lock()
+            self.stage_meters = {name: StageMeter(name) for name in STAGE_NAMES}
+            skip_backlog = not self.chat_poller.stats["resumed"] # 初回取得分は接続前の過去ログなので、最新の1件だけ応答する
+            worker_count = max(1, int(self.config.get_system_setting("stream_reply_workers", 1)))
+            if self.config.get_system_setting("stream_pipeline_enabled", True):
+                # 生成・合成・再生を別タスクにして、読み上げ中に次の返答の生成と合成を進める
+                queue_size = max(1, int(self.config.get_system_setting("stream_stage_queue_size", 2)))
+                self._reply_queue, self._audio_queue = asyncio.Queue(maxsize=queue_size), asyncio.Queue(maxsize=queue_size)
+                workers = [asyncio.create_task(self._generation_stage()) for _ in range(worker_count)]
+                workers += [asyncio.create_task(self._synthesis_stage(worker_count)), asyncio.create_task(self._playback_stage(char_name))]
+            else:
+                workers = [asyncio.create_task(self._reply_worker(char_name)) for _ in range(worker_count)]
+            try:
+                while self.running:
+                    try:
+                        with self.stage_meters["poll"].measure("busy"):
+                            comments = await self.get_latest_comments()
+                        self.stage_meters["poll"].count(len(comments))
+                        if comments and skip_backlog:
+                            self.comment_queue.skip(comments[:-1], "backlog")
+                            comments, skip_backlog = comments[-1:], False
+                        self._update_shedding()
+                        if comments: self.comment_queue.offer_all(comments)
+                        if time.time() - reported_at >= 3600:
+                            self.log(QuotaMeter.format_snapshot(self.quota.snapshot(), self.config.get_system_setting("youtube_daily_quota", 10000)))
+                            self.log(CommentQueue.format_metrics(self.comment_queue.metrics()))
+                            self.log(format_stage_stats(self.get_stage_stats()))
+                            reported_at = time.time()
+                        await asyncio.sleep(self.chat_poller.next_delay()) # サーバー推奨の間隔 (pollingIntervalMillis) に従う
+                    except Exception as loop_e: # ループ内のエラー
+                        self.log(f"⚠️ 配信ループ中にエラー: {loop_e}\n{traceback.format_exc()}")
+                        await asyncio.sleep(10) # 少し待って再試行
+            finally:
+                self.comment_queue.close()
+                await asyncio.gather(*workers, return_exceptions=True) # 応答中のものは最後までしゃべらせる
+                self.log(CommentQueue.format_metrics(self.comment_queue.metrics()))
+                self.log(format_stage_stats(self.get_stage_stats()))
+                if self.batch_stats["batches"]: self.log(f"📦 まとめて返答: {self.batch_stats}")
         except Exception as main_e: # メイン処理のエラー
             self.log(f"❌ 配信処理全体でエラー: {main_e}\n{traceback.format_exc()}")
         finally:
+            await self.voice_manager.close() # この配信ループで開いたエンジン接続を閉じる
+            if self.quota.total_units: self.log(QuotaMeter.format_snapshot(self.quota.snapshot(), self.config.get_system_setting("youtube_daily_quota", 10000)))
             self.log("配信を終了しました")
 
+    async def _generate_replies(self, comments):
+        """コメント1件なら1件分、複数ならまとめて返答を生成し、comments と同じ順のリストで返す"""
+        for c in comments: self.log(f"💬 {c.author}: {c.text}")
+        if len(comments) == 1:
+            return [await self._generate_with_filler(comments[0].text, comments[0].author)]
+        self.log(f"📦 {len(comments)}件のコメントにまとめて返答します")
+        return await self.generate_batch_response(comments)
+
+    def _reply_service_seconds(self):
+        """コメント1件に応答するのにかかる秒数の見積もり（並行処理なら最も遅い段、逐次処理なら各段の合計）。実績がなければ None。"""
+        snapshots = [self.stage_meters[name].snapshot() for name in ("generate", "synthesize", "playback")]
+        per_item = [s["busy_seconds"] / s["items"] for s in snapshots if s["items"]]
+        if not per_item: return None
+        return max(per_item) if self._audio_queue is not None else sum(per_item)
+
+    def _update_shedding(self):
+        """
+        返答までの目標時間 (stream_target_reply_latency) から、コメントが待てる秒数と件数をキューに設定する。
+        待ち件数 × 1件の応答時間 + 自分の応答時間が目標に収まるようにし、超えた分は comment_shed_policies に従って間引く。
+        """
+        target = float(self.config.get_system_setting("stream_target_reply_latency", 30.0) or 0)
+        if target <= 0: return self.comment_queue.update_limits(None, None)
+        service = self._reply_service_seconds()
+        if service is None: return self.comment_queue.update_limits(max_age=target)
+        self.comment_queue.update_limits(max_age=max(target - service, target / 2), capacity=max(1, int((target - service) // service)))
+
+    def _remember(self, comment, response_text):
+        history_length = self.config.get_system_setting("conversation_history_length", 0)
+        if history_length > 0:
+            self.chat_history.append({"user": comment.author, "comment": comment.text, "response": response_text})
+            if len(self.chat_history) > history_length:
+                self.chat_history.pop(0)
+
+    async def _reply_worker(self, char_name):
+        """キューからコメントを取り出して応答を生成し、読み上げる（stream_pipeline_enabled が False のときの逐次処理）"""
+        while self.running:
+            comment = await self.comment_queue.get()
+            if comment is None: break
+            comments = [comment] + self.comment_queue.take(self._reply_batch_size() - 1)
+            try:
+                with self.stage_meters["generate"].measure("busy"):
+                    replies = await self._generate_replies(comments)
+                self.stage_meters["generate"].count(len(comments))
+                for c, response_text in zip(comments, replies):
+                    if not response_text: continue
+                    with self.stage_meters["playback"].measure("busy"): # 逐次処理では合成と再生をまとめて計る
+                        await self._speak_reply(c, response_text, char_name)
+                    self.stage_meters["playback"].count()
+            except Exception as e:
+                self.log(f"⚠️ コメントへの応答中にエラー: {e}\n{traceback.format_exc()}")
+
+    async def _generation_stage(self):
+        """生成の段: コメントキューから取り出して返答を生成し、合成の段へ渡す"""
+        meter = self.stage_meters["generate"]
+        while self.running:
+            with meter.measure("wait_input"):
+                comment = await self.comment_queue.get()
+            if comment is None: break
+            comments = [comment] + self.comment_queue.take(self._reply_batch_size() - 1)
+            try:
+                with meter.measure("busy"):
+                    replies = await self._generate_replies(comments)
+            except Exception as e:
+                self.log(f"⚠️ コメントへの応答中にエラー: {e}\n{traceback.format_exc()}")
+                continue
+            meter.count(len(comments))
+            for c, response_text in zip(comments, replies):
+                if not response_text: continue
+                with meter.measure("wait_output"):
+                    await self._reply_queue.put((c, response_text, time.perf_counter()))
+        await self._reply_queue.put(None) # 終了の合図（キャンセル時は後段もまとめてキャンセルされるので送らない）
+
+    async def _synthesis_stage(self, producers):
+        """
+        合成の段: 返答を文単位で合成し、再生の段へ渡す（読み上げ中に次の返答の合成を進める）。
+        1件の返答は (comment, text, 音声, 生成時刻) のチャンクを順に送り、最後に音声が None の終わりの印を送る。
+        """
+        meter = self.stage_meters["synthesize"]
+        while producers:
+            with meter.measure("wait_input"):
+                item = await self._reply_queue.get()
+            if item is None:
+                producers -= 1
+                continue
+            if not self.running: continue # 停止後はまだしゃべり始めていない返答を捨てる
+            comment, text, generated_at = item
+            clip = self._phrase_clip(text)
+            if clip is not None: # 定型フレーズ（エラー時のおわびなど）は合成しない
+                chunks = [(text, [clip])]
+            else:
+                pipelined = self.config.get_system_setting("voice_pipeline_mode", True)
+                chunks = [(chunk, None) for chunk in (split_sentences(text) if pipelined else [text])]
+            for chunk, files in chunks:
+                try:
+                    if files is None:
+                        with meter.measure("busy"):
+                            files = await self._synthesize(chunk)
+                except Exception as e:
+                    self.log(f"❌ 音声処理エラー: {e}\n{traceback.format_exc()}")
+                    files = None
+                if not files:
+                    self.log(f"警告: 音声合成に失敗しました (Text: '{chunk[:30]}...')")
+                    continue
+                with meter.measure("wait_output"):
+                    await self._audio_queue.put((comment, text, files, generated_at))
+            with meter.measure("wait_output"):
+                await self._audio_queue.put((comment, text, None, generated_at))
+            meter.count()
+        await self._audio_queue.put(None)
+
+    async def _playback_stage(self, char_name):
+        """再生の段: 合成済みの返答を1件ずつ再生する。停止後は読み上げ中の返答だけ最後までしゃべる。"""
+        meter = self.stage_meters["playback"]
+        while True:
+            with meter.measure("wait_input"):
+                item = await self._audio_queue.get()
+            if item is None: break
+            comment, text, files, generated_at = item
+            if files is None or not self.running: continue # 音声ができなかった返答の終わりの印・停止後の返答
+            try:
+                with meter.measure("busy"):
+                    async with self._speak_lock:
+                        self._on_reply_start(comment)
+                        self.log(f"🤖 {char_name}: {text}")
+                        time_to_first_audio = time.perf_counter() - generated_at # 最初のチャンクを鳴らし始める時点
+                        self.reply_latencies.append(time_to_first_audio)
+                        self.log(f"⏱️ 最初の音声まで {time_to_first_audio:.2f}秒")
+                        meter.count()
+                        await self._play_reply_chunks(files)
+                self._remember(comment, text) # 履歴には実際にしゃべった返答だけを残す
+            except Exception as e:
+                self.log(f"❌ 音声再生エラー: {e}\n{traceback.format_exc()}")
+
+    async def _play_reply_chunks(self, files):
+        """1件の返答のチャンクを終わりの印まで再生する。出力シンクでは次のチャンクを先に積んで切れ目なく鳴らす。"""
+        queued = None # 再生中のチャンク (futures, files)
+        try:
+            while files is not None:
+                futures = self.audio_player.enqueue_audio_files(files, continuous=queued is not None) if hasattr(self.audio_player, "enqueue_audio_files") else None
+                if queued is not None: await self._wait_queued_chunk(*queued)
+                if futures is None:
+                    queued = None
+                    await self.audio_player.play_audio_files(files, delay_between=0)
+                else: queued = (futures, files)
+                files = await self._next_reply_chunk()
+            if queued is not None: await self._wait_queued_chunk(*queued)
+        finally:
+            while files is not None: files = await self._next_reply_chunk() # 失敗しても残りのチャンクを次の返答と取り違えないよう読み捨てる
+
+    async def _next_reply_chunk(self):
+        """合成の段は1件の返答のチャンクと終わりの印を続けて送るので、同じ返答の次の音声（終わりなら None）を受け取る"""
+        item = await self._audio_queue.get()
+        if item is None:
+            await self._audio_queue.put(None) # 終了の合図は呼び出し元のループで受け取る
+            return None
+        return item[2]
+
+    async def _wait_queued_chunk(self, futures, files):
+        failed = await self.audio_player.wait_for_playback(futures, files)
+        if failed: await self.audio_player.play_audio_files(failed, delay_between=0)
+
+    def _on_reply_start(self, comment):
+        """返答の読み上げを始める直前に呼ばれる（計測用のフック）"""
+
+    async def _speak_reply(self, comment, response_text, char_name):
+        async with self._speak_lock:
+            self._on_reply_start(comment)
+            self.log(f"🤖 {char_name}: {response_text}")
+            await self.synthesize_and_play(response_text)
+        self._remember(comment, response_text)
+
     async def get_chat_id(self, live_id):
         if not self.youtube_api_key:
             self.log("❌ YouTube APIキーが設定されていません。チャットIDを取得できません。")
@@ -191,6 +411,7 @@ class AITuberStreamingSystem:
             url = f"{self.youtube_base_url}/videos"
             params = {'part': 'liveStreamingDetails', 'id': live_id, 'key': self.youtube_api_key}
             response = await asyncio.to_thread(requests.get, url, params=params, timeout=10)
+            self.quota.record("videos.list")
             response.raise_for_status()
             data = response.json()
             if data.get('items'):
@@ -200,21 +421,46 @@ class AITuberStreamingSystem:
             self.log(f"チャットID取得エラー: {e}")
             return None
 
-    async def get_latest_comments(self, max_results=50):
-        if not self.chat_id: return []
+    async def get_latest_comments(self):
+        """前回の取得以降の新しいコメント（古い順）。初回は直近 chat_max_results 件。"""
+        if not self.chat_id or not self.chat_poller: return []
         if not self.youtube_api_key:
             self.log("❌ YouTube APIキーが設定されていません。コメントを取得できません。")
             return []
         try:
-            url = f"{self.youtube_base_url}/liveChat/messages"
-            params = {'liveChatId': self.chat_id, 'part': 'snippet,authorDetails', 'maxResults': max_results, 'key': self.youtube_api_key}
-            response = await asyncio.to_thread(requests.get, url, params=params, timeout=10)
-            response.raise_for_status()
-            return response.json().get('items', [])
+            return await self.chat_poller.poll()
         except Exception as e:
             self.log(f"コメント取得エラー: {e}")
             return []
 
+    def _history_prompt(self):
+        history_len = self.config.get_system_setting("conversation_history_length", 0)
+        history_parts = [f"視聴者 {h['user']}: {h['comment']}\nあなた: {h['response']}" for h in self.chat_history[-history_len:]] if history_len > 0 else []
+        return ''.join(history_parts)
+
+    async def _generate_text(self, full_prompt, char_name, selected_model, max_tokens=100):
+        """プロンプトを選択中のモデルに送って生成テキストを返す（API の例外は呼び出し元で処理する）"""
+        if selected_model == "local_lm_studio":
+            local_llm_url = self.config.get_system_setting("local_llm_endpoint_url", "")
+            if not local_llm_url:
+                self.log(f"❌ LocalLLM (Streaming - {char_name}): エンドポイントURL未設定。")
+                return "ローカルLLMのエンドポイントURLが未設定です。"
+            started = time.perf_counter()
+            text = await self._generate_response_local_llm_streaming(full_prompt, local_llm_url, char_name, max_tokens)
+        else:
+            if not self.client:
+                self.log("❌ Google AI Clientが初期化されていません。")
+                return "Google AIサービスに接続できません (クライアント未初期化)。"
+            started = time.perf_counter()
+            gemini_response = await asyncio.to_thread(
+                self.client.models.generate_content,
+                model=selected_model, contents=full_prompt,
+                generation_config=genai.types.GenerateContentConfig(temperature=0.9, max_output_tokens=max_tokens, top_p=0.8)
+            )
+            text = gemini_response.text.strip() if gemini_response.text else "うーん、うまく言葉にできませんでした。"
+        self.llm_latencies.append(time.perf_counter() - started)
+        return text
+
     async def generate_response(self, comment_text, author_name):
         char_name = self.config.get_character(self.character_id).get('name', 'AIちゃん')
         selected_model = self.config.get_system_setting("text_generation_model", "gemini-1.5-flash")
@@ -222,31 +468,10 @@ class AITuberStreamingSystem:
 
         try:
             char_prompt = self.character_manager.get_character_prompt(self.character_id)
-            history_len = self.config.get_system_setting("conversation_history_length", 0)
-            history_parts = [f"視聴者 {h['user']}: {h['comment']}\nあなた: {h['response']}" for h in self.chat_history[-history_len:]] if history_len > 0 else []
-            full_prompt = f"{char_prompt}\n\n{''.join(history_parts)}\n\n視聴者 {author_name}: {comment_text}\n\n親しみやすく自然な返答をしてください。"
+            full_prompt = f"{char_prompt}\n\n{self._history_prompt()}\n\n視聴者 {author_name}: {comment_text}\n\n親しみやすく自然な返答をしてください。"
 
             self.communication_logger.add_log("sent", "text_generation", f"[Streaming to {char_name} (Model: {selected_model})]\n{full_prompt}")
-
-            if selected_model == "local_lm_studio":
-                local_llm_url = self.config.get_system_setting("local_llm_endpoint_url", "")
-                if not local_llm_url:
-                    ai_response_text = "ローカルLLMのエンドポイントURLが未設定です。"
-                    self.log(f"❌ LocalLLM (Streaming - {char_name}): エンドポイントURL未設定。")
-                else:
-                    ai_response_text = await self._generate_response_local_llm_streaming(full_prompt, local_llm_url, char_name)
-            else:
-                if not self.client:
-                    ai_response_text = "Google AIサービスに接続できません (クライアント未初期化)。"
-                    self.log("❌ Google AI Clientが初期化されていません。")
-                else:
-                    gemini_response = await asyncio.to_thread(
-                        self.client.models.generate_content,
-                        model=selected_model, contents=full_prompt,
-                        generation_config=genai.types.GenerateContentConfig(temperature=0.9, max_output_tokens=100, top_p=0.8)
-                    )
-                    ai_response_text = gemini_response.text.strip() if gemini_response.text else "うーん、うまく言葉にできませんでした。"
-
+            ai_response_text = await self._generate_text(full_prompt, char_name, selected_model)
             self.communication_logger.add_log("received", "text_generation", f"[Streaming from {char_name} (Model: {selected_model})]\n{ai_response_text}")
             return ai_response_text
 
@@ -264,30 +489,153 @@ class AITuberStreamingSystem:
             self.communication_logger.add_log("received", "text_generation", f"[Streaming from {char_name} (Model: {selected_model}) - Generic Error]\n{e}")
         return ai_response_text
 
-    async def synthesize_and_play(self, text):
+    def _reply_batch_size(self):
+        """
+        何件のコメントにまとめて返答するか。待ちが stream_batch_threshold 件未満なら1件ずつ。
+        1件ずつ処理すると待ち件数 × LLM レイテンシ秒かかるので、それが stream_batch_latency_budget 秒に収まる件数にする。
+        """
+        if not self.config.get_system_setting("stream_batch_enabled", True): return 1
+        depth = len(self.comment_queue) + 1 # 取り出し済みの1件を含む
+        if depth < int(self.config.get_system_setting("stream_batch_threshold", 3)): return 1
+        latency = statistics.median(self.llm_latencies) if self.llm_latencies else 2.0
+        budget = max(0.1, float(self.config.get_system_setting("stream_batch_latency_budget", 4.0)))
+        size = math.ceil(depth * latency / budget)
+        return max(2, min(size, depth, int(self.config.get_system_setting("stream_batch_max_size", 5))))
+
+    @staticmethod
+    def _parse_batch_replies(text, count):
+        """まとめて生成した返答（JSON 配列、崩れていれば "1. ..." の行）を番号順のリストにする。取り出せなかった番号は ""。"""
+        replies = [""] * count
+        match = re.search(r"\[.*\]", text or "", re.S)
+        try: items = json.loads(match.group(0)) if match else []
+        except ValueError: items = []
+        for pos, item in enumerate(items if isinstance(items, list) else []):
+            number, reply = (item.get("id", pos + 1), item.get("reply")) if isinstance(item, dict) else (pos + 1, item)
+            try: index = int(number) - 1
+            except (TypeError, ValueError): continue
+            if 0 <= index < count and isinstance(reply, str) and reply.strip(): replies[index] = reply.strip()
+        if not any(replies):
+            for line in (text or "").splitlines():
+                line_match = re.match(r"\s*(\d+)\s*[.:：)）]\s*(.+)", line)
+                if line_match and 0 < int(line_match.group(1)) <= count: replies[int(line_match.group(1)) - 1] = line_match.group(2).strip()
+        return replies
+
+    async def generate_batch_response(self, comments):
+        """複数のコメントへの返答を1回の LLM 呼び出しで生成し、comments と同じ順のリストで返す"""
+        char_name = self.config.get_character(self.character_id).get('name', 'AIちゃん')
+        selected_model = self.config.get_system_setting("text_generation_model", "gemini-1.5-flash")
+        numbered = "\n".join(f"{i}. 視聴者 {c.author}: {c.text}" for i, c in enumerate(comments, 1))
+        full_prompt = (f"{self.character_manager.get_character_prompt(self.character_id)}\n\n{self._history_prompt()}\n\n"
+                       f"次の{len(comments)}件のコメントそれぞれに、親しみやすく自然な返答をしてください。\n{numbered}\n\n"
+                       f'出力は JSON 配列だけにしてください。例: [{{"id": 1, "reply": "返答"}}, {{"id": 2, "reply": "返答"}}]')
+        replies = [""] * len(comments)
         try:
-            char_data = self.config.get_character(self.character_id)
-            char_name = char_data.get('name', 'AIちゃん')
-            voice_settings = char_data.get('voice_settings', {})
-            engine = voice_settings.get('engine', self.config.get_system_setting("voice_engine", "avis_speech")) # デフォルトエンジン設定
-            model = voice_settings.get('model') # モデルはエンジンごとに異なるので、ここではNoneかもしれない
-            speed = voice_settings.get('speed', 1.0)
-
-            self.communication_logger.add_log("sent", "voice_synthesis", f"[Streaming Voice for {char_name} (Engine: {engine}, Model: {model or 'N/A'})]\n{text}")
-
-            google_api_key = self.config.get_system_setting("google_ai_api_key") if "google_ai_studio" in engine else None
-
-            audio_files = await self.voice_manager.synthesize_with_fallback(
-                text, model, speed, preferred_engine=engine, api_key=google_api_key
-            )
+            self.communication_logger.add_log("sent", "text_generation", f"[Streaming batch to {char_name} (Model: {selected_model}, {len(comments)} comments)]\n{full_prompt}")
+            text = await self._generate_text(full_prompt, char_name, selected_model, max_tokens=100 * len(comments))
+            self.communication_logger.add_log("received", "text_generation", f"[Streaming batch from {char_name} (Model: {selected_model})]\n{text}")
+            replies = self._parse_batch_replies(text, len(comments))
+        except Exception as e:
+            self.log(f"❌ まとめて返答の生成に失敗しました: {e}")
+        self.batch_stats["batches"] += 1
+        self.batch_stats["batched_comments"] += len(comments)
+        for index, reply in enumerate(replies):
+            if reply: continue
+            self.batch_stats["parse_fallbacks"] += 1 # 形式が崩れて取り出せなかった分は1件ずつ生成し直す
+            replies[index] = await self.generate_response(comments[index].text, comments[index].author)
+        return replies
+
+    async def _generate_with_filler(self, comment_text, author_name):
+        """応答生成が phrase_bank_filler_delay 秒を超えたら、待っている間に事前合成したつなぎのフレーズを再生する"""
+        if not (self.config.get_system_setting("phrase_bank_enabled", True) and self.config.get_system_setting("phrase_bank_filler_enabled", False)):
+            return await self.generate_response(comment_text, author_name)
+        task = asyncio.create_task(self.generate_response(comment_text, author_name))
+        try:
+            done, _ = await asyncio.wait({task}, timeout=float(self.config.get_system_setting("phrase_bank_filler_delay", 1.5)))
+            if not done:
+                filler_text, clip = self.phrase_bank.pick("thinking", self._phrase_bank_fingerprint())
+                if clip is not None and self._can_play_filler(): # 他の応答を読み上げ中・読み上げ待ちならつなぎは不要
+                    async with self._speak_lock:
+                        self.log(f"💭 {filler_text}")
+                        await self.audio_player.play_audio_files([clip])
+            return await task
+        finally:
+            if not task.done(): task.cancel()
+
+    def _phrase_clip(self, text):
+        """定型フレーズの合成済み音声。phrase_bank_enabled が False なら常に None。"""
+        if not self.config.get_system_setting("phrase_bank_enabled", True): return None
+        return self.phrase_bank.lookup(text, self._phrase_bank_fingerprint())
+
+    def _phrase_bank_fingerprint(self):
+        """今の声の設定のフィンガープリント（声や話速を変えた直後の古いバンクを使わないため）"""
+        return PhraseBank.make_fingerprint(self.config.get_character(self.character_id), self.voice_manager.postprocessor.sample_rate)
+
+    def _can_play_filler(self):
+        if self._speak_lock.locked(): return False
+        if self._audio_queue is None: return True
+        meters = self.stage_meters
+        return (self._reply_queue.empty() and self._audio_queue.empty()
+                and not meters["synthesize"].active and not meters["playback"].active)
+
+    def _voice_params(self):
+        """キャラクターの声の設定 (char_name, engine, model, speed, google_api_key)"""
+        char_data = self.config.get_character(self.character_id)
+        voice_settings = char_data.get('voice_settings', {})
+        engine = voice_settings.get('engine', self.config.get_system_setting("voice_engine", "avis_speech")) # デフォルトエンジン設定
+        model = voice_settings.get('model') # モデルはエンジンごとに異なるので、ここではNoneかもしれない
+        google_api_key = self.config.get_system_setting("google_ai_api_key") if "google_ai_studio" in engine else None
+        return char_data.get('name', 'AIちゃん'), engine, model, voice_settings.get('speed', 1.0), google_api_key
+
+    async def _synthesize(self, text):
+        char_name, engine, model, speed, google_api_key = self._voice_params()
+        self.communication_logger.add_log("sent", "voice_synthesis", f"[Streaming Voice for {char_name} (Engine: {engine}, Model: {model or 'N/A'})]\n{text}")
+        return await self.voice_manager.synthesize_with_fallback(
+            text, model, speed, preferred_engine=engine, api_key=google_api_key, character_id=self.character_id
+        )
 
-            if audio_files:
-                await self.audio_player.play_audio_files(audio_files)
+    async def synthesize_and_play(self, text):
+        clip = self._phrase_clip(text)
+        if clip is not None: # 定型フレーズ（エラー時のおわびなど）は合成しない
+            self.log(f"⏱️ 定型フレーズを再生 ({clip.duration:.1f}秒)")
+            self.reply_latencies.append(0.0)
+            await self.audio_player.play_audio_files([clip])
+            return
+        try:
+            char_name, engine, model, speed, google_api_key = self._voice_params()
+            # どちらのモードも「合成を始めてから最初の音声を再生に渡すまで」を計る
+            started = time.perf_counter()
+            if self.config.get_system_setting("voice_pipeline_mode", True):
+                self.communication_logger.add_log("sent", "voice_synthesis", f"[Streaming Voice for {char_name} (Engine: {engine}, Model: {model or 'N/A'})]\n{text}")
+                # 文単位で合成と再生を重ねて、最初の音声が出るまでの待ち時間を短縮する
+                report = await self.voice_manager.speak_pipelined(
+                    text, model, speed, self.audio_player, preferred_engine=engine, api_key=google_api_key, character_id=self.character_id
+                )
+                first_audio_at = report["first_audio_at"]
+            else:
+                audio_files = await self._synthesize(text)
+                first_audio_at = time.perf_counter() if audio_files else None
+                if audio_files:
+                    await self.audio_player.play_audio_files(audio_files)
+            time_to_first_audio = first_audio_at - started if first_audio_at is not None else None
+
+            if time_to_first_audio is not None:
+                self.reply_latencies.append(time_to_first_audio)
+                self.log(f"⏱️ 最初の音声まで {time_to_first_audio:.2f}秒")
             else:
                 self.log(f"警告: 音声合成に失敗しました ({char_name}, Text: '{text[:30]}...')")
         except Exception as e:
             self.log(f"❌ 音声処理エラー: {e}\n{traceback.format_exc()}")
 
+    def get_quota_stats(self): return self.quota.snapshot()
+    def get_queue_metrics(self): return self.comment_queue.metrics() if self.comment_queue else {}
+
+    def get_stage_stats(self):
+        """{段: 稼働率などの snapshot}。段の間のキューの長さは "queue_depths"。"""
+        stats = {name: meter.snapshot() for name, meter in self.stage_meters.items()}
+        if self._reply_queue is not None:
+            stats["queue_depths"] = {"reply": self._reply_queue.qsize(), "audio": self._audio_queue.qsize()}
+        return stats
+
     def stop(self):
         self.running = False
         self.log("配信停止処理を呼び出しました。")
@@ -0,0 +1,195 @@
+"""
+音声合成結果のディスクキャッシュ
+
+同じテキストを同じ声で何度も合成しないよう、合成済み音声を内容アドレス (SHA-256) で保存する。
+キーは (エンジン, 解決済み話者ID, 速度, 正規化テキスト)。
+
+- 1エントリ = <hash>.wav（音声）+ <hash>.json（メタデータ）
+  ランチャーから各ウィンドウが別プロセスで起動されるため、共有インデックスファイルは持たない
+- 合計サイズ上限を超えたら最終アクセスが古いものから削除する (LRU)
+- キャラクターIDでタグ付けし、キャラクター単位で無効化できる
+- インスタンスはキャッシュディレクトリごとにプロセス内で共有し（get_synthesis_cache）、
+  VoiceEngineManager を作るたびにディレクトリを走査し直さない
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import unicodedata
+import wave
+
+from audio_clip import AudioClip
+
+logger = logging.getLogger(__name__)
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_synthesis_cache(cache_dir="voice_cache", max_bytes=200 * 1024 * 1024, enabled=True):
+    """キャッシュディレクトリごとに共有される SynthesisCache を返す（上限・有効化は最後に指定した値に合わせる）"""
+    key = os.path.abspath(cache_dir)
+    with _caches_lock: # インデックスの構築が2つのスレッドで重ならないよう、設定変更もロック内で行う
+        cache = _caches.get(key)
+        if cache is None: cache = _caches[key] = SynthesisCache(cache_dir, max_bytes, enabled)
+        else: cache.configure(max_bytes, enabled)
+        return cache
+
+
+def normalize_text(text):
+    """キャッシュキー用にテキストを正規化する（NFKC・前後空白除去・連続空白の圧縮）"""
+    return " ".join(unicodedata.normalize("NFKC", text or "").split())
+
+
+class SynthesisCache:
+    """合成済み音声の内容アドレス型ディスクキャッシュ（サイズ上限付き LRU）"""
+
+    def __init__(self, cache_dir="voice_cache", max_bytes=200 * 1024 * 1024, enabled=True):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._entries = {}  # {hash: meta dict}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "invalidations": 0}
+        self._index_loaded = False
+        if self.enabled: self._load_index()
+
+    def configure(self, max_bytes, enabled):
+        """上限と有効・無効を変更する。初めて有効になったときにインデックスを作る。"""
+        with self._lock: self.max_bytes = max_bytes
+        self.enabled = enabled
+        if not enabled: return
+        if not self._index_loaded: self._load_index()
+        else:
+            with self._lock: self._evict_locked()
+
+    # --- キー ---
+    @staticmethod
+    def make_key(engine_name, voice_id, speed, text):
+        payload = json.dumps([engine_name, str(voice_id), round(float(speed or 1.0), 3), normalize_text(text)], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _audio_path(self, key): return os.path.join(self.cache_dir, f"{key}.wav")
+    def _meta_path(self, key): return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load_index(self):
+        """キャッシュディレクトリを走査してメモリ上のインデックスを構築する"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            for fname in os.listdir(self.cache_dir):
+                if not fname.endswith(".json"): continue
+                key = fname[:-5]
+                audio_path = self._audio_path(key)
+                try:
+                    with open(self._meta_path(key), "r", encoding="utf-8") as f: meta = json.load(f)
+                    if not os.path.exists(audio_path): os.unlink(self._meta_path(key)); continue
+                    meta["size"] = os.path.getsize(audio_path)
+                    meta["last_access"] = os.path.getmtime(audio_path)
+                    self._entries[key] = meta
+                    self._total_bytes += meta["size"]
+                except Exception as e: logger.warning(f"SynthesisCache: Skipping broken entry {key}: {e}")
+            logger.info(f"SynthesisCache: {len(self._entries)} entries ({self._total_bytes / 1024 / 1024:.1f} MB) in {self.cache_dir}")
+            self._index_loaded = True
+            with self._lock: self._evict_locked()
+        except Exception as e:
+            logger.error(f"SynthesisCache: Failed to load cache dir {self.cache_dir}: {e}")
+            self.enabled = False
+
+    # --- 取得・保存 ---
+    def get(self, key):
+        """キャッシュヒット時はメモリに読み込んだ AudioClip のリストを返す。ミス時は None。"""
+        if not self.enabled or not key: return None
+        with self._lock:
+            meta = self._entries.get(key)
+            if meta is None: self._stats["misses"] += 1; return None
+            audio_path = self._audio_path(key)
+            try:
+                clip = AudioClip.from_wav_file(audio_path, source=f"cache:{meta.get('engine', '')}")
+                now = time.time()
+                meta["last_access"] = now
+                try: os.utime(audio_path, (now, now))  # 他プロセスとも LRU 順序を共有するため mtime を更新
+                except OSError: pass
+                self._stats["hits"] += 1
+                return [clip]
+            except (OSError, EOFError, wave.Error) as e:  # 他プロセスが削除した・書き込み途中など
+                logger.debug(f"SynthesisCache: Dropping unreadable entry {key}: {e}")
+                self._drop_locked(key)
+                self._stats["misses"] += 1
+                return None
+
+    def put(self, key, audio, engine_name="", voice_id="", speed=1.0, text="", character_id=None):
+        """合成済み音声（AudioClip またはファイルパス）をキャッシュに保存する（元の音声はそのまま残す）"""
+        if not self.enabled or not key or not audio: return False
+        if not isinstance(audio, AudioClip) and not os.path.exists(audio): return False
+        try:
+            size = os.path.getsize(audio) if not isinstance(audio, AudioClip) else audio.nbytes + 44 # WAV ヘッダ分
+            if size <= 0 or size > self.max_bytes: return False
+            meta = {"engine": engine_name, "voice_id": str(voice_id), "speed": speed, "text": normalize_text(text)[:200],
+                    "character_ids": [character_id] if character_id else [], "size": size, "created_at": time.time()}
+            with self._lock:
+                existing = self._entries.get(key)
+                if existing is not None:
+                    if character_id and character_id not in existing.get("character_ids", []):
+                        existing.setdefault("character_ids", []).append(character_id)
+                        self._write_meta(key, existing)
+                    return True
+                if isinstance(audio, AudioClip): audio.write_wav(self._audio_path(key))
+                else: shutil.copyfile(audio, self._audio_path(key))
+                meta["last_access"] = time.time()
+                self._write_meta(key, meta)
+                self._entries[key] = meta
+                self._total_bytes += size
+                self._stats["stores"] += 1
+                self._evict_locked()
+            return True
+        except Exception as e:
+            logger.warning(f"SynthesisCache: Failed to store entry: {e}")
+            return False
+
+    def _write_meta(self, key, meta):
+        tmp_path = self._meta_path(key) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f: json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, self._meta_path(key))
+
+    def _drop_locked(self, key):
+        meta = self._entries.pop(key, None)
+        if meta: self._total_bytes -= meta.get("size", 0)
+        for path in (self._audio_path(key), self._meta_path(key)):
+            try: os.unlink(path)
+            except OSError: pass
+
+    def _evict_locked(self):
+        if self._total_bytes <= self.max_bytes: return
+        for key, _ in sorted(self._entries.items(), key=lambda kv: kv[1].get("last_access", 0)):
+            if self._total_bytes <= self.max_bytes: break
+            self._drop_locked(key)
+            self._stats["evictions"] += 1
+
+    # --- 無効化・統計 ---
+    def invalidate_character(self, character_id):
+        """指定キャラクターで合成されたエントリを削除し、削除件数を返す"""
+        if not character_id: return 0
+        with self._lock:
+            keys = [k for k, m in self._entries.items() if character_id in m.get("character_ids", [])]
+            for key in keys: self._drop_locked(key)
+            self._stats["invalidations"] += len(keys)
+        if keys: logger.info(f"SynthesisCache: Invalidated {len(keys)} entries for character {character_id}")
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries): self._drop_locked(key)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({"entries": len(self._entries), "total_bytes": self._total_bytes, "max_bytes": self.max_bytes, "enabled": self.enabled})
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
@@ -0,0 +1,201 @@
+"""
+音声合成の計測データ
+
+- VoiceMetrics: エンジンごとの合成レイテンシを直近 N 件の窓で保持し、パーセンタイルを返す。
+  ヘッジ合成（遅いエンジンの裏で次のエンジンを並行起動する）の判断と、その効果の集計に使う。
+- VoiceTelemetry: エンジン・声ごとの待ち時間・リクエスト時間・バイト数・実時間比 (RTF) のヒストグラムと
+  フォールバック回数をプロセス内で集計する。デバッグウィンドウから参照し、JSON に書き出して
+  エンジンのバージョン間で比較できる。
+"""
+
+import json
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+
+
+def percentile(values, q):
+    """q (0.0〜1.0) パーセンタイルを線形補間で求める。values が空なら None。"""
+    if not values: return None
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * min(max(q, 0.0), 1.0)
+    lower = int(pos)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (pos - lower)
+
+
+class VoiceMetrics:
+    """エンジン別レイテンシ窓とヘッジ合成の集計"""
+
+    def __init__(self, window_size=200):
+        self.window_size = window_size
+        self._latencies = {}  # {engine_name: deque[seconds]}
+        self._hedge = {"requests": 0, "hedges_launched": 0, "hedge_wins": 0, "wasted_seconds": 0.0, "latency_saved_seconds": 0.0}
+        self.last_hedge_report = None
+        self._lock = threading.Lock()
+
+    def record_latency(self, engine_name, seconds):
+        with self._lock:
+            self._latencies.setdefault(engine_name, deque(maxlen=self.window_size)).append(seconds)
+
+    def latency_percentile(self, engine_name, q, min_samples=5):
+        """サンプル数が min_samples 未満なら None（判断材料不足）"""
+        with self._lock:
+            values = list(self._latencies.get(engine_name, ()))
+        return percentile(values, q) if len(values) >= min_samples else None
+
+    def record_hedge(self, report):
+        """ヘッジ合成1リクエスト分の結果（無駄になった処理時間・短縮できた時間の推定）を集計する"""
+        with self._lock:
+            self._hedge["requests"] += 1
+            self._hedge["hedges_launched"] += report.get("hedges_launched", 0)
+            self._hedge["hedge_wins"] += 1 if report.get("hedge_won") else 0
+            self._hedge["wasted_seconds"] += report.get("wasted_seconds", 0.0)
+            self._hedge["latency_saved_seconds"] += report.get("latency_saved_seconds", 0.0)
+            self.last_hedge_report = report
+
+    def hedge_summary(self):
+        with self._lock: return dict(self._hedge)
+
+
+# ヒストグラムの境界（固定にしておくと、別プロセス・別バージョンのダンプ同士をそのまま比較・合算できる）
+SECONDS_BUCKETS = tuple(0.001 * 2 ** i for i in range(17))  # 1ms〜約65秒
+BYTES_BUCKETS = tuple(1024 * 2 ** i for i in range(17))     # 1KB〜64MB
+RTF_BUCKETS = tuple(0.125 * 2 ** i for i in range(13))      # 0.125〜512 倍速
+
+
+class Histogram:
+    """固定境界のヒストグラム（記録は二分探索1回と加算のみ）"""
+
+    __slots__ = ("bounds", "counts", "count", "total", "min", "max")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # 最後は上限超え
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None or value < self.min else self.min
+        self.max = value if self.max is None or value > self.max else self.max
+
+    def percentile(self, q):
+        """q パーセンタイルの近似値（そのサンプルが入っているバケットの上限。実測の最大値を超えない）"""
+        if not self.count: return None
+        rank = max(1, int(round(q * self.count)))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank: return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {"count": self.count, "sum": self.total, "mean": self.total / self.count if self.count else None,
+                "min": self.min, "max": self.max, "p50": self.percentile(0.5), "p90": self.percentile(0.9), "p99": self.percentile(0.99),
+                "buckets": [{"le": b, "count": c} for b, c in zip(list(self.bounds) + ["+Inf"], self.counts) if c]}
+
+
+class _Series:
+    """1エンジン・1声分の集計"""
+
+    __slots__ = ("requests", "failures", "cache_hits", "coalesced", "queue_wait", "request_seconds", "bytes", "rtf")
+
+    def __init__(self):
+        self.requests = 0
+        self.failures = 0
+        self.cache_hits = 0
+        self.coalesced = 0  # 実行中の同じ合成に合流した回数（エンジンを呼んでいない）
+        self.queue_wait = Histogram(SECONDS_BUCKETS)       # 同時実行数制限のセマフォ待ち
+        self.request_seconds = Histogram(SECONDS_BUCKETS)  # エンジン呼び出しそのものの時間
+        self.bytes = Histogram(BYTES_BUCKETS)              # 返ってきた PCM のバイト数
+        self.rtf = Histogram(RTF_BUCKETS)                  # 音声秒数 / 実時間秒数（大きいほど速い）
+
+
+_telemetry = None
+_telemetry_lock = threading.Lock()
+
+
+def get_voice_telemetry():
+    """プロセス内で共有される VoiceTelemetry を返す"""
+    global _telemetry
+    with _telemetry_lock:
+        if _telemetry is None: _telemetry = VoiceTelemetry()
+        return _telemetry
+
+
+class VoiceTelemetry:
+    """エンジン・声ごとの合成テレメトリ（ヒストグラムとフォールバック回数）"""
+
+    def __init__(self):
+        self._series = {}     # {(engine_name, voice): _Series}
+        self._fallbacks = {}  # {(from_engine, to_engine): count}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def _get(self, engine_name, voice):
+        key = (engine_name, str(voice))
+        series = self._series.get(key)
+        if series is None: series = self._series[key] = _Series()
+        return series
+
+    def record_request(self, engine_name, voice, queue_wait, request_seconds, nbytes=0, audio_seconds=0.0, ok=True):
+        with self._lock:
+            series = self._get(engine_name, voice)
+            series.requests += 1
+            series.queue_wait.observe(queue_wait)
+            series.request_seconds.observe(request_seconds)
+            if not ok: series.failures += 1; return
+            series.bytes.observe(nbytes)
+            if request_seconds > 0 and audio_seconds > 0: series.rtf.observe(audio_seconds / request_seconds)
+
+    def record_cache_hit(self, engine_name, voice):
+        with self._lock: self._get(engine_name, voice).cache_hits += 1
+
+    def record_coalesced(self, engine_name, voice):
+        with self._lock: self._get(engine_name, voice).coalesced += 1
+
+    def record_fallback(self, from_engine, to_engine):
+        """from_engine が失敗（または遅延）して to_engine の結果を使ったときに呼ぶ"""
+        with self._lock:
+            key = (from_engine, to_engine)
+            self._fallbacks[key] = self._fallbacks.get(key, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear(); self._fallbacks.clear()
+            self.started_at = time.time()
+
+    def snapshot(self):
+        """JSON にそのまま書き出せる辞書を返す"""
+        with self._lock:
+            series = [{"engine": engine, "voice": voice, "requests": s.requests, "failures": s.failures, "cache_hits": s.cache_hits, "coalesced": s.coalesced,
+                       "queue_wait_seconds": s.queue_wait.to_dict(), "request_seconds": s.request_seconds.to_dict(),
+                       "bytes": s.bytes.to_dict(), "real_time_factor": s.rtf.to_dict()}
+                      for (engine, voice), s in sorted(self._series.items())]
+            fallbacks = [{"from": f, "to": t, "count": c} for (f, t), c in sorted(self._fallbacks.items())]
+        return {"started_at": self.started_at, "captured_at": time.time(), "series": series, "fallbacks": fallbacks}
+
+    def dump_json(self, path):
+        with open(path, "w", encoding="utf-8") as f: json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        return path
+
+    @staticmethod
+    def format_snapshot(snapshot):
+        """snapshot()（または読み込んだダンプ）を人が読める表にする"""
+        def ms(h, key): return f"{h[key] * 1000:.0f}" if h.get(key) is not None else "-"
+        lines = [f"{'engine/voice':<40} {'req':>5} {'fail':>4} {'hit':>4} {'join':>4} {'wait p50':>8} {'req p50':>8} {'p90':>7} {'p99':>7} {'KB avg':>7} {'RTF p50':>7}"]
+        for s in snapshot.get("series", []):
+            avg_bytes = s["bytes"].get("mean")
+            rtf = s["real_time_factor"].get("p50")
+            lines.append(f"{(s['engine'] + ' / ' + s['voice'])[:40]:<40} {s['requests']:>5} {s['failures']:>4} {s['cache_hits']:>4} {s.get('coalesced', 0):>4} "
+                         f"{ms(s['queue_wait_seconds'], 'p50'):>8} {ms(s['request_seconds'], 'p50'):>8} {ms(s['request_seconds'], 'p90'):>7} "
+                         f"{ms(s['request_seconds'], 'p99'):>7} {(avg_bytes / 1024 if avg_bytes else 0):>7.1f} {(f'{rtf:.2f}' if rtf else '-'):>7}")
+        for fb in snapshot.get("fallbacks", []):
+            lines.append(f"fallback {fb['from']} -> {fb['to']}: {fb['count']}")
+        return "\n".join(lines)
@@ -0,0 +1,150 @@
+"""
+起動時のウォームアップ（オプトイン）
+
+配信・チャットの最初の1回だけ遅くなる原因（ローカル音声エンジンのモデル読み込み、話者一覧の取得、
+LLM への接続確立・ローカル LLM のモデル読み込み）を、ユーザーが操作を始める前にバックグラウンドで済ませておく。
+
+1. 話者カタログ (Avis Speech / VOICEVOX) を取得し、その後キャラクターのエンジンで短いダミー発話を1回合成する
+2. 並行して LLM に接続する（Gemini はクライアントを作ってモデル情報を取得、ローカル LLM は1トークンだけ生成させる）
+
+状態は cold → warming → warm / failed / cancelled と遷移し、on_state_change で UI に通知する。
+ユーザーが先に操作を始めたら cancel() で打ち切る（合成中のリクエストもキャンセルされ、エンジンの同時実行枠を空ける）。
+"""
+
+import asyncio
+import logging
+import threading
+import time
+
+import aiohttp
+
+try:
+    from google import genai
+except ImportError:  # オプション依存
+    genai = None
+
+logger = logging.getLogger(__name__)
+
+COLD, WARMING, WARM, FAILED, CANCELLED = "cold", "warming", "warm", "failed", "cancelled"
+
+_gemini_clients = {}
+_gemini_clients_lock = threading.Lock()
+
+
+def get_gemini_client(api_key):
+    """API キーごとに共有される genai.Client を返す（ウォームアップで確立した接続を本番のリクエストでも使う）"""
+    if genai is None or not api_key: return None
+    with _gemini_clients_lock:
+        if api_key not in _gemini_clients: _gemini_clients[api_key] = genai.Client(api_key=api_key)
+        return _gemini_clients[api_key]
+
+
+class Warmup:
+    """音声エンジン・話者カタログ・LLM 接続をバックグラウンドスレッドで温める"""
+
+    def __init__(self, config_manager, voice_manager, on_state_change=None):
+        self.config_manager = config_manager
+        self.voice_manager = voice_manager
+        self.on_state_change = on_state_change  # (state, report) を受け取る。ワーカースレッドから呼ばれる
+        self.state = COLD
+        self.report = {}  # {step: {"ok": bool, "seconds": float}}
+        self._thread = None
+        self._loop = None
+        self._task = None
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    def _get_setting(self, key, default=None):
+        return self.config_manager.get_system_setting(key, default) if self.config_manager else default
+
+    def is_enabled(self): return bool(self._get_setting("warmup_enabled", False))
+
+    def _set_state(self, state):
+        self.state = state
+        logger.info(f"Warmup: {state} {self.report}")
+        if self.on_state_change:
+            try: self.on_state_change(state, dict(self.report))
+            except Exception as e: logger.warning(f"Warmup: on_state_change failed: {e}")
+
+    def start(self, character_data=None):
+        """character_data（キャラクター設定）の音声エンジンで温める。設定で無効なら何もせず False。"""
+        with self._lock:
+            if not self.is_enabled() or (self._thread and self._thread.is_alive()): return False
+            self._cancelled.clear()
+            self.report = {}
+            self._thread = threading.Thread(target=self._run, args=(character_data or {},), daemon=True)
+            self._thread.start()
+        return True
+
+    def cancel(self):
+        """実行中なら打ち切る（ユーザーが先に操作を始めたとき）"""
+        with self._lock:
+            if not (self._thread and self._thread.is_alive()): return False
+            self._cancelled.set()
+            if self._loop and self._task and not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(self._task.cancel)
+        return True
+
+    def _run(self, character_data):
+        self._set_state(WARMING)
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        state = FAILED
+        try:
+            with self._lock:
+                self._loop = loop
+                self._task = loop.create_task(self._warm_all(character_data))
+            if self._cancelled.is_set(): self._task.cancel()
+            loop.run_until_complete(self._task)
+            state = WARM if all(step["ok"] for step in self.report.values()) else FAILED
+        except asyncio.CancelledError:
+            state = CANCELLED
+        except Exception as e:
+            logger.error(f"Warmup: unexpected error: {e}")
+        finally:
+            try: loop.run_until_complete(self.voice_manager.close())
+            except Exception as e: logger.warning(f"Warmup: failed to close voice sessions: {e}")
+            with self._lock: self._loop = self._task = None
+            loop.close()
+        self._set_state(state)
+
+    async def _step(self, name, coro):
+        started = time.perf_counter()
+        try: ok = bool(await coro)
+        except asyncio.CancelledError: raise
+        except Exception as e: logger.warning(f"Warmup: {name} failed: {e}"); ok = False
+        self.report[name] = {"ok": ok, "seconds": time.perf_counter() - started}
+        return ok
+
+    async def _warm_all(self, character_data):
+        await asyncio.gather(self._warm_voice(character_data), self._step("llm", self._warm_llm()))
+
+    async def _warm_voice(self, character_data):
+        # 話者カタログがないとローカルエンジンの話者IDを解決できないので、合成より先に取得する
+        catalogs = self.voice_manager.refresh_speaker_catalogs()
+        await self._step("speaker_catalog", self._any_true(catalogs))
+        voice_settings = character_data.get("voice_settings", {})
+        engine = voice_settings.get("engine", self._get_setting("voice_engine"))
+        api_key = self._get_setting("google_ai_api_key") if engine and "google_ai_studio" in engine else None
+        text = self._get_setting("warmup_text", "テスト")
+        await self._step("voice", self.voice_manager.warm_up_engine(engine, voice_settings.get("model"), text, api_key))
+
+    @staticmethod
+    async def _any_true(coro):
+        results = await coro
+        return not results or any(results.values()) # ローカルエンジンがない構成は成功扱い
+
+    async def _warm_llm(self):
+        model = self._get_setting("text_generation_model", "gemini-1.5-flash")
+        if model == "local_lm_studio":
+            endpoint_url = self._get_setting("local_llm_endpoint_url")
+            if not endpoint_url: return False
+            # 1トークンだけ生成させてローカル LLM のモデル読み込みを済ませる
+            payload = {"model": "local-model", "messages": [{"role": "user", "content": "."}], "max_tokens": 1}
+            async with aiohttp.ClientSession() as session:
+                async with session.post(endpoint_url, json=payload, timeout=aiohttp.ClientTimeout(total=120)) as resp:
+                    return resp.status < 400
+        client = get_gemini_client(self._get_setting("google_ai_api_key"))
+        if client is None: return False
+        await asyncio.to_thread(client.models.get, model=model) # 生成はせず、接続（TLS ハンドシェイク）と認証だけ済ませる
+        return True
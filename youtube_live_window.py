@@ -11,6 +11,7 @@ from config import ConfigManager
 from character_manager import CharacterManager
 from audio_manager import VoiceEngineManager, AudioPlayer
 from streaming import AITuberStreamingSystem
+from warmup import Warmup
 # from i18n_setup import _, init_i18n # モジュールレベルのインポートから変更
 import i18n_setup # モジュールとしてインポート
 
@@ -55,8 +56,9 @@ class YouTubeLiveWindow:
 
         self.config = ConfigManager()
         self.character_manager = CharacterManager(self.config)
-        self.voice_manager = VoiceEngineManager()
+        self.voice_manager = VoiceEngineManager(config_manager=self.config)
         self.audio_player = AudioPlayer(config_manager=self.config)
+        self.warmup = Warmup(self.config, self.voice_manager, on_state_change=lambda state, report: self.root.after(0, self._update_warmup_indicator, state, report))
 
         self.is_streaming = False
         self.current_character_id = ""
@@ -72,6 +74,9 @@ class YouTubeLiveWindow:
         self.load_settings_for_youtube_live()
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         self.log("youtube_live.log_init_complete", is_translation_key=True) # is_translation_key を明示
+        # 配信開始前に音声エンジン・LLM を温めておく（設定で有効な場合のみ）
+        if self.current_character_id:
+            self.warmup.start(self.character_manager.get_character(self.current_character_id))
 
     def log(self, message_key_or_text, to_widget=True, is_translation_key=False, **kwargs):
         # self._ が利用可能か確認し、なければフォールバック（通常は不要）
@@ -175,6 +180,8 @@ class YouTubeLiveWindow:
         customtkinter.CTkEntry(youtube_frame, textvariable=self.live_id_var, width=300, font=self.default_font).grid(row=0, column=1, padx=5, pady=5, sticky="ew")
         self.start_button = customtkinter.CTkButton(youtube_frame, text=self._("youtube_live.button.start_streaming"), command=self.toggle_streaming_action, font=self.default_font)
         self.start_button.grid(row=0, column=2, padx=10, pady=5)
+        self.warmup_label = customtkinter.CTkLabel(youtube_frame, text=self._("warmup.status.cold"), font=self.default_font)
+        self.warmup_label.grid(row=0, column=3, padx=5, pady=5)
         youtube_frame.grid_columnconfigure(1, weight=1)
 
         stream_settings_frame = customtkinter.CTkFrame(stream_frame, fg_color="transparent")
@@ -207,6 +214,13 @@ class YouTubeLiveWindow:
         self.status_bar_label = customtkinter.CTkLabel(main_frame, text=self._("youtube_live.status.ready"), anchor="w", font=self.default_font)
         self.status_bar_label.pack(fill="x", padx=5, pady=(5,0), side="bottom")
 
+    def _update_warmup_indicator(self, state, report):
+        if hasattr(self, 'warmup_label') and self.warmup_label.winfo_exists():
+            self.warmup_label.configure(text=self._(f"warmup.status.{state}"))
+        if report:
+            details = ", ".join(f"{step}: {'OK' if r['ok'] else 'NG'} {r['seconds']:.1f}s" for step, r in report.items())
+            self.log("warmup.log.finished", is_translation_key=True, state=state, details=details)
+
     def _update_interval_label(self, value): # CTkSliderのcommandは値を直接渡す
         try:
             f_value = float(value)
@@ -265,6 +279,7 @@ class YouTubeLiveWindow:
             messagebox.showwarning(self._("youtube_live.messagebox.error.title"), self._("youtube_live.messagebox.error.no_youtube_api_key"), parent=self.root)
             return
 
+        self.warmup.cancel() # ウォームアップの完了を待たずに開始する
         self.is_streaming = True
         self.start_button.configure(text=self._("youtube_live.button.stop_streaming"))
         if hasattr(self, 'status_bar_label'): self.status_bar_label.configure(text=self._("youtube_live.status.streaming"))
@@ -302,11 +317,19 @@ class YouTubeLiveWindow:
             self.root.after(0, self.handle_streaming_error) # メインスレッドでUI更新
         finally:
             loop.close()
+            self._dump_voice_telemetry()
             # is_streaming フラグに基づいてUIを最終調整
             if not self.is_streaming : # 正常終了または手動停止の場合
                  self.root.after(0, self.update_ui_after_stream_stop)
 
 
+    def _dump_voice_telemetry(self):
+        """設定されていれば、配信中の音声合成テレメトリを JSON に書き出す（デバッグウィンドウで開いて比較できる）"""
+        dump_file = self.config.get_system_setting("voice_telemetry_dump_file", "")
+        if not dump_file: return
+        try: self.voice_manager.dump_telemetry(dump_file)
+        except Exception as e: logger.warning(f"Failed to dump voice telemetry to {dump_file}: {e}")
+
     def handle_streaming_error(self):
         self._ = getattr(self, '_', i18n_setup.get_translator()) # Ensure self._ is available
         # 配信がエラーで止まった場合のUI更新
@@ -346,6 +369,7 @@ class YouTubeLiveWindow:
 
     def on_closing(self):
         self._ = getattr(self, '_', i18n_setup.get_translator()) # Ensure self._ is available
+        self.warmup.cancel()
         if self.is_streaming:
             if messagebox.askokcancel(self._("youtube_live.messagebox.confirm_exit.title"), self._("youtube_live.messagebox.confirm_exit.message"), parent=self.root):
                 self.stop_streaming_action()